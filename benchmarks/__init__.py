@@ -0,0 +1,11 @@
+"""
+Benchmarks. Run from the repository root as modules (python -m benchmarks.<name>).
+
+Suite (results saved as JSON under benchmarks/results/):
+    synthetic  seeded payloads for every service's schema, plus images
+    stages     in-process per-stage micro-benchmarks and cold model loads
+    load       async HTTP load against a locally started app: rps, p50/p95/p99
+    compare    diff two result files; exits 1 on regressions
+
+The other modules are one-off studies behind specific optimizations.
+"""
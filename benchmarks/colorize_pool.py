@@ -0,0 +1,64 @@
+"""
+Pick COLORIZE_NET_POOL_SIZE: colorization forward throughput vs number of nets.
+
+    python -m benchmarks.colorize_pool [--sizes 1 2 4] [--seconds 10] [--batch 1]
+
+For each pool size N, N threads each drive their own Net (as the batcher
+workers do) with cv.setNumThreads split the same way as the router.
+"""
+import argparse
+import os
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from services.image_colorization.router import build_net
+
+
+def run(pool_size: int, seconds: float, batch: int) -> float:
+    cv.setNumThreads(max(1, (os.cpu_count() or 1) // pool_size))
+    nets = [build_net() for _ in range(pool_size)]
+
+    rng = np.random.default_rng(0)
+    # L - 50, as decode_and_prepare feeds the net
+    inputs = [(rng.random((224, 224), dtype=np.float32) * 100 - 50) for _ in range(batch)]
+    blob = cv.dnn.blobFromImages(inputs)
+
+    for net in nets:  # warm up
+        net.setInput(blob)
+        net.forward()
+
+    done = [0] * pool_size
+    stop = time.perf_counter() + seconds
+
+    def worker(i):
+        net = nets[i]
+        while time.perf_counter() < stop:
+            net.setInput(blob)
+            net.forward()
+            done[i] += batch
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(pool_size)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'nets':>5} {'images/s':>10}")
+    for n in args.sizes:
+        print(f"{n:>5} {run(n, args.seconds, args.batch):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare two benchmark result files (benchmarks.stages or benchmarks.load).
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 10]
+                                 [--metrics p50_ms p99_ms rps]
+
+For every case that ran in both files, prints each metric's old and new
+value and the change, marking a change beyond --threshold percent in the
+bad direction (slower latency, lower rps) as a regression. Exits 1 when
+there is any regression, so it can gate CI. Micro-benchmark p50 is stable
+to a few percent on an idle machine; use a larger threshold for p99 and
+for load runs.
+"""
+import argparse
+import sys
+
+from benchmarks import results
+
+# metric -> True when larger is better
+DIRECTIONS = {"mean_ms": False, "p50_ms": False, "p95_ms": False, "p99_ms": False, "rps": True}
+
+
+def compare(old: dict, new: dict, metrics, threshold: float):
+    rows, regressions = [], []
+    for name, new_case in new["cases"].items():
+        old_case = old["cases"].get(name)
+        if old_case is None or old_case["status"] != "ok" or new_case["status"] != "ok":
+            continue
+        for metric in metrics:
+            if metric not in old_case or metric not in new_case:
+                continue
+            before, after = old_case[metric], new_case[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            worse = -change if DIRECTIONS[metric] else change
+            flag = "REGRESSION" if worse > threshold else "improved" if worse < -threshold else ""
+            rows.append((name, metric, before, after, change, flag))
+            if flag == "REGRESSION":
+                regressions.append((name, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    parser.add_argument("--metrics", nargs="+", default=["p50_ms", "rps"], choices=list(DIRECTIONS))
+    args = parser.parse_args()
+
+    old, new = results.load(args.old), results.load(args.new)
+    if old["kind"] != new["kind"]:
+        sys.exit(f"Can't compare a {old['kind']} run with a {new['kind']} run")
+    print(f"{old['kind']}: {old['env']['commit']} -> {new['env']['commit']}")
+
+    rows, regressions = compare(old, new, args.metrics, args.threshold)
+    width = max([len(r[0]) for r in rows] + [4])
+    print(f"{'case':<{width}} {'metric':>7} {'old':>10} {'new':>10} {'change':>8}")
+    for name, metric, before, after, change, flag in rows:
+        print(f"{name:<{width}} {metric:>7} {before:>10.3f} {after:>10.3f} {change:>+7.1f}% {flag}")
+
+    only_old = sorted(set(old["cases"]) - set(new["cases"]))
+    only_new = sorted(set(new["cases"]) - set(old["cases"]))
+    if only_old:
+        print(f"\nonly in {args.old}: {', '.join(only_old)}")
+    if only_new:
+        print(f"only in {args.new}: {', '.join(only_new)}")
+
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare DR inference backends: p50/p99 single-image latency and RSS.
+
+    python -m benchmarks.dr_backends [--iters 200] [--backends keras savedmodel tflite tflite-int8]
+
+Each backend runs in its own subprocess so RSS numbers don't bleed into
+each other.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_one(backend: str, iters: int) -> dict:
+    from services.diabetic_retinopathy.backends import load_predictor
+    from services.diabetic_retinopathy.router import MODEL_PATH
+
+    quantize = backend == "tflite-int8"
+    name = "tflite" if quantize else backend
+
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    predict = load_predictor(name, MODEL_PATH, quantize)
+    load_s = time.perf_counter() - t0
+
+    x = np.random.default_rng(0).random((1, 150, 150, 3), dtype=np.float32)
+    for _ in range(10):
+        predict(x)
+
+    lat = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        predict(x)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 3),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iters", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=["keras", "savedmodel", "tflite", "tflite-int8"])
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_one(args.worker, args.iters)))
+        return
+
+    print(f"{'backend':<12} {'load_s':>8} {'p50_ms':>8} {'p99_ms':>8} {'rss_mb':>8}")
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.dr_backends", "--worker", backend, "--iters", str(args.iters)],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            print(f"{backend:<12} failed: {out.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{backend:<12} {r['load_s']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['rss_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+fraud_transaction single-row features: DataFrame path vs the precompiled FeaturePlan.
+
+    python -m benchmarks.fraud_features [--repeat 500]
+
+Times one /predict request's feature work through build_batch_df() (the
+pandas + sklearn path) and build_input_row(). Parity between the two is
+covered by tests/test_fraud_feature_plan.py.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from services.fraud_transaction import router as fraud
+from utils import model_registry
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    model_registry.get("fraud_transaction")
+    inp = fraud.TransactionInput(
+        transaction_date="2024-03-05 14:22:00", transaction_amount=120.5, quantity=2,
+        customer_age=34, account_age_days=200, shipping_address="a", billing_address="b",
+        payment_method="credit card", product_category="electronics",
+        customer_location=fraud.encoder_index["Customer Location"].classes[0], device_used="mobile",
+    )
+    old = timed(lambda: fraud.build_batch_df([inp]), args.repeat)
+    new = timed(lambda: fraud.build_input_row(inp), args.repeat)
+    print("one /predict row")
+    print(f"  build_batch_df([inp])  {old:8.3f} ms")
+    print(f"  build_input_row(inp)   {new:8.3f} ms  ({old / new:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Async HTTP load generator for every endpoint family.
+
+    python -m benchmarks.load [--url http://host:port] [--only fraud phishing ...]
+                              [--concurrency 16] [--seconds 10] [--warmup 2]
+                              [--resolutions vga 1080p] [--workers 1] [--out PATH]
+
+Without --url it starts `uvicorn main:app` on a free local port (server
+log in benchmarks/results/load-server.log), waits until every model has
+finished loading or failed, and stops the server afterwards. Each scenario
+then runs `concurrency` keep-alive HTTP/1.1 connections in a closed loop
+for warmup + seconds, using a small asyncio client so the generator
+itself stays cheap, and reports throughput and p50/p95/p99 latency of
+the 2xx responses after warmup.
+
+Request bodies come from benchmarks.synthetic. Phishing bodies and images
+are made unique per request (a reference suffix, trailing bytes after the
+image data that decoders ignore) so the score and result caches don't turn
+the run into a cache benchmark; phishing_email/predict:cached measures the
+cache on purpose. A scenario whose first request fails (model not
+downloaded, no ticker models) is recorded as skipped with the response.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks import results, synthetic
+
+BOUNDARY = "benchmarks-load-7d1c0b6f"
+
+
+class Scenario(NamedTuple):
+    name: str
+    path: str
+    body: Callable[[int], Tuple[bytes, str]]  # request number -> (body, content type)
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; just enough protocol for these endpoints."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=1 << 22)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
+
+    async def reopen(self):
+        await self.close()
+        await self.open()
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      content_type: Optional[str] = None) -> Tuple[int, bytes]:
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Length: {len(body)}\r\n"
+        if content_type:
+            head += f"Content-Type: {content_type}\r\n"
+        self.writer.writelines([head.encode("latin-1"), b"\r\n", body])
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("server closed the connection")
+        status = int(status_line.split(b" ", 2)[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value
+            elif name == b"connection":
+                close = value == b"close"
+
+        if chunked:
+            parts = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                parts.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            data = b"".join(parts)
+        elif length is not None:
+            data = await self.reader.readexactly(length)
+        else:
+            data, close = await self.reader.read(), True
+
+        if close:
+            await self.reopen()
+        return status, data
+
+
+# Request bodies
+
+def json_bodies(payloads: List) -> Callable[[int], Tuple[bytes, str]]:
+    encoded = [json.dumps(p).encode() for p in payloads]
+    return lambda i: (encoded[i % len(encoded)], "application/json")
+
+
+def unique_emails(n: int = 200) -> Callable[[int], Tuple[bytes, str]]:
+    texts = [e["text"] for e in synthetic.emails(n)]
+    return lambda i: (json.dumps({"text": f"{texts[i % n]} ref{i}"}).encode(), "application/json")
+
+
+def image_upload(resolution: str, field: str = "file") -> Callable[[int], Tuple[bytes, str]]:
+    data = synthetic.image(resolution)
+    prefix = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+              f"filename=\"{resolution}.jpg\"\r\nContent-Type: image/jpeg\r\n\r\n").encode()
+    suffix = f"\r\n--{BOUNDARY}--\r\n".encode()
+    content_type = f"multipart/form-data; boundary={BOUNDARY}"
+    # Bytes after the JPEG end marker are ignored by decoders but change the content hash
+    return lambda i: (b"".join([prefix, data, i.to_bytes(8, "big"), suffix]), content_type)
+
+
+def scenarios(tickers: List[str], resolutions: List[str]) -> List[Scenario]:
+    out = [
+        Scenario("fraud_transaction/predict", "/api/fraud/transaction/predict",
+                 json_bodies(synthetic.transactions(1000))),
+        Scenario("fraud_transaction/predict_batch:100", "/api/fraud/transaction/predict/batch",
+                 json_bodies([synthetic.transactions(100, seed=s) for s in range(20)])),
+        Scenario("fraud_insurance/predict", "/api/fraud/insurance/predict",
+                 json_bodies(synthetic.insurance_claims(1000))),
+        Scenario("fraud_insurance/predict_batch:100", "/api/fraud/insurance/predict/batch",
+                 json_bodies([synthetic.insurance_claims(100, seed=s) for s in range(20)])),
+        Scenario("house_price/predict", "/api/house/predict", json_bodies(synthetic.houses(1000))),
+        Scenario("house_price/predict_batch:100", "/api/house/predict/batch",
+                 json_bodies([synthetic.houses(100, seed=s) for s in range(20)])),
+        Scenario("phishing_email/predict", "/api/phishing/predict", unique_emails()),
+        Scenario("phishing_email/predict:cached", "/api/phishing/predict", json_bodies(synthetic.emails(1))),
+    ]
+    if tickers:
+        out.append(Scenario("stock_prediction/predict", f"/api/stocks/predict/{tickers[0]}",
+                            json_bodies([synthetic.stock_history(60, seed=s) for s in range(20)])))
+    for res in resolutions:
+        out.append(Scenario(f"image_colorization/predict:{res}", "/api/colorize/predict", image_upload(res)))
+        out.append(Scenario(f"diabetic_retinopathy/predict:{res}", "/api/medical/dr/predict", image_upload(res)))
+    return out
+
+
+# Running
+
+async def run_scenario(host: str, port: int, scenario: Scenario, concurrency: int,
+                       seconds: float, warmup: float) -> dict:
+    probe = Connection(host, port)
+    await probe.open()
+    try:
+        body, content_type = scenario.body(0)
+        status, data = await probe.request("POST", scenario.path, body, content_type)
+    finally:
+        await probe.close()
+    if not 200 <= status < 300:
+        return results.skipped(f"probe returned {status}: {data[:200].decode('utf-8', 'replace')}")
+
+    counter = itertools.count(1)
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    start = time.perf_counter()
+    measure_from, stop = start + warmup, start + warmup + seconds
+
+    async def worker():
+        conn = Connection(host, port)
+        await conn.open()
+        try:
+            while True:
+                sent = time.perf_counter()
+                if sent >= stop:
+                    return
+                body, content_type = scenario.body(next(counter))
+                try:
+                    status, _ = await conn.request("POST", scenario.path, body, content_type)
+                except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                    if sent >= measure_from:
+                        errors[type(e).__name__] += 1
+                    await conn.reopen()
+                    continue
+                if sent < measure_from:
+                    continue
+                if 200 <= status < 300:
+                    latencies.append(time.perf_counter() - sent)
+                else:
+                    errors[str(status)] += 1
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    if not latencies:
+        return results.skipped(f"no successful responses ({dict(errors)})")
+    case = results.summarize(latencies)
+    case.update(rps=round(len(latencies) / elapsed, 2), errors=sum(errors.values()),
+                error_kinds=dict(errors), concurrency=concurrency)
+    return case
+
+
+def get_json(url: str, timeout: float = 5.0) -> dict:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            return json.loads(r.read())
+    except urllib.error.HTTPError as e:  # /health/ready answers 503 until everything is up
+        return json.loads(e.read())
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, log_path) -> subprocess.Popen:
+    env = {**os.environ, "MODEL_PRELOAD": "background"}
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=results.ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_settled(base: str, timeout: float, server: Optional[subprocess.Popen] = None) -> dict:
+    """Wait until no model is pending or loading; returns the last /health/ready body."""
+    deadline = time.monotonic() + timeout
+    body: dict = {}
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            body = get_json(f"{base}/health/ready")
+        except (OSError, ValueError):
+            time.sleep(0.5)
+            continue
+        if all(m["state"] in ("ready", "failed") for m in body["models"].values()):
+            return body
+        time.sleep(1.0)
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--only", nargs="+", help="scenario prefixes to run")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--resolutions", nargs="+", default=["vga", "1080p"], choices=list(synthetic.RESOLUTIONS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting the server")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--out", help="result file (default benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        results.RESULTS_DIR.mkdir(exist_ok=True)
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers, results.RESULTS_DIR / "load-server.log")
+
+    try:
+        health = wait_until_settled(base, args.ready_timeout, server)
+        for name, model in health.get("models", {}).items():
+            print(f"model {name}: {model['state']}" + (f" ({model['error']})" if model.get("error") else ""))
+        tickers = get_json(f"{base}/api/stocks/tickers").get("tickers", [])
+
+        parts = urlsplit(base)
+        cases: Dict[str, dict] = {}
+        for scenario in scenarios(tickers, args.resolutions):
+            if args.only and not any(scenario.name.startswith(p) for p in args.only):
+                continue
+            cases[scenario.name] = asyncio.run(run_scenario(
+                parts.hostname, parts.port or 80, scenario, args.concurrency, args.seconds, args.warmup))
+            case = cases[scenario.name]
+            print(f"  {scenario.name}: {case.get('rps', case.get('reason'))}", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print()
+    results.print_table(cases, ("rps", "p50_ms", "p95_ms", "p99_ms", "errors"))
+    out = results.save("load", cases, vars(args), args.out)
+    print(f"\nsaved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cost of utils.metrics on the request path.
+
+    python -m benchmarks.metrics_overhead [--requests 2000]
+
+Times a metrics.stage() enter/exit and MetricsMiddleware around a no-op
+ASGI app (both per call), then compares the instrumentation a typical
+request pays (middleware + three stages) with the in-process latency of
+POST /api/fraud/transaction/predict, the cheapest instrumented model
+endpoint. The target is under 1%.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from utils import metrics
+
+RECORD = {
+    "transaction_date": "2024-03-05 14:22:00", "transaction_amount": 120.5, "quantity": 3,
+    "customer_age": 33, "account_age_days": 200, "shipping_address": "a", "billing_address": "b",
+    "payment_method": "credit card", "product_category": "electronics",
+    "customer_location": "x", "device_used": "mobile",
+}
+
+
+def per_call_us(fn, n: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def stage_us(n: int) -> float:
+    def one():
+        with metrics.stage("benchmark", "noop"):
+            pass
+    return per_call_us(one, n)
+
+
+def middleware_us(n: int) -> float:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/benchmark", "root_path": ""}
+    wrapped = metrics.MetricsMiddleware(app)
+
+    async def run(target):
+        start = time.perf_counter()
+        for _ in range(n):
+            await target(dict(scope), receive, send)
+        return time.perf_counter() - start
+
+    bare, instrumented = asyncio.run(run(app)), asyncio.run(run(wrapped))
+    return (instrumented - bare) / n * 1e6
+
+
+def request_ms(n: int):
+    import httpx
+    import main
+    from utils import model_registry
+
+    try:
+        model_registry.get("fraud_transaction")
+    except Exception as e:
+        print(f"request latency skipped ({e})")
+        return None
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            body = json.dumps(RECORD)
+            headers = {"content-type": "application/json"}
+            samples = []
+            for _ in range(n):
+                start = time.perf_counter()
+                r = await client.post("/api/fraud/transaction/predict", content=body, headers=headers)
+                samples.append(time.perf_counter() - start)
+                r.raise_for_status()
+            return float(np.median(samples)) * 1000
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    st = stage_us(100_000)
+    mw = middleware_us(20_000)
+    per_request = mw + 3 * st
+    print(f"stage() enter/exit         {st:8.2f} us")
+    print(f"MetricsMiddleware          {mw:8.2f} us")
+    print(f"middleware + 3 stages      {per_request:8.2f} us")
+
+    latency = request_ms(args.requests)
+    if latency is not None:
+        share = per_request / (latency * 1000) * 100
+        print(f"fraud_transaction /predict {latency * 1000:8.1f} us median -> instrumentation {share:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
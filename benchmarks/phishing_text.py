@@ -0,0 +1,127 @@
+"""
+phishing_email cleaning and scoring: the original clean_text + two pipeline
+passes vs TextNormalizer + score_texts (cold and cached).
+
+    python -m benchmarks.phishing_text [--sizes 1 10 100 1000] [--repeat 20]
+
+Sizes are KB of synthetic marketing email (words, URLs, addresses,
+punctuation, non-ASCII). Cleaning parity with the original three-regex
+implementation is checked first on edge cases and random emails. Scoring
+columns are skipped when the model is missing.
+"""
+import argparse
+import random
+import re
+import time
+
+import numpy as np
+
+from services.phishing_email.normalizer import (
+    ScoreCache, TextNormalizer, load_stopwords, score_texts,
+)
+
+EDGE_CASES = [
+    "", "   ", "http", "xhttp", "http:", "HTTP://EXAMPLE.COM/path", "see https://a.b/c?d=e now",
+    "a@b", "@b", "a@", "@", "@@", "a@http://b", "a@bhttpx", "foo@barhttp://x", "x@y@z",
+    "mail me: John.Doe@Example.com!", "pay$100 now!!!", "don't won't it's", "naïve café ÆØÅ İstanbul",
+    "tab\tnew\nline\r\nnbsp sep em", "1234 5678", "click.here@once http://x@y",
+]
+
+WORDS = ("you have won a free prize click the link below to claim your reward before it "
+         "expires account verify password bank urgent offer limited time unsubscribe").split()
+
+
+def reference_clean(text: str, stop_words) -> str:
+    # services/phishing_email/router.py clean_text before the normalizer
+    text = str(text).lower()
+    text = re.sub(r"http\S+", " url ", text)
+    text = re.sub(r"\S+@\S+", " email ", text)
+    text = re.sub(r"[^a-z\s]", " ", text)
+    return " ".join([word for word in text.split() if word not in stop_words])
+
+
+def synthetic_email(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, n = [], 0
+    while n < size:
+        r = rng.random()
+        if r < 0.03:
+            tok = f"https://promo{rng.randint(1, 99)}.example.com/c?id={rng.randint(1, 10**6)}"
+        elif r < 0.05:
+            tok = f"offers{rng.randint(1, 9)}@mail{rng.choice(['.com', '.net', ''])}"
+        elif r < 0.08:
+            tok = rng.choice(["$99.99!", "50%", "FREE!!!", "naïve", "—", "(limited)", "2024"])
+        else:
+            tok = rng.choice(WORDS)
+            tok = tok.upper() if rng.random() < 0.05 else tok
+        parts.append(tok)
+        n += len(tok) + 1
+    return " ".join(parts)[:size]
+
+
+def check_parity(normalize: TextNormalizer, stop_words) -> int:
+    samples = EDGE_CASES + [synthetic_email(2048, seed) for seed in range(200)]
+    for text in samples:
+        expected = reference_clean(text, stop_words)
+        got = normalize(text)
+        assert got == expected, f"{text[:80]!r}: {got[:80]!r} != {expected[:80]!r}"
+    return len(samples)
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+def load_model():
+    from services.phishing_email import router as phishing
+    from utils import model_registry
+    try:
+        model_registry.get("phishing_email")
+    except Exception as e:
+        print(f"scoring skipped ({e})")
+        return None
+    return phishing.model
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    stop_words = load_stopwords()
+    normalize = TextNormalizer(stop_words)
+    print(f"parity: {check_parity(normalize, stop_words)} texts identical")
+
+    model = load_model()
+    print(f"{'size':>7} {'clean old ms':>13} {'clean new ms':>13} {'score old ms':>13} "
+          f"{'score new ms':>13} {'cached ms':>10}")
+    for kb in args.sizes:
+        text = synthetic_email(kb * 1024, seed=kb)
+        repeat = max(3, args.repeat * 10 // (kb + 9))
+        clean_old = timed(lambda: reference_clean(text, stop_words), repeat)
+        clean_new = timed(lambda: normalize(text), repeat)
+        cells = ["-", "-", "-"]
+        if model is not None:
+            def old():
+                cleaned = reference_clean(text, stop_words)
+                model.predict_proba([cleaned])
+                model.predict([cleaned])
+
+            def cold():
+                score_texts(model, normalize, ScoreCache(0), [text])
+
+            cache = ScoreCache(16)
+            cells = [f"{timed(fn, repeat):.3f}" for fn in
+                     (old, cold, lambda: score_texts(model, normalize, cache, [text]))]
+        print(f"{kb:>5}KB {clean_old:>13.3f} {clean_new:>13.3f} {cells[0]:>13} {cells[1]:>13} {cells[2]:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Timing summaries and the JSON result files written by benchmarks.stages and
+benchmarks.load (compared with benchmarks.compare).
+
+A result file is {"kind", "env", "args", "cases": {name: case}} where a case
+is either {"status": "ok", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", ...}
+or {"status": "skipped", "reason"}. Files default to
+benchmarks/results/<kind>-<commit>[-dirty].json so runs on two commits sit
+side by side.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def summarize(seconds: Sequence[float]) -> dict:
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "status": "ok",
+        "n": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+    }
+
+
+def skipped(reason: str) -> dict:
+    return {"status": "skipped", "reason": reason}
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> dict:
+    commit = _git("rev-parse", "--short", "HEAD")
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": commit,
+        "dirty": bool(status),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "argv": sys.argv,
+    }
+
+
+def save(kind: str, cases: Dict[str, dict], args: dict, out: Optional[Path] = None) -> Path:
+    env = environment()
+    if out is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        name = f"{kind}-{env['commit'] or 'nogit'}{'-dirty' if env['dirty'] else ''}.json"
+        out = RESULTS_DIR / name
+    out = Path(out)
+    out.write_text(json.dumps({"kind": kind, "env": env, "args": args, "cases": cases}, indent=2) + "\n")
+    return out
+
+
+def load(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def print_table(cases: Dict[str, dict], columns: Sequence[str] = ("p50_ms", "p95_ms", "p99_ms")):
+    width = max([len(name) for name in cases] + [4])
+    print(f"{'case':<{width}} " + " ".join(f"{c:>10}" for c in columns))
+    for name, case in cases.items():
+        if case["status"] != "ok":
+            print(f"{name:<{width}} skipped: {case['reason']}")
+            continue
+        print(f"{name:<{width}} " + " ".join(_cell(case[c]) for c in columns))
+
+
+def _cell(value) -> str:
+    return f"{value:>10.3f}" if isinstance(value, float) else f"{value:>10}"
@@ -0,0 +1,332 @@
+"""
+In-process micro-benchmarks of every service's request stages.
+
+    python -m benchmarks.stages [--only fraud phishing ...] [--seconds 1]
+                                [--resolutions vga 1080p 12mp] [--no-load] [--out PATH]
+
+Cases are "<service>/<stage>[:<variant>]" and call the same functions the
+routers call per request (validate = pydantic parsing, features, inference,
+preprocess/postprocess for images, batch variants at 1000 rows) on inputs
+from benchmarks.synthetic. model/load:<name> times a cold
+model_registry.get() in a fresh interpreter. Cases needing a model that
+isn't on disk are recorded as skipped; colorization postprocess runs on a
+stubbed network output, so it's timed even without the model.
+
+Results are printed and saved as JSON (see benchmarks.results); compare two
+runs with benchmarks.compare.
+"""
+import argparse
+import importlib
+import json
+import logging
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks import results, synthetic
+from utils import model_registry
+
+BATCH_ROWS = 1000
+STOCK_ROWS = 500
+
+
+class Skip(Exception):
+    pass
+
+
+def requires(name: str):
+    """Load a registered model for a case, or skip the case."""
+    try:
+        return model_registry.get(name)
+    except Exception as e:
+        raise Skip(f"{name} unavailable: {e}")
+
+
+def fraud_transaction_cases():
+    from services.fraud_transaction import router as fraud
+    payload = synthetic.transactions(1)[0]
+    batch = [fraud.TransactionInput(**p) for p in synthetic.transactions(BATCH_ROWS, seed=1)]
+
+    def loaded():
+        requires("fraud_transaction")
+        return fraud
+
+    def features():
+        inp = fraud.TransactionInput(**payload)
+        return lambda: loaded().build_input_row(inp)
+
+    def inference():
+        row = loaded().build_input_row(fraud.TransactionInput(**payload))
+        return lambda: fraud._predict_rows([row])
+
+    def batch_features():
+        loaded()
+
+        def run():
+            dt, _ = fraud.parse_dates([inp.transaction_date for inp in batch])
+            return fraud.build_batch_df(batch, dt)
+        return run
+
+    def batch_inference():
+        X = batch_features()()
+        return lambda: fraud.model.predict_proba(X)
+
+    return {
+        "validate": lambda: lambda: fraud.TransactionInput(**payload),
+        "features": features,
+        "inference": inference,
+        f"batch_features:{BATCH_ROWS}": batch_features,
+        f"batch_inference:{BATCH_ROWS}": batch_inference,
+    }
+
+
+def fraud_insurance_cases():
+    from services.fraud_insurance import router as insurance
+    payload = synthetic.insurance_claims(1)[0]
+    batch = [insurance.InsuranceInput(**p) for p in synthetic.insurance_claims(BATCH_ROWS, seed=1)]
+
+    def features():
+        requires("fraud_insurance")
+        inp = insurance.InsuranceInput(**payload)
+        return lambda: insurance.build_input_df(inp)
+
+    def inference():
+        requires("fraud_insurance")
+        X = insurance.build_input_df(insurance.InsuranceInput(**payload))
+        return lambda: insurance._predict_frames([X])
+
+    def batch_features():
+        requires("fraud_insurance")
+        return lambda: insurance.build_batch_df(batch)
+
+    def batch_inference():
+        X = batch_features()()
+        return lambda: insurance.model.predict_proba(X)
+
+    return {
+        "validate": lambda: lambda: insurance.InsuranceInput(**payload),
+        "features": features,
+        "inference": inference,
+        f"batch_features:{BATCH_ROWS}": batch_features,
+        f"batch_inference:{BATCH_ROWS}": batch_inference,
+    }
+
+
+def house_price_cases():
+    from services.house_price import router as house
+    payload = synthetic.houses(1)[0]
+    rows = np.array([list(p.values()) for p in synthetic.houses(BATCH_ROWS, seed=1)], dtype=float)
+
+    def features():
+        requires("house_price")
+        inp = house.HouseData(**payload)
+        return lambda: house.scaler_house.transform(np.array(list(inp.dict().values())).reshape(1, -1))
+
+    def inference():
+        requires("house_price")
+        X = house.scaler_house.transform(np.array(list(payload.values()), dtype=float).reshape(1, -1))
+        return lambda: house.house_model.predict(X)
+
+    def batch_inference():
+        requires("house_price")
+        X = house.scaler_house.transform(rows)
+        return lambda: house.house_model.predict(X)
+
+    return {
+        "validate": lambda: lambda: house.HouseData(**payload),
+        "features": features,
+        "inference": inference,
+        f"batch_inference:{BATCH_ROWS}": batch_inference,
+    }
+
+
+def phishing_email_cases():
+    from services.phishing_email import router as phishing
+    from services.phishing_email.normalizer import ScoreCache, TextNormalizer, load_stopwords, score_texts
+    normalize = TextNormalizer(load_stopwords())
+    short, long = synthetic.emails(1, size=2048)[0], synthetic.emails(1, size=100 * 1024)[0]
+    batch = [e["text"] for e in synthetic.emails(100, seed=1)]
+
+    def inference():
+        requires("phishing_email")
+        cleaned = [normalize(short["text"])]
+        return lambda: phishing.model.predict_proba(cleaned)
+
+    def batch_scoring():
+        requires("phishing_email")
+        return lambda: score_texts(phishing.model, normalize, ScoreCache(0), batch)
+
+    return {
+        "validate": lambda: lambda: phishing.EmailInput(**short),
+        "features:2KB": lambda: lambda: normalize(short["text"]),
+        "features:100KB": lambda: lambda: normalize(long["text"]),
+        "inference": inference,
+        "batch_score:100": batch_scoring,
+    }
+
+
+def stock_prediction_cases():
+    from services.stock_prediction import router as stock
+    history = synthetic.stock_history(STOCK_ROWS)
+    data = [stock.StockData(**bar) for bar in history]
+
+    def inference():
+        requires("stock_prediction")
+        tickers = stock.ticker_models.tickers()
+        if not tickers:
+            raise Skip("no ticker models on disk")
+        booster = stock.ticker_models.get(tickers[0])
+        _, row = stock.prepare_last_row(data)
+        return lambda: booster.predict(row)
+
+    return {
+        f"validate:{STOCK_ROWS}": lambda: lambda: [stock.StockData(**bar) for bar in history],
+        f"features:{STOCK_ROWS}": lambda: lambda: stock.prepare_last_row(data),
+        "inference": inference,
+    }
+
+
+def image_colorization_cases(resolutions: List[str]):
+    from services.image_colorization import router as colorize
+    cases = {}
+    for res in resolutions:
+        def preprocess(res=res):
+            data = synthetic.image(res)
+            return lambda: colorize.decode_and_prepare(data)
+
+        def postprocess(res=res):
+            l, _ = colorize.decode_and_prepare(synthetic.image(res))
+            ab = np.zeros((56, 56, 2), dtype=np.float32)  # stubbed network output
+            return lambda: colorize.compose_output(l, ab)
+
+        cases[f"preprocess:{res}"] = preprocess
+        cases[f"postprocess:{res}"] = postprocess
+
+    def inference():
+        requires("image_colorization")
+        _, l_resized = colorize.decode_and_prepare(synthetic.image("vga"))
+        return lambda: colorize._forward_batch([l_resized])
+
+    cases["inference"] = inference
+    return cases
+
+
+def diabetic_retinopathy_cases(resolutions: List[str]):
+    from services.diabetic_retinopathy import router as dr
+    from services.diabetic_retinopathy.preprocess import preprocess_bytes
+    cases = {}
+    for res in resolutions:
+        def preprocess(res=res):
+            data = synthetic.image(res)
+            return lambda: preprocess_bytes(data)
+        cases[f"preprocess:{res}"] = preprocess
+
+    def inference():
+        predict = requires("diabetic_retinopathy")
+        img = preprocess_bytes(synthetic.image("vga"))
+        return lambda: predict(img)
+
+    cases["inference"] = inference
+    return cases
+
+
+LOAD_PROBE = r"""
+import json, logging, sys, time
+logging.disable(logging.WARNING)
+import main
+from utils import model_registry
+model_registry.downloads_complete.set()  # time the load, not the downloader
+start = time.perf_counter()
+try:
+    model_registry.get(sys.argv[1])
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+except Exception as e:
+    print(json.dumps({"error": str(e)}))
+"""
+
+
+def model_load_case(name: str) -> dict:
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", LOAD_PROBE, name],
+                         cwd=results.ROOT, capture_output=True, text=True)
+    lines = out.stdout.strip().splitlines()
+    if out.returncode != 0 or not lines:
+        return results.skipped(f"probe failed: {out.stderr.strip().splitlines()[-1:]}")
+    probe = json.loads(lines[-1])
+    if "error" in probe:
+        return results.skipped(f"{name} unavailable: {probe['error']}")
+    return results.summarize([probe["seconds"]])
+
+
+def measure(setup: Callable[[], Callable], seconds: float, max_iters: int = 100000) -> dict:
+    try:
+        fn = setup()
+    except Skip as e:
+        return results.skipped(str(e))
+    fn()  # warm up caches and lazy imports
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < max_iters:
+        start = time.perf_counter()
+        fn()
+        end = time.perf_counter()
+        samples.append(end - start)
+        if end > deadline and len(samples) >= 5:
+            break
+    return results.summarize(samples)
+
+
+def all_cases(resolutions: List[str]) -> Dict[str, Dict[str, Callable]]:
+    return {
+        "fraud_transaction": fraud_transaction_cases(),
+        "fraud_insurance": fraud_insurance_cases(),
+        "house_price": house_price_cases(),
+        "phishing_email": phishing_email_cases(),
+        "stock_prediction": stock_prediction_cases(),
+        "image_colorization": image_colorization_cases(resolutions),
+        "diabetic_retinopathy": diabetic_retinopathy_cases(resolutions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="+", help="services (or prefixes) to run")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per case")
+    parser.add_argument("--resolutions", nargs="+", default=["vga", "1080p", "12mp"],
+                        choices=list(synthetic.RESOLUTIONS))
+    parser.add_argument("--no-load", action="store_true", help="skip the cold model load cases")
+    parser.add_argument("--out", help="result file (default benchmarks/results/stages-<commit>.json)")
+    args = parser.parse_args()
+
+    # Unknown-category warnings would swamp the report
+    logging.disable(logging.WARNING)
+    model_registry.downloads_complete.set()  # never wait on a downloader that isn't running
+
+    def selected(service: str) -> bool:
+        return not args.only or any(service.startswith(s) for s in args.only)
+
+    importlib.import_module("main")  # registers every service's models
+    cases: Dict[str, dict] = {}
+    for service, service_cases in all_cases(args.resolutions).items():
+        if not selected(service):
+            continue
+        for stage, setup in service_cases.items():
+            name = f"{service}/{stage}"
+            cases[name] = measure(setup, args.seconds)
+            print(f"  {name}: {cases[name].get('p50_ms', cases[name].get('reason'))}", file=sys.stderr)
+
+    if not args.no_load:
+        for name in model_registry.status():
+            if selected(name):
+                cases[f"model/load:{name}"] = model_load_case(name)
+
+    print()
+    results.print_table(cases)
+    out = results.save("stages", cases, vars(args), args.out)
+    print(f"\nsaved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Last-row stock features: feature_engineering() vs the rolling engine.
+
+    python -m benchmarks.stock_features [--rows 500] [--repeat 200]
+
+Times one prediction's feature work on each path over a synthetic random
+walk. Parity with feature_engineering() is covered by
+tests/test_stock_rolling_features.py.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.stock_prediction.models.feature_engineering import feature_engineering
+from services.stock_prediction.rolling_features import (
+    FEATURE_COLUMNS, RollingFeatures, last_row_features,
+)
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Adj_Close", "Volume"]
+
+
+def synthetic_history(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    open_ = close * (1 + rng.normal(0, 0.005, rows))
+    return pd.DataFrame({
+        "Date": pd.bdate_range("2000-01-03", periods=rows).strftime("%Y-%m-%d"),
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.random(rows) * 0.01),
+        "Low": np.minimum(open_, close) * (1 - rng.random(rows) * 0.01),
+        "Close": close,
+        "Adj_Close": close,
+        "Volume": rng.integers(1e5, 1e7, rows).astype(float),
+    })
+
+
+def reference(df: pd.DataFrame) -> np.ndarray:
+    out = feature_engineering(df).rename(columns={"Adj_Close": "Adj Close"})
+    return out[FEATURE_COLUMNS].iloc[-1].to_numpy(dtype=float)
+
+
+def fast(df: pd.DataFrame) -> np.ndarray:
+    bars = df[BAR_COLUMNS].to_numpy()
+    return last_row_features(df["Date"].tolist(), lambda i: bars[i])[1]
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    df = synthetic_history(args.rows)
+    state = RollingFeatures()
+    for _, r in df.iloc[:-1].iterrows():
+        state.append(pd.Timestamp(r["Date"]), *r[BAR_COLUMNS])
+    last = df.iloc[-1]
+    last_date, last_bar = pd.Timestamp(last["Date"]), tuple(last[BAR_COLUMNS])
+
+    def append_one():
+        # re-append the same bar by rewinding the date check
+        state.last_date = last_date - pd.Timedelta(days=1)
+        state.append(last_date, *last_bar)
+
+    print(f"{args.rows} rows posted")
+    print(f"  feature_engineering   {timed(lambda: reference(df), args.repeat):8.3f} ms")
+    print(f"  last_row_features     {timed(lambda: fast(df), args.repeat):8.3f} ms")
+    print(f"  RollingFeatures.append{timed(append_one, args.repeat):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
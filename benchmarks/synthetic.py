@@ -0,0 +1,207 @@
+"""
+Synthetic request payloads for every service, shared by the stage and load
+benchmarks.
+
+Each generator is seeded and returns plain dicts (the JSON a client would
+post) that validate against the service's pydantic schema; check() builds
+the schemas from a sample of each to keep it that way. Categorical values
+come from the training vocabularies, with an `unknown_rate` share of
+values the encoders have never seen so the fuzzy / fallback paths get
+exercised too. Images are JPEG/PNG bytes at the named RESOLUTIONS.
+
+    python -m benchmarks.synthetic   # validate every generator
+"""
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.phishing_text import synthetic_email
+from benchmarks.stock_features import synthetic_history
+
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "vga": (640, 480),
+    "1080p": (1920, 1080),
+    "12mp": (4000, 3000),
+    "40mp": (7728, 5152),
+}
+
+# Faker-style city names, the shape of the transaction dataset's locations
+_FIRST_NAMES = ("Aaron", "Amanda", "Brian", "Christopher", "Daniel", "David", "Emily", "Jennifer",
+                "Jessica", "John", "Joseph", "Kevin", "Lisa", "Mark", "Michael", "Robert", "Sarah")
+_CITY_SUFFIXES = ("berg", "borough", "burgh", "bury", "chester", "fort", "haven", "land", "mouth",
+                  "port", "side", "stad", "ton", "view", "ville")
+
+_PAYMENT_METHODS = ("PayPal", "bank transfer", "credit card", "debit card")
+_PRODUCT_CATEGORIES = ("clothing", "electronics", "health & beauty", "home & garden", "toys & games")
+_DEVICES = ("mobile", "desktop", "tablet")
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+_INSURANCE_VOCAB = {
+    "policy_state": ("IL", "IN", "OH"),
+    "policy_csl": ("100/300", "250/500", "500/1000"),
+    "insured_sex": ("FEMALE", "MALE"),
+    "insured_education_level": ("Associate", "College", "High School", "JD", "MD", "Masters", "PhD"),
+    "insured_occupation": ("adm-clerical", "armed-forces", "craft-repair", "exec-managerial",
+                           "farming-fishing", "handlers-cleaners", "machine-op-inspct", "other-service",
+                           "priv-house-serv", "prof-specialty", "protective-serv", "sales",
+                           "tech-support", "transport-moving"),
+    "auto_make": ("Accura", "Audi", "BMW", "Chevrolet", "Dodge", "Ford", "Honda", "Jeep",
+                  "Mercedes", "Nissan", "Saab", "Suburu", "Toyota", "Volkswagen"),
+    "auto_model": ("3 Series", "92x", "93", "95", "A3", "A5", "Accord", "C300", "CRV", "Camry",
+                   "Civic", "Corolla", "Escape", "F150", "Forrestor", "Fusion", "Grand Cherokee",
+                   "Highlander", "Impreza", "Jetta", "Legacy", "M5", "MDX", "ML350", "Malibu",
+                   "Maxima", "Neon", "Passat", "Pathfinder", "RAM", "RSX", "Silverado", "TL",
+                   "Tahoe", "Ultima", "Wrangler", "X5", "X6"),
+}
+
+
+def _category(rng: random.Random, values, unknown_rate: float) -> str:
+    value = rng.choice(values)
+    return value + "zq" if rng.random() < unknown_rate else value
+
+
+def transactions(n: int, seed: int = 0, unknown_rate: float = 0.02) -> List[dict]:
+    """TransactionInput payloads."""
+    rng = random.Random(seed)
+    base = np.datetime64("2024-01-01T00:00:00")
+    out = []
+    for _ in range(n):
+        when = (base + np.timedelta64(rng.randrange(366 * 86400), "s")).item()
+        city = rng.choice(_FIRST_NAMES) + rng.choice(_CITY_SUFFIXES)
+        address = f"{rng.randint(1, 9999)} {rng.choice(_FIRST_NAMES)} Street"
+        out.append({
+            "transaction_date": when.strftime(rng.choice(_DATE_FORMATS)),
+            "transaction_amount": round(rng.lognormvariate(4.5, 1.0), 2),
+            "quantity": rng.randint(1, 5),
+            "customer_age": rng.randint(18, 80),
+            "account_age_days": rng.randint(1, 365),
+            "shipping_address": address,
+            "billing_address": address if rng.random() < 0.9 else address + " Apt 2",
+            "payment_method": rng.choice(_PAYMENT_METHODS),
+            "product_category": rng.choice(_PRODUCT_CATEGORIES),
+            "customer_location": city + "zq" if rng.random() < unknown_rate else city,
+            "device_used": rng.choice(_DEVICES),
+        })
+    return out
+
+
+def insurance_claims(n: int, seed: int = 0, unknown_rate: float = 0.02) -> List[dict]:
+    """InsuranceInput payloads."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        cat = {col: _category(rng, values, unknown_rate) for col, values in _INSURANCE_VOCAB.items()}
+        total = rng.uniform(1000, 100000)
+        injury, prop = rng.uniform(0, 0.3), rng.uniform(0, 0.3)
+        out.append({
+            "months_as_customer": rng.randint(0, 480),
+            "age": rng.randint(19, 64),
+            "policy_state": cat["policy_state"],
+            "policy_csl": cat["policy_csl"],
+            "policy_deductable": rng.choice((500, 1000, 2000)),
+            "policy_annual_premium": round(rng.uniform(400, 2000), 2),
+            "umbrella_limit": rng.choice((0, 0, 0, 2000000, 5000000)),
+            "insured_sex": cat["insured_sex"],
+            "insured_education_level": cat["insured_education_level"],
+            "insured_occupation": cat["insured_occupation"],
+            "vehicle_claim": round(total * (1 - injury - prop), 2),
+            "auto_make": cat["auto_make"],
+            "auto_model": cat["auto_model"],
+            "auto_year": rng.randint(1995, 2015),
+            "incident_month": rng.randint(1, 12),
+            "incident_day_of_week": rng.randint(0, 6),
+            "injury_ratio": round(injury, 4),
+            "property_ratio": round(prop, 4),
+            "vehicle_ratio": round(1 - injury - prop, 4),
+        })
+    return out
+
+
+def houses(n: int, seed: int = 0) -> List[dict]:
+    """HouseData payloads, fields in the schema's (= the scaler's) order."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        living = rng.uniform(400, 6000)
+        basement = living * rng.choice((0.0, 0.0, rng.uniform(0.1, 0.4)))
+        lot = living * rng.uniform(1.5, 10)
+        built = rng.randint(1900, 2015)
+        out.append({
+            "number_of_bedrooms": rng.randint(1, 6),
+            "number_of_bathrooms": rng.choice((1.0, 1.5, 2.0, 2.5, 3.0, 3.5)),
+            "living_area": round(living, 1),
+            "lot_area": round(lot, 1),
+            "number_of_floors": rng.choice((1.0, 1.5, 2.0, 3.0)),
+            "waterfront_present": int(rng.random() < 0.01),
+            "number_of_views": rng.randint(0, 4),
+            "condition_of_the_house": rng.randint(1, 5),
+            "grade_of_the_house": rng.randint(4, 12),
+            "area_excluding_basement": round(living - basement, 1),
+            "area_of_basement": round(basement, 1),
+            "built_year": built,
+            "renovation_year": rng.choice((0, 0, 0, rng.randint(built, 2015))),
+            "postal_code": rng.randint(122000, 122099),
+            "lattitude": round(rng.uniform(52.38, 53.0), 4),
+            "longitude": round(rng.uniform(-114.7, -113.5), 4),
+            "living_area_renov": round(living * rng.uniform(0.8, 1.2), 1),
+            "lot_area_renov": round(lot * rng.uniform(0.8, 1.2), 1),
+            "number_of_schools_nearby": rng.randint(1, 3),
+            "distance_from_airport": rng.randint(50, 80),
+        })
+    return out
+
+
+def emails(n: int, seed: int = 0, size: int = 2048) -> List[dict]:
+    """EmailInput payloads of `size` characters, every one distinct."""
+    return [{"text": synthetic_email(size, seed * 1000003 + i)} for i in range(n)]
+
+
+def stock_history(rows: int, seed: int = 0) -> List[dict]:
+    """A List[StockData] body: `rows` consecutive business days."""
+    return synthetic_history(rows, seed).to_dict("records")
+
+
+def image(resolution: str = "vga", seed: int = 0, ext: str = ".jpg") -> bytes:
+    """A photo-like encoded image (smooth gradients plus sensor noise) at RESOLUTIONS[resolution]."""
+    import cv2 as cv
+    w, h = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    y, x = np.ogrid[0:1:complex(0, h), 0:1:complex(0, w)]
+    img = np.empty((h, w, 3), dtype=np.float32)
+    for c in range(3):
+        fx, fy, phase = rng.uniform(1, 6, 3)
+        img[:, :, c] = 127 + 100 * np.sin(fx * 6.28 * x + phase) * np.cos(fy * 6.28 * y)
+    img += rng.normal(0, 8, (h, w, 1)).astype(np.float32)
+    ok, buf = cv.imencode(ext, np.clip(img, 0, 255).astype(np.uint8))
+    if not ok:
+        raise RuntimeError(f"Could not encode {ext}")
+    return buf.tobytes()
+
+
+def check():
+    """Validate a sample of every generator against the services' pydantic schemas."""
+    from services.fraud_insurance.router import InsuranceInput
+    from services.fraud_transaction.router import TransactionInput
+    from services.house_price.router import HouseData
+    from services.phishing_email.router import EmailInput
+    from services.stock_prediction.router import StockData
+
+    cases = [
+        (TransactionInput, transactions(50)),
+        (InsuranceInput, insurance_claims(50)),
+        (HouseData, houses(50)),
+        (EmailInput, emails(5)),
+        (StockData, stock_history(50)),
+    ]
+    for schema, payloads in cases:
+        for payload in payloads:
+            schema(**payload)
+        assert list(schema.model_fields) == list(payloads[0]), f"{schema.__name__} field order"
+    return [schema.__name__ for schema, _ in cases]
+
+
+if __name__ == "__main__":
+    print("valid:", ", ".join(check()))
+    for name in RESOLUTIONS:
+        print(f"image {name}: {len(image(name)) / 1e6:.2f} MB jpeg")
@@ -0,0 +1,87 @@
+"""
+Library vs compiled (utils.tree_compiler) latency for the tree-ensemble services.
+
+    python -m benchmarks.tree_predictor [--rows 1 16 1000] [--repeat 200]
+
+Inputs are DataFrames with the model's feature names, as the fraud routers
+pass them (the stock router passes a NumPy row). Each model is verified for
+parity before timing; models missing from the tree are skipped. The
+compiled column is the pure NumPy path (no library fallback), which is
+what picks TREE_COMPILED_MAX_ROWS.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import artifacts
+from utils.tree_compiler import compile_model, parity_sample, verify
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_models():
+    def fraud_transaction():
+        return artifacts.load(ROOT / "services/fraud_transaction/models/catboost_fraud_model.pkl")
+
+    def fraud_insurance():
+        return artifacts.load(ROOT / "services/fraud_insurance/models/fraud_model_top_features.pkl")
+
+    def stock(filename):
+        def load():
+            import xgboost as xgb
+            model = xgb.XGBRegressor()
+            model.load_model(str(ROOT / "services/stock_prediction/models" / filename))
+            return model
+        return load
+
+    return [
+        ("fraud_transaction (catboost)", fraud_transaction, "predict_proba", True),
+        ("fraud_insurance (lightgbm)", fraud_insurance, "predict_proba", True),
+        ("stock_default (xgboost)", stock("xgb_best_model.json"), "predict", False),
+    ]
+
+
+def timed(fn, X, repeat: int) -> float:
+    fn(X)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 16, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    header = "".join(f"{f'{n} rows ms':>13}" for n in args.rows)
+    print(f"{'model':<30} {'path':<9}{header} {'max |diff|':>11}")
+    for name, load, method, as_frame in load_models():
+        try:
+            model = load()
+        except Exception as e:
+            print(f"{name:<30} skipped ({e})")
+            continue
+        compiled = compile_model(model)
+        diff = verify(model, compiled)
+
+        X = parity_sample(compiled, len(compiled.feature_names), max(args.rows), seed=1)
+        if as_frame:
+            X = pd.DataFrame(X, columns=compiled.feature_names)
+
+        for label, m in (("library", model), ("compiled", compiled)):
+            fn = getattr(m, method)
+            cells = "".join(
+                f"{timed(fn, X[:n], max(1, args.repeat * 10 // (n + 9))):>13.3f}" for n in args.rows
+            )
+            print(f"{name:<30} {label:<9}{cells} {diff if label == 'compiled' else 0.0:>11.2g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-worker memory with and without master preloading (Linux only).
+
+    python -m benchmarks.worker_memory [--workers 4] [--settle 60]
+
+Starts serve.py twice (--no-preload, then preloaded), waits for the models
+to load, and reads /proc/<pid>/smaps_rollup for every worker. Private
+memory is what each extra worker really costs; PSS splits shared pages
+fairly across the processes that map them.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def smaps_rollup(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    return out
+
+
+def children_of(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def measure(workers: int, port: int, preload: bool, settle: float) -> dict:
+    cmd = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--log-level", "warning"]
+    if not preload:
+        cmd.append("--no-preload")
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        deadline = time.time() + 600
+        while time.time() < deadline:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/health/live", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                time.sleep(0.5)
+        # let background loads in the workers finish
+        time.sleep(settle)
+
+        rows = [smaps_rollup(pid) for pid in children_of(proc.pid)]
+        master = smaps_rollup(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    private = [r.get("Private_Clean", 0) + r.get("Private_Dirty", 0) for r in rows]
+    return {
+        "master_rss_mb": master.get("Rss", 0),
+        "worker_rss_mb": sum(r.get("Rss", 0) for r in rows) / len(rows),
+        "worker_pss_mb": sum(r.get("Pss", 0) for r in rows) / len(rows),
+        "worker_private_mb": sum(private) / len(private),
+        "total_pss_mb": master.get("Pss", 0) + sum(r.get("Pss", 0) for r in rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--settle", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("needs Linux /proc/<pid>/smaps_rollup")
+
+    print(f"{'mode':<12} {'rss/worker':>11} {'pss/worker':>11} {'private/worker':>15} {'total pss':>10}")
+    for preload in (False, True):
+        r = measure(args.workers, args.port, preload, args.settle)
+        mode = "preload" if preload else "no-preload"
+        print(f"{mode:<12} {r['worker_rss_mb']:>10.1f}M {r['worker_pss_mb']:>10.1f}M "
+              f"{r['worker_private_mb']:>14.1f}M {r['total_pss_mb']:>9.1f}M")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,24 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+import os, threading
 
 # 🔽 Model downloader
 from utils.model_downloader import download_all_models
+from utils import batcher, executors, metrics, model_registry, profiler
 
 # 🔽 Ensure runtime folders exist
 Path("results").mkdir(exist_ok=True)
 Path("models").mkdir(exist_ok=True)
 
-# 🔽 Download missing models safely BEFORE importing routers
-try:
-    download_all_models()
-except Exception as e:
-    print(f"⚠️ Warning: Some models could not be downloaded: {e}")
+# 🔽 "background": load every model in parallel threads at startup
+#    "lazy": load each model on its first request (MODEL_REQUIRED ones at startup)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "background")
 
-# 🔽 Now import routers (safe because models exist)
+# 🔽 Routers only register their models here; nothing heavy is loaded at import
 from services.image_colorization.router import router as colorize_router
 from services.stock_prediction.router import router as stock_router
 from services.house_price.router import router as house_router
@@ -25,7 +27,28 @@ from services.fraud_insurance.router import router as fraud_ins_router
 from services.phishing_email.router import router as phishing_router
 from services.diabetic_retinopathy.router import router as dr_router
 
-app = FastAPI(title="Unified ML Backend")
+
+def download_models():
+    # Models that need downloaded files wait on this before loading
+    try:
+        download_all_models()
+    except Exception as e:
+        print(f"⚠️ Warning: Some models could not be downloaded: {e}")
+    finally:
+        model_registry.downloads_complete.set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # serve.py's master downloads before forking; its workers only load
+    if os.getenv("SERVE_WORKER") != "1":
+        threading.Thread(target=download_models, name="model-download", daemon=True).start()
+    # lazy still loads MODEL_REQUIRED up front so readiness can be reached
+    model_registry.preload_background(lazy=MODEL_PRELOAD == "lazy")
+    yield
+
+
+app = FastAPI(title="Unified ML Backend", lifespan=lifespan)
 
 # 🔽 CORS middleware
 app.add_middleware(
@@ -36,6 +59,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🔽 Per-route latency / request counters for /metrics (in-process only)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 🔽 Opt-in stack sampling of slow / sampled requests (PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE)
+if profiler.ENABLED:
+    app.add_middleware(profiler.ProfilerMiddleware)
+
 # 🔽 Serve results folder
 app.mount("/results", StaticFiles(directory="results"), name="results")
 
@@ -51,3 +81,53 @@ app.include_router(dr_router, prefix="/api/medical/dr", tags=["Diabetic Retinopa
 @app.get("/")
 def root():
     return {"status": "Backend running successfully 🚀"}
+
+
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def health_ready():
+    readiness = model_registry.readiness()
+    body = {
+        **readiness,
+        "downloads_complete": model_registry.downloads_complete.is_set(),
+        "models": model_registry.status(),
+    }
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
+
+
+@app.get("/stats/inference")
+def inference_stats():
+    return {
+        "executors": executors.all_stats(),
+        "batchers": batcher.all_stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# 🔽 Captured profiles; only served while profiling is enabled
+if profiler.ENABLED:
+    @app.get("/debug/profiles", include_in_schema=False)
+    def list_profiles(limit: int = Query(50, ge=1, le=1000)):
+        return {"profiler": profiler.sampler.stats(), "records": profiler.sampler.records(limit)}
+
+    @app.get("/debug/profiles/{record_id}", include_in_schema=False)
+    def get_profile(record_id: str):
+        record = profiler.sampler.record(record_id)
+        if record is None:
+            raise HTTPException(404, "Unknown profile")
+        return record
+
+    @app.get("/debug/profiles/{record_id}/collapsed", include_in_schema=False)
+    def get_profile_collapsed(record_id: str):
+        record = profiler.sampler.record(record_id)
+        if record is None:
+            raise HTTPException(404, "Unknown profile")
+        return PlainTextResponse(profiler.collapsed(record))
@@ -0,0 +1,138 @@
+"""
+Production launcher: load models once in the master, then fork workers.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Unlike `uvicorn main:app --workers N` (which spawns fresh interpreters that
+each unpickle every model), forked workers share the master's loaded
+models copy-on-write. gc.freeze() keeps the collector from touching, and
+so copying, those pages. NumPy artifacts loaded through utils.mmap_arrays
+are file-backed and shared regardless.
+
+TensorFlow is not fork-safe once its runtime has started, so the DR model
+is left to load inside each worker by default (--preload-skip).
+
+The master always downloads the model files before forking; workers skip
+main.py's download thread and only preload what the master didn't attempt
+(SERVE_WORKER=1). A worker that exits is replaced until the master is
+told to stop.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-preload", action="store_true",
+                        help="don't load models before forking (baseline for benchmarks)")
+    parser.add_argument("--preload-skip", default="diabetic_retinopathy",
+                        help="comma-separated models to leave to the workers")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--respawn-delay", type=float, default=1.0,
+                        help="seconds to wait before replacing a worker that died right after starting")
+    return parser.parse_args()
+
+
+def run_worker(app, sock: socket.socket, args):
+    config = uvicorn.Config(app, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # main.py's lifespan: no second download, no reloading what the master loaded
+        os.environ["SERVE_WORKER"] = "1"
+        code = 1
+        try:
+            run_worker(app, sock, args)
+            code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+def describe_exit(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"killed by signal {os.WTERMSIG(status)}"
+    return f"exit code {os.WEXITSTATUS(status)}"
+
+
+def main():
+    args = parse_args()
+
+    import main as backend
+    from utils import model_registry
+
+    # Download once here, never in the workers
+    backend.download_models()
+    if not args.no_preload:
+        skip = [s for s in args.preload_skip.split(",") if s]
+        model_registry.preload_all(skip=skip)
+        for name, st in model_registry.status().items():
+            print(f"  {name}: {st['state']}" + (f" ({st['load_seconds']}s)" if st["load_seconds"] else ""))
+
+    # Move everything loaded so far out of the GC's reach before forking
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {}  # pid -> start time
+    for _ in range(args.workers):
+        children[spawn_worker(backend.app, sock, args)] = time.monotonic()
+
+    print(f"✅ Serving on http://{args.host}:{args.port} with {len(children)} workers (master pid {os.getpid()})")
+
+    stopping = False
+
+    def shutdown(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+
+        print(f"⚠️ Worker {pid} {describe_exit(status)}, starting a replacement")
+        # Don't spin when workers die on startup (bad config, port trouble)
+        if time.monotonic() - started < args.respawn_delay:
+            time.sleep(args.respawn_delay)
+        if not stopping:
+            children[spawn_worker(backend.app, sock, args)] = time.monotonic()
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Inference backends for the DR model.
+
+    keras       tf.keras model.predict (original path)
+    savedmodel  dr_model.h5 exported once to a SavedModel with a fixed
+                (None,150,150,3) float32 signature, called directly
+    tflite      dr_model.h5 converted once to TFLite (DR_TFLITE_QUANTIZE=1
+                for dynamic-range int8 weights), run with the TFLite interpreter
+
+Exported artifacts are written next to dr_model.h5 and reused on later starts.
+Workers share one export: the first takes a lock, writes to a temp name and
+renames it into place; the rest wait and load the finished file.
+Each predictor takes an (N,150,150,3) float32 array and returns (N,) scores.
+Predictors are not thread safe; the router drives them from one batcher thread.
+"""
+from pathlib import Path
+from typing import Callable
+import os
+import shutil
+import numpy as np
+import tensorflow as tf
+
+from utils.model_downloader import file_lock
+from .preprocess import IMG_SIZE
+
+BACKENDS = ("keras", "savedmodel", "tflite")
+
+INPUT_SPEC = tf.TensorSpec((None, *IMG_SIZE, 3), tf.float32, name="image")
+
+
+def _load_keras(model_path: Path) -> Callable[[np.ndarray], np.ndarray]:
+    model = tf.keras.models.load_model(str(model_path))
+    return lambda x: model.predict(x, verbose=0)[:, 0]
+
+
+def _export_once(path: Path, export: Callable[[Path], None]):
+    """Run export(tmp) and rename tmp to path, unless another worker already has."""
+    with file_lock(path.with_name(path.name + ".lock")):
+        if path.exists():
+            return
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            export(tmp)
+            os.replace(tmp, path)
+        finally:
+            if tmp.is_dir():
+                shutil.rmtree(tmp)
+            elif tmp.exists():
+                tmp.unlink()
+
+
+def export_savedmodel(model_path: Path, export_dir: Path):
+    model = tf.keras.models.load_model(str(model_path))
+    serve = tf.function(lambda image: model(image, training=False), input_signature=[INPUT_SPEC])
+    tf.saved_model.save(model, str(export_dir), signatures=serve.get_concrete_function())
+
+
+def _load_savedmodel(model_path: Path) -> Callable[[np.ndarray], np.ndarray]:
+    export_dir = model_path.with_name(model_path.stem + "_savedmodel")
+    if not export_dir.exists():
+        _export_once(export_dir, lambda tmp: export_savedmodel(model_path, tmp))
+
+    fn = tf.saved_model.load(str(export_dir)).signatures["serving_default"]
+    output_key = next(iter(fn.structured_outputs))
+
+    def predict(x: np.ndarray) -> np.ndarray:
+        return fn(image=tf.constant(x, dtype=tf.float32))[output_key].numpy()[:, 0]
+
+    return predict
+
+
+def export_tflite(model_path: Path, out_path: Path, quantize: bool):
+    model = tf.keras.models.load_model(str(model_path))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        # dynamic-range quantization: int8 weights, float activations
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    out_path.write_bytes(converter.convert())
+
+
+def _load_tflite(model_path: Path, quantize: bool = False) -> Callable[[np.ndarray], np.ndarray]:
+    suffix = "_int8.tflite" if quantize else ".tflite"
+    tflite_path = model_path.with_name(model_path.stem + suffix)
+    if not tflite_path.exists():
+        _export_once(tflite_path, lambda tmp: export_tflite(model_path, tmp, quantize))
+
+    interpreter = tf.lite.Interpreter(model_path=str(tflite_path))
+    interpreter.allocate_tensors()
+    inp = interpreter.get_input_details()[0]["index"]
+    out = interpreter.get_output_details()[0]["index"]
+
+    def predict(x: np.ndarray) -> np.ndarray:
+        # Fixed (1,150,150,3) input avoids reallocating tensors per batch size
+        scores = np.empty(len(x), dtype=np.float32)
+        for i in range(len(x)):
+            interpreter.set_tensor(inp, x[i:i + 1])
+            interpreter.invoke()
+            scores[i] = interpreter.get_tensor(out)[0, 0]
+        return scores
+
+    return predict
+
+
+def load_predictor(backend: str, model_path: Path, quantize: bool = False):
+    if backend not in BACKENDS:
+        raise RuntimeError(f"Unknown DR backend '{backend}', expected one of {BACKENDS}")
+    if backend == "savedmodel":
+        return _load_savedmodel(model_path)
+    if backend == "tflite":
+        return _load_tflite(model_path, quantize)
+    return _load_keras(model_path)
@@ -1,11 +1,37 @@
+import io
 import numpy as np
-from tensorflow.keras.preprocessing.image import load_img, img_to_array
+from PIL import Image
 
 IMG_SIZE = (150, 150)
 
+
+def _decode_into(data, out: np.ndarray):
+    # Same decode/resize as keras load_img(target_size=IMG_SIZE): PIL, RGB, nearest
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB").resize((IMG_SIZE[1], IMG_SIZE[0]), Image.NEAREST)
+        out[...] = np.asarray(img)
+    out /= 255.0                # same normalization as training
+
+
+def preprocess_bytes(data, out: np.ndarray = None) -> np.ndarray:
+    """Decode an in-memory upload into a (1, 150, 150, 3) float32 tensor."""
+    if out is None:
+        out = np.empty((1, *IMG_SIZE, 3), dtype=np.float32)
+    _decode_into(data, out[0])
+    return out
+
+
+def preprocess_batch(buffers) -> np.ndarray:
+    """Decode N uploads straight into one (N, 150, 150, 3) float32 tensor."""
+    out = np.empty((len(buffers), *IMG_SIZE, 3), dtype=np.float32)
+    for i, data in enumerate(buffers):
+        try:
+            _decode_into(data, out[i])
+        except Exception as e:
+            raise ValueError(f"Image {i} could not be decoded: {e}") from e
+    return out
+
+
 def preprocess_image(image_path):
-    img = load_img(image_path, target_size=IMG_SIZE)
-    img = img_to_array(img)
-    img = img / 255.0           # same normalization as training
-    img = np.expand_dims(img, axis=0)
-    return img
+    with open(image_path, "rb") as f:
+        return preprocess_bytes(f.read())
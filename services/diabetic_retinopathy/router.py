@@ -1,9 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from pathlib import Path
-import tensorflow as tf
-import shutil
-import os
-from .preprocess import preprocess_image
+from typing import List
+import asyncio, os
+import numpy as np
+from .preprocess import preprocess_bytes, preprocess_batch
+from utils.batcher import MicroBatcher
+from utils.executors import get_executor
+from utils import metrics, model_registry
 
 router = APIRouter()
 
@@ -14,7 +17,11 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 MODEL_DIR = PROJECT_ROOT / "models" / "diabetic_retinopathy"
 MODEL_PATH = MODEL_DIR / "dr_model.h5"
 
-model = None  # lazy-loaded model
+# Inference backend: "keras" | "savedmodel" | "tflite" (see backends.py)
+DR_BACKEND = os.getenv("DR_BACKEND", "keras")
+DR_TFLITE_QUANTIZE = os.getenv("DR_TFLITE_QUANTIZE", "0") == "1"
+
+model = None  # lazy-loaded predictor: (N,150,150,3) -> (N,)
 
 def load_model():
     global model
@@ -24,30 +31,77 @@ def load_model():
     if not MODEL_PATH.exists():
         raise RuntimeError(f"Missing model file: {MODEL_PATH}")
 
-    model = tf.keras.models.load_model(str(MODEL_PATH))
+    # Imports TensorFlow; deferred so other services don't wait on it
+    from .backends import load_predictor
+
+    model = load_predictor(DR_BACKEND, MODEL_PATH, DR_TFLITE_QUANTIZE)
     return model
 
+model_registry.register("diabetic_retinopathy", load_model, needs_download=True)
+
+def _predict_images(imgs):
+    return model_registry.get("diabetic_retinopathy")(np.concatenate(imgs, axis=0))
+
+# Concurrent uploads share one model.predict call
+dr_batcher = MicroBatcher("diabetic_retinopathy", _predict_images, max_batch_size=16)
+
+# Image decode/resize runs here, never on the event loop
+dr_executor = get_executor("dr", max_workers=2, max_queue=16)
+
+def label(prediction: float) -> dict:
+    return {
+        "prediction": "Diabetic Retinopathy" if prediction > 0.5 else "No Diabetic Retinopathy",
+        "confidence": float(prediction)
+    }
+
 @router.post("/predict")
 async def predict(file: UploadFile = File(...)):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Upload an image file.")
 
-    temp_path = Path(f"temp_{file.filename}")
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    with metrics.stage("diabetic_retinopathy", "upload"):
+        data = await file.read()
 
     try:
-        img = preprocess_image(str(temp_path))
-        prediction = load_model().predict(img)[0][0]  # lazy-load model
+        with metrics.stage("diabetic_retinopathy", "preprocess"):
+            img = await dr_executor.run(preprocess_bytes, data)
+        with metrics.stage("diabetic_retinopathy", "inference"):
+            prediction = await dr_batcher.predict(img)  # lazy-loads model
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return label(prediction)
+
+@router.post("/predict/batch")
+async def predict_batch(files: List[UploadFile] = File(...)):
+    for f in files:
+        if not f.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"{f.filename} is not an image file.")
+
+    with metrics.stage("diabetic_retinopathy", "upload"):
+        buffers = [await f.read() for f in files]
+
+    try:
+        with metrics.stage("diabetic_retinopathy", "preprocess"):
+            batch = await dr_executor.run(preprocess_batch, buffers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Rows are coalesced back into (N,150,150,3) predict calls by the batcher
+        with metrics.stage("diabetic_retinopathy", "inference"):
+            preds = await asyncio.gather(
+                *[dr_batcher.predict(batch[i:i + 1]) for i in range(len(batch))]
+            )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        try:
-            os.remove(temp_path)
-        except Exception:
-            pass
 
     return {
-        "prediction": "Diabetic Retinopathy" if prediction > 0.5 else "No Diabetic Retinopathy",
-        "confidence": float(prediction)
+        "results": [
+            {"filename": f.filename, **label(p)} for f, p in zip(files, preds)
+        ]
     }
@@ -1,19 +1,45 @@
 # services/fraud_insurance/router.py
 from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pathlib import Path
+from collections import Counter
+from functools import lru_cache
+import difflib, json, logging, os, threading
 import pandas as pd
-import pickle, traceback
-import random
+import traceback
+
+from utils.batch import validate_records, merge_results
+from utils.batcher import MicroBatcher
+from utils import metrics, model_registry, artifacts
+from utils.mmap_arrays import mmap_attributes, ENCODER_ATTRS
+from utils.tree_compiler import maybe_compile
 
 router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
 SERVICE_DIR = Path(__file__).resolve().parent
 MODELS_DIR = SERVICE_DIR / "models"
 
 MODEL_PATH = MODELS_DIR / "fraud_model_top_features.pkl"
 ENCODERS_PATH = MODELS_DIR / "label_encoders_insurance.pkl"
 TOP_FEATURES_PATH = MODELS_DIR / "top_features.pkl"
+# {column: {class: training count}}; LabelEncoder doesn't keep frequencies, so
+# INSURANCE_UNSEEN_POLICY=most_frequent needs this file generated from the training data
+CLASS_FREQUENCIES_PATH = MODELS_DIR / "class_frequencies.json"
+
+# How unseen categories are resolved: "nearest" | "most_frequent" | "unknown"
+UNSEEN_POLICY = os.getenv("INSURANCE_UNSEEN_POLICY", "nearest")
+UNSEEN_POLICIES = ("nearest", "most_frequent", "unknown")
+UNKNOWN_CODE = -1
+UNSEEN_CACHE_SIZE = 4096
+
+if UNSEEN_POLICY not in UNSEEN_POLICIES:
+    raise RuntimeError(
+        f"Invalid INSURANCE_UNSEEN_POLICY '{UNSEEN_POLICY}', expected one of {UNSEEN_POLICIES}"
+    )
 
 categorical_cols = [
     "policy_state",
@@ -26,17 +52,99 @@ categorical_cols = [
 ]
 
 
-if not MODEL_PATH.exists():
-    raise RuntimeError("Missing model file")
+# Populated by load_artifacts() on first use / background preload
+model = label_encoders = top_features = None
+class_frequencies = {}
+encoder_tables = {}
+
 
-with open(MODEL_PATH, "rb") as f:
-    model = pickle.load(f)
+def build_encoder_table(column: str, encoder) -> dict:
+    """
+    Precompute code lookups for one fitted LabelEncoder. most_frequent is
+    None when there are no training counts for the column.
+    """
+    classes = [str(c) for c in encoder.classes_]
+    freqs = class_frequencies.get(column)
+    most_frequent = None
+    if freqs and classes:
+        most_frequent = max(range(len(classes)), key=lambda i: freqs.get(classes[i], 0))
+    return {
+        "classes": classes,
+        "codes": {c: i for i, c in enumerate(classes)},
+        # last class wins on case collisions
+        "lower": {c.lower(): i for i, c in enumerate(classes)},
+        "most_frequent": most_frequent,
+    }
 
-with open(ENCODERS_PATH, "rb") as f:
-    label_encoders = pickle.load(f)
 
-with open(TOP_FEATURES_PATH, "rb") as f:
-    top_features = pickle.load(f)
+def load_artifacts():
+    global model, label_encoders, top_features, class_frequencies, encoder_tables
+
+    # Native copies from models/artifacts.json when present, pickle otherwise
+    model = maybe_compile(artifacts.load(MODEL_PATH), "fraud_insurance")
+    label_encoders = artifacts.load(ENCODERS_PATH)
+
+    # Share fitted arrays across worker processes via mmap
+    for col, enc in label_encoders.items():
+        mmap_attributes(enc, f"fraud_insurance.{col}", ENCODERS_PATH, ENCODER_ATTRS)
+
+    top_features = artifacts.load(TOP_FEATURES_PATH)
+
+    if CLASS_FREQUENCIES_PATH.is_file():
+        with open(CLASS_FREQUENCIES_PATH) as f:
+            class_frequencies = json.load(f)
+
+    encoder_tables = {
+        col: build_encoder_table(col, label_encoders[col])
+        for col in categorical_cols if col in label_encoders
+    }
+
+    missing = sorted(col for col, t in encoder_tables.items() if t["most_frequent"] is None)
+    if missing and UNSEEN_POLICY == "most_frequent":
+        raise RuntimeError(
+            f"INSURANCE_UNSEEN_POLICY=most_frequent needs training counts in "
+            f"{CLASS_FREQUENCIES_PATH.name}, missing for: {', '.join(missing)}"
+        )
+    if missing and UNSEEN_POLICY == "nearest":
+        logger.warning(
+            f"No training counts in {CLASS_FREQUENCIES_PATH.name} for {', '.join(missing)}; "
+            f"unseen values with no close match there encode as {UNKNOWN_CODE}"
+        )
+    return model
+
+
+model_registry.register("fraud_insurance", load_artifacts)
+
+# (column, resolution) -> hits; resolution is "exact", "case_insensitive" or a policy
+encoding_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def _count(column: str, kind: str):
+    with _counts_lock:
+        encoding_counts[(column, kind)] += 1
+
+
+@lru_cache(maxsize=UNSEEN_CACHE_SIZE)
+def resolve_unseen(column: str, value: str) -> int:
+    """Deterministic code for a value not in the encoder's classes."""
+    table = encoder_tables[column]
+
+    if UNSEEN_POLICY == "unknown":
+        return UNKNOWN_CODE
+
+    if UNSEEN_POLICY == "most_frequent":
+        return table["most_frequent"]
+
+    # nearest string match on the lowercased classes
+    lower = value.lower()
+    match = difflib.get_close_matches(lower, list(table["lower"]), n=1, cutoff=0.0)
+    if match:
+        return table["lower"][match[0]]
+    return UNKNOWN_CODE if table["most_frequent"] is None else table["most_frequent"]
+
+
+metrics.register_lru_cache("fraud_insurance_unseen", resolve_unseen)
 
 
 class InsuranceInput(BaseModel):
@@ -61,37 +169,41 @@ class InsuranceInput(BaseModel):
     vehicle_ratio: float
 
 
-def safe_encode(encoder, value, column_name: str):
+def safe_encode(table: dict, value, column_name: str):
     """
     Safely encode categorical values.
-    Handles unseen labels without crashing.
+    Handles unseen labels without crashing, deterministically.
     """
     try:
         value = str(value).strip()
 
         # exact match
-        if value in encoder.classes_:
-            return encoder.transform([value])[0]
+        code = table["codes"].get(value)
+        if code is not None:
+            _count(column_name, "exact")
+            return code
 
         # case-insensitive match
-        lower_map = {c.lower(): c for c in encoder.classes_}
-        if value.lower() in lower_map:
-            return encoder.transform([lower_map[value.lower()]])[0]
+        code = table["lower"].get(value.lower())
+        if code is not None:
+            _count(column_name, "case_insensitive")
+            return code
 
-        # fallback → random known class
-        fallback = random.choice(list(encoder.classes_))
-        return encoder.transform([fallback])[0]
+        # fallback → configured policy (memoized)
+        _count(column_name, UNSEEN_POLICY)
+        return resolve_unseen(column_name, value)
 
     except Exception:
         # ultimate fallback
+        _count(column_name, "error")
         return 0
 
 def build_input_df(inp: InsuranceInput) -> pd.DataFrame:
     row = inp.dict()
 
     for col in categorical_cols:
-        if col in row and col in label_encoders:
-            row[col] = safe_encode(label_encoders[col], row[col], col)
+        if col in row and col in encoder_tables:
+            row[col] = safe_encode(encoder_tables[col], row[col], col)
 
     df = pd.DataFrame([row])
 
@@ -103,14 +215,58 @@ def build_input_df(inp: InsuranceInput) -> pd.DataFrame:
     df = df[top_features]
     return df
 
+def build_batch_df(inputs: List[InsuranceInput]) -> pd.DataFrame:
+    """Vectorized build_input_df: each distinct category is encoded once."""
+    df = pd.DataFrame([inp.dict() for inp in inputs])
+
+    for col in categorical_cols:
+        if col in df.columns and col in encoder_tables:
+            table = encoder_tables[col]
+            codes = {v: safe_encode(table, v, col) for v in pd.unique(df[col])}
+            df[col] = df[col].map(codes)
+
+    # ensure all top features exist
+    for col in top_features:
+        if col not in df.columns:
+            df[col] = 0
+
+    df = df[top_features]
+    return df
+
+@router.get("/encoding-stats")
+def encoding_stats():
+    with _counts_lock:
+        counts = dict(encoding_counts)
+
+    by_column = {}
+    for (col, kind), n in counts.items():
+        by_column.setdefault(col, {})[kind] = n
+
+    info = resolve_unseen.cache_info()
+    return {
+        "unseen_policy": UNSEEN_POLICY,
+        "counts": by_column,
+        "unseen_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize},
+    }
+
+def _predict_frames(frames: List[pd.DataFrame]):
+    return model.predict_proba(pd.concat(frames, ignore_index=True))[:, 1]
+
+
+# Concurrent /predict calls share one predict_proba call
+insurance_batcher = MicroBatcher("fraud_insurance", _predict_frames)
+
 @router.post("/predict")
-def predict(
+async def predict(
     input: InsuranceInput,
     threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0)
 ):
     try:
-        X = build_input_df(input)
-        prob = model.predict_proba(X)[:, 1][0]
+        await model_registry.aget("fraud_insurance")
+        with metrics.stage("fraud_insurance", "features"):
+            X = await run_in_threadpool(build_input_df, input)
+        with metrics.stage("fraud_insurance", "inference"):
+            prob = await insurance_batcher.predict(X)
 
         return {
             "is_fraud": int(prob > threshold),
@@ -118,6 +274,44 @@ def predict(
             "threshold": float(threshold)
         }
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error: {e}\n{traceback.format_exc()}"
+        )
+
+
+@router.post("/predict/batch")
+def predict_batch(
+    records: List[Dict[str, Any]],
+    threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0)
+):
+    try:
+        model_registry.get("fraud_insurance")
+        with metrics.stage("fraud_insurance", "validate"):
+            items, indices, errors = validate_records(records, InsuranceInput)
+
+        results = []
+        if items:
+            with metrics.stage("fraud_insurance", "features"):
+                X = build_batch_df(items)
+            with metrics.stage("fraud_insurance", "inference"):
+                probs = model.predict_proba(X)[:, 1]
+            results = [
+                {
+                    "is_fraud": int(p > threshold),
+                    "fraud_probability": float(p),
+                    "threshold": float(threshold)
+                }
+                for p in probs
+            ]
+
+        return {"results": merge_results(len(records), indices, results, errors)}
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
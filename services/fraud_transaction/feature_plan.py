@@ -0,0 +1,77 @@
+"""
+Single-row feature assembly for /predict without pandas.
+
+Building one row through pandas (dict -> DataFrame, one-hot concat, column
+reindex, sklearn scaling on a slice) costs dozens of allocations. FeaturePlan
+resolves all of that once per loaded artifact set: where each computed
+feature lands in feature_columns, the scaler's mean/scale as vectors aligned
+with the numeric columns, and the device one-hot positions.
+A request then fills a copy of a zeroed float32 row template in place.
+
+Scaling is done in float64 exactly as StandardScaler.transform does it
+((x - mean) / scale) and only then stored as float32, which is the
+precision the tree models compare in anyway, so predictions are unchanged.
+"""
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEVICE_PREFIX = "Device Used_"
+
+# Order of the values passed to FeaturePlan.row()
+COMPUTED_FEATURES = [
+    "Transaction Amount", "Quantity", "Customer Age", "Account Age Days",
+    "Transaction Hour", "Transaction Weekday", "Transaction Month",
+    "Address Mismatch", "High Amount",
+    "Amount_per_AccountDay", "Total_Purchase_Value",
+    "Payment Method", "Product Category", "Customer Location",
+]
+
+
+def parse_date(value: str):
+    """datetime.fromisoformat for the common ISO case, pandas' parser for anything else."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return pd.to_datetime(value)
+
+
+class FeaturePlan:
+    def __init__(self, feature_columns: Sequence[str], device_used_columns: Sequence[str],
+                 numeric_cols: Sequence[str], scaler):
+        index = {col: i for i, col in enumerate(feature_columns)}
+        self.n_features = len(feature_columns)
+
+        # Computed features the model doesn't use are dropped, like df[feature_columns] did
+        src = [i for i, name in enumerate(COMPUTED_FEATURES) if name in index]
+        self.src = np.array(src, dtype=np.intp)
+        self.dst = np.array([index[COMPUTED_FEATURES[i]] for i in src], dtype=np.intp)
+
+        # Scaler vectors in numeric_cols order, whatever order the scaler was fitted in
+        fitted = list(getattr(scaler, "feature_names_in_", numeric_cols))
+        order = [fitted.index(col) for col in numeric_cols]
+        n = len(fitted)
+        mean = scaler.mean_ if getattr(scaler, "mean_", None) is not None and scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if getattr(scaler, "scale_", None) is not None and scaler.with_std else np.ones(n)
+        self.mean = np.asarray(mean, dtype=np.float64)[order]
+        self.scale = np.asarray(scale, dtype=np.float64)[order]
+        self.scaled = np.array([COMPUTED_FEATURES.index(col) for col in numeric_cols], dtype=np.intp)
+
+        self.device_index = {
+            col[len(DEVICE_PREFIX):]: index[col] for col in device_used_columns if col in index
+        }
+        self.template = np.zeros((1, self.n_features), dtype=np.float32)
+
+    def row(self, values: Sequence[float], device: Optional[str]) -> np.ndarray:
+        """(1, n_features) float32 model input from COMPUTED_FEATURES values and the raw device_used."""
+        raw = np.array(values, dtype=np.float64)
+        raw[self.scaled] = (raw[self.scaled] - self.mean) / self.scale
+
+        out = self.template.copy()
+        out[0, self.dst] = raw[self.src]
+        pos = self.device_index.get(device)
+        if pos is not None:
+            out[0, pos] = 1.0
+        return out
@@ -1,11 +1,23 @@
 # services/fraud_transaction/router.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pathlib import Path
-import joblib, json, pandas as pd, traceback
+import json, numpy as np, pandas as pd, traceback
+import os
 import random
 import logging
+import time
+
+from utils.batch import validate_records, merge_results
+from utils.category_index import CategoryIndex
+from utils.batcher import MicroBatcher
+from utils import metrics, model_registry, artifacts, profiler
+from utils.mmap_arrays import mmap_attributes, SCALER_ATTRS, ENCODER_ATTRS
+from utils.tree_compiler import maybe_compile
+from utils import streaming
+from .feature_plan import FeaturePlan, parse_date
 
 router = APIRouter()
 
@@ -22,6 +34,9 @@ ENCODERS_PATH = MODELS_DIR / "label_encoders.pkl"
 DEVICE_COLS_PATH = MODELS_DIR / "device_used_columns.json"
 THRESHOLD_PATH = MODELS_DIR / "high_amount_threshold.json"
 
+# Rows parsed, featurized and scored together by /predict/stream
+STREAM_CHUNK_ROWS = int(os.getenv("FRAUD_STREAM_CHUNK_ROWS", "10000"))
+
 numeric_cols = [
     'Transaction Amount', 'Quantity', 'Customer Age', 'Account Age Days',
     'Transaction Hour', 'Transaction Weekday', 'Transaction Month',
@@ -30,9 +45,11 @@ numeric_cols = [
 
 
 def load_artifact(path: Path, name: str):
-    if not path.is_file():
+    # Native copy from models/artifacts.json when present, pickle otherwise
+    try:
+        return artifacts.load(path)
+    except RuntimeError:
         raise RuntimeError(f"Missing {name} at: {path}")
-    return joblib.load(path)
 
 def load_json(path: Path, name: str):
     if not path.is_file():
@@ -41,16 +58,48 @@ def load_json(path: Path, name: str):
         return json.load(f)
 
 
-try:
-    model = load_artifact(MODEL_PATH, "Fraud model")
+# Populated by load_artifacts() on first use / background preload
+model = scaler = label_encoders = encoder_index = feature_plan = None
+feature_columns = device_used_columns = high_amount_threshold = None
+
+
+def load_artifacts():
+    global model, scaler, label_encoders, encoder_index, feature_plan
+    global feature_columns, device_used_columns, high_amount_threshold
+
+    model = maybe_compile(load_artifact(MODEL_PATH, "Fraud model"), "fraud_transaction")
     scaler = load_artifact(SCALER_PATH, "Scaler")
     label_encoders = load_artifact(ENCODERS_PATH, "Label encoders")
     feature_columns = load_json(FEATURES_PATH, "Feature columns")
     device_used_columns = load_json(DEVICE_COLS_PATH, "Device columns")
     high_amount_threshold = load_json(THRESHOLD_PATH, "High amount threshold")["threshold"]
+
+    # Share fitted arrays across worker processes via mmap
+    mmap_attributes(scaler, "fraud_transaction.scaler", SCALER_PATH, SCALER_ATTRS)
+    for col, enc in label_encoders.items():
+        mmap_attributes(enc, f"fraud_transaction.{col.replace(' ', '_')}", ENCODERS_PATH, ENCODER_ATTRS)
+
+    # Compile each encoder once so lookups don't touch sklearn per request
+    encoder_index = {col: CategoryIndex(enc.classes_) for col, enc in label_encoders.items()}
+    # Column positions and scaler vectors for the single-row path
+    feature_plan = FeaturePlan(feature_columns, device_used_columns, numeric_cols, scaler)
     print("✅ Fraud Transaction artifacts loaded successfully")
-except Exception as e:
-    print(f" Error loading fraud_transaction artifacts: {e}")
+    return model
+
+
+model_registry.register("fraud_transaction", load_artifacts)
+
+
+def _fuzzy_cache_stats() -> dict:
+    infos = [index.cache_info() for index in (encoder_index or {}).values()]
+    return {
+        "hits": sum(i.hits for i in infos),
+        "misses": sum(i.misses for i in infos),
+        "entries": sum(i.currsize for i in infos),
+    }
+
+
+metrics.register_cache("fraud_transaction_fuzzy", _fuzzy_cache_stats)
 
 
 class TransactionInput(BaseModel):
@@ -67,73 +116,119 @@ class TransactionInput(BaseModel):
     device_used: str
 
 
-def safe_encode(encoder, value, field):
+def safe_encode(index: CategoryIndex, value, field):
     # Normalize input
     norm_value = value.lower().replace(" ", "_")
 
     # 1️⃣ Exact match
-    if norm_value in encoder.classes_:
-        return encoder.transform([norm_value])[0]
+    code = index.exact(norm_value)
+    if code is not None:
+        return code
 
-    # 2️⃣ Closest / partial match
-    for cls in encoder.classes_:
-        if norm_value in cls or cls in norm_value:
-            logger.warning(
-                f"{field}: '{value}' not found, mapped to closest '{cls}'"
-            )
-            return encoder.transform([cls])[0]
+    # 2️⃣ Closest / partial match (n-gram index, LRU cached)
+    profiler.note(fuzzy_field=field, fuzzy_value_length=len(value))
+    code = index.fuzzy(norm_value)
+    if code is not None:
+        logger.warning(
+            f"{field}: '{value}' not found, mapped to closest '{index.classes[code]}'"
+        )
+        return code
 
     # 3️⃣ Random fallback
-    fallback = random.choice(list(encoder.classes_))
+    code = random.randrange(len(index))
     logger.warning(
-        f"{field}: '{value}' not found, using random fallback '{fallback}'"
+        f"{field}: '{value}' not found, using random fallback '{index.classes[code]}'"
     )
 
-    return encoder.transform([fallback])[0]
-
-def build_input_df(inp: TransactionInput) -> pd.DataFrame:
-    dt = pd.to_datetime(inp.transaction_date)
-
-    row = {
-        "Transaction Amount": inp.transaction_amount,
-        "Quantity": inp.quantity,
-        "Customer Age": inp.customer_age,
-        "Account Age Days": inp.account_age_days,
-        "Transaction Hour": dt.hour,
-        "Transaction Weekday": dt.weekday(),
-        "Transaction Month": dt.month,
-        "Address Mismatch": int(inp.shipping_address != inp.billing_address),
-        "High Amount": int(inp.transaction_amount > high_amount_threshold)
-    }
+    return code
+
+def build_input_row(inp: TransactionInput) -> np.ndarray:
+    """Single-row build_batch_df through the precompiled FeaturePlan (no pandas)."""
+    dt = parse_date(inp.transaction_date)
+    amount = float(inp.transaction_amount)
+
+    return feature_plan.row([
+        amount,
+        inp.quantity,
+        inp.customer_age,
+        inp.account_age_days,
+        dt.hour,
+        dt.weekday(),
+        dt.month,
+        int(inp.shipping_address != inp.billing_address),
+        int(amount > high_amount_threshold),
+        amount / (inp.account_age_days + 1),
+        amount * inp.quantity,
+        # Safe label encoding (with fallback)
+        safe_encode(encoder_index["Payment Method"], inp.payment_method, "payment_method"),
+        safe_encode(encoder_index["Product Category"], inp.product_category, "product_category"),
+        safe_encode(encoder_index["Customer Location"], inp.customer_location, "customer_location"),
+    ], inp.device_used)
+
+
+def encode_column(index: CategoryIndex, values: pd.Series, field: str) -> np.ndarray:
+    # Encode each distinct value once, then broadcast to every row
+    uniques = pd.unique(values)
+    codes = {v: safe_encode(index, v, field) for v in uniques}
+    return values.map(codes).to_numpy()
+
 
-    row["Amount_per_AccountDay"] = row["Transaction Amount"] / (row["Account Age Days"] + 1)
-    row["Total_Purchase_Value"] = row["Transaction Amount"] * row["Quantity"]
+def parse_dates(dates: List[str]):
+    """
+    Vectorized date parsing. The bulk pass takes any ISO 8601 variant (a
+    format inferred from the first row would turn every other variant into
+    NaT); rows that fail it are retried one by one with pandas' guessing
+    parser, and rows that still fail are reported by position.
+    """
+    dt = pd.to_datetime(pd.Series(dates), errors="coerce", format="ISO8601")
+    errors = {}
+    for pos in np.flatnonzero(dt.isna().to_numpy()):
+        try:
+            dt.iloc[pos] = pd.to_datetime(dates[pos])
+        except Exception as e:
+            errors[int(pos)] = f"Invalid transaction_date: {e}"
+    return dt, errors
 
-    # Safe label encoding (with fallback)
-    row["Payment Method"] = safe_encode(
-        label_encoders["Payment Method"],
-        inp.payment_method,
-        "payment_method"
+
+def build_batch_df(inputs: List[TransactionInput], dt: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Vectorized build_input_df over many transactions."""
+    raw = pd.DataFrame([inp.dict() for inp in inputs])
+    if dt is None:
+        dt, _ = parse_dates(raw["transaction_date"].tolist())
+    return build_features(raw, dt)
+
+
+def build_features(raw: pd.DataFrame, dt: pd.Series) -> pd.DataFrame:
+    """Feature frame from TransactionInput columns and their parsed dates (positionally aligned)."""
+    df = pd.DataFrame({
+        "Transaction Amount": raw["transaction_amount"].astype(float),
+        "Quantity": raw["quantity"],
+        "Customer Age": raw["customer_age"],
+        "Account Age Days": raw["account_age_days"],
+        "Transaction Hour": dt.dt.hour.to_numpy(),
+        "Transaction Weekday": dt.dt.weekday.to_numpy(),
+        "Transaction Month": dt.dt.month.to_numpy(),
+        "Address Mismatch": (raw["shipping_address"] != raw["billing_address"]).astype(int),
+        "High Amount": (raw["transaction_amount"] > high_amount_threshold).astype(int),
+    })
+
+    df["Amount_per_AccountDay"] = df["Transaction Amount"] / (df["Account Age Days"] + 1)
+    df["Total_Purchase_Value"] = df["Transaction Amount"] * df["Quantity"]
+
+    df["Payment Method"] = encode_column(
+        encoder_index["Payment Method"], raw["payment_method"], "payment_method"
     )
-    row["Product Category"] = safe_encode(
-        label_encoders["Product Category"],
-        inp.product_category,
-        "product_category"
+    df["Product Category"] = encode_column(
+        encoder_index["Product Category"], raw["product_category"], "product_category"
     )
-    row["Customer Location"] = safe_encode(
-        label_encoders["Customer Location"],
-        inp.customer_location,
-        "customer_location"
+    df["Customer Location"] = encode_column(
+        encoder_index["Customer Location"], raw["customer_location"], "customer_location"
     )
 
-    df = pd.DataFrame([row])
-
     # One-hot encode devices
-    device_df = pd.DataFrame(columns=device_used_columns)
+    device = "Device Used_" + raw["device_used"]
     for col in device_used_columns:
-        device_df.loc[0, col] = 1 if col == f"Device Used_{inp.device_used}" else 0
-
-    df = pd.concat([df, device_df], axis=1)
+        df[col] = (device == col).astype(int)
 
     # Ensure all features exist
     for col in feature_columns:
@@ -141,22 +236,187 @@ def build_input_df(inp: TransactionInput) -> pd.DataFrame:
             df[col] = 0
 
     # Reorder & scale numeric
-    df = df[feature_columns]
+    df = df[feature_columns].copy()
     df[numeric_cols] = scaler.transform(df[numeric_cols])
 
     return df
 
 
+def _predict_rows(rows: List[np.ndarray]) -> np.ndarray:
+    return model.predict_proba(np.vstack(rows))[:, 1]
+
+
+# Concurrent /predict calls share one predict_proba call
+fraud_batcher = MicroBatcher("fraud_transaction", _predict_rows)
+
+
 @router.post("/predict")
-def predict(input: TransactionInput, threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0)):
+async def predict(input: TransactionInput, threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0)):
     try:
-        X = build_input_df(input)
-        prob = model.predict_proba(X)[:, 1][0]
+        await model_registry.aget("fraud_transaction")
+        with metrics.stage("fraud_transaction", "features"):
+            X = await run_in_threadpool(build_input_row, input)
+        with metrics.stage("fraud_transaction", "inference"):
+            prob = await fraud_batcher.predict(X)
         return {
             "is_fraud": int(prob > threshold),
             "probability": float(prob),
             "threshold": float(threshold)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         traceback_str = traceback.format_exc()
         raise HTTPException(status_code=500, detail=f"Error: {e}\n{traceback_str}")
+
+
+@router.post("/predict/batch")
+def predict_batch(
+    records: List[Dict[str, Any]],
+    threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0)
+):
+    try:
+        model_registry.get("fraud_transaction")
+        with metrics.stage("fraud_transaction", "validate"):
+            items, indices, errors = validate_records(records, TransactionInput)
+
+            # Drop rows with unparseable dates before the vectorized pass
+            dt, date_errors = parse_dates([inp.transaction_date for inp in items])
+            for pos, err in date_errors.items():
+                errors[indices[pos]] = err
+            keep = [p for p in range(len(items)) if p not in date_errors]
+            items = [items[p] for p in keep]
+            indices = [indices[p] for p in keep]
+            dt = dt.iloc[keep].reset_index(drop=True)
+
+        results = []
+        if items:
+            with metrics.stage("fraud_transaction", "features"):
+                X = build_batch_df(items, dt)
+            with metrics.stage("fraud_transaction", "inference"):
+                probs = model.predict_proba(X)[:, 1]
+            results = [
+                {
+                    "is_fraud": int(p > threshold),
+                    "probability": float(p),
+                    "threshold": float(threshold)
+                }
+                for p in probs
+            ]
+
+        return {"results": merge_results(len(records), indices, results, errors)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback_str = traceback.format_exc()
+        raise HTTPException(status_code=500, detail=f"Error: {e}\n{traceback_str}")
+
+
+def score_chunk(lines: List[bytes], fmt: str, header: Optional[List[str]],
+                start: int, threshold: float):
+    """Parse, featurize and score one chunk; returns (encoded output, scored, errors)."""
+    with metrics.stage("fraud_transaction", "validate"):
+        if fmt == "csv":
+            records, positions, errors = streaming.parse_csv(lines, header)
+        else:
+            records, positions, errors = streaming.parse_ndjson(lines)
+
+        frame, keep, field_errors = streaming.validate_rows(records, TransactionInput)
+        for pos, err in field_errors.items():
+            errors[positions[pos]] = err
+        positions = [positions[k] for k in keep]
+
+        dt, date_errors = parse_dates(frame["transaction_date"].tolist())
+        if date_errors:
+            ok = np.array([p not in date_errors for p in range(len(frame))])
+            for pos, err in date_errors.items():
+                errors[positions[pos]] = err
+            frame = frame[ok].reset_index(drop=True)
+            dt = dt[ok].reset_index(drop=True)
+            positions = [p for p, good in zip(positions, ok) if good]
+
+    probs = []
+    if len(frame):
+        with metrics.stage("fraud_transaction", "features"):
+            X = build_features(frame, dt)
+        with metrics.stage("fraud_transaction", "inference"):
+            probs = model.predict_proba(X)[:, 1]
+
+    rows = [None] * len(lines)
+    for pos, p in zip(positions, probs):
+        rows[pos] = (int(p > threshold), float(p), None)
+    for pos, err in errors.items():
+        rows[pos] = (None, None, err)
+
+    if fmt == "csv":
+        out = "".join(
+            f"{start + i},{'' if f is None else f},{'' if p is None else repr(p)},"
+            f"{'' if e is None else streaming.csv_field(e)}\n"
+            for i, (f, p, e) in enumerate(rows)
+        )
+    else:
+        out = "".join(
+            json.dumps({"index": start + i, "error": e} if e is not None else
+                       {"index": start + i, "is_fraud": f, "probability": p, "threshold": threshold}) + "\n"
+            for i, (f, p, e) in enumerate(rows)
+        )
+    return out.encode(), len(positions), len(errors)
+
+
+@router.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    threshold: Optional[float] = Query(0.3, ge=0.0, le=1.0),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+):
+    """
+    Bulk scoring for NDJSON or CSV uploads of any size (format from the
+    query or Content-Type). The body is parsed and scored in chunks of
+    FRAUD_STREAM_CHUNK_ROWS as it arrives, and results stream back in the
+    same format and order: {"index", "is_fraud", "probability", ...} or
+    {"index", "error"} lines for NDJSON, index,is_fraud,probability,error
+    rows for CSV. Rows are validated like /predict/batch records, so field
+    errors are the same pydantic error lists (as JSON text in CSV). A final
+    summary (a JSON line, or a '#' comment for CSV) reports rows/s.
+    """
+    try:
+        await model_registry.aget("fraud_transaction")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {e}")
+
+    fmt = streaming.detect_format(request.headers.get("content-type"), format)
+    body = request.stream()
+    leftover, header = b"", None
+    if fmt == "csv":
+        first, leftover = await streaming.read_first_line(body)
+        header = streaming.normalize_header(first.decode("utf-8", errors="replace").split(","))
+        missing = [f for f in TransactionInput.model_fields if f not in header]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"CSV header is missing columns: {missing}")
+
+    async def generate():
+        start = time.perf_counter()
+        rows = scored = failed = 0
+        if fmt == "csv":
+            yield b"index,is_fraud,probability,error\n"
+        async for lines in streaming.line_chunks(body, STREAM_CHUNK_ROWS, leftover):
+            out, ok, bad = await run_in_threadpool(score_chunk, lines, fmt, header, rows, threshold)
+            rows, scored, failed = rows + len(lines), scored + ok, failed + bad
+            yield out
+
+        seconds = time.perf_counter() - start
+        summary = {
+            "rows": rows,
+            "scored": scored,
+            "errors": failed,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+        }
+        logger.info(f"fraud_transaction stream: {summary}")
+        if fmt == "csv":
+            yield ("# " + json.dumps(summary) + "\n").encode()
+        else:
+            yield (json.dumps({"summary": summary}) + "\n").encode()
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return streaming.BodyStreamingResponse(generate(), media_type=media_type)
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from pathlib import Path
+from typing import Any, Dict, List
 import joblib
 import numpy as np
 
+from utils.batch import validate_records, merge_results
+from utils import metrics, model_registry
+from utils.mmap_arrays import mmap_attributes, SCALER_ATTRS
+
 router = APIRouter()
 
 # backend/
@@ -30,6 +35,12 @@ def load_models():
 
         house_model = joblib.load(HOUSE_MODEL_PATH)
         scaler_house = joblib.load(SCALER_PATH)
+        mmap_attributes(scaler_house, "house_price.scaler", SCALER_PATH, SCALER_ATTRS)
+
+    return house_model
+
+
+model_registry.register("house_price", load_models, needs_download=True)
 
 
 class HouseData(BaseModel):
@@ -59,13 +70,39 @@ class HouseData(BaseModel):
 def predict_house_price(data: HouseData):
     try:
         # ✅ Ensure models are loaded AFTER startup downloader
-        load_models()
+        model_registry.get("house_price")
 
-        arr = np.array(list(data.dict().values())).reshape(1, -1)
-        scaled = scaler_house.transform(arr)
-        pred = house_model.predict(scaled)[0]
+        with metrics.stage("house_price", "features"):
+            arr = np.array(list(data.dict().values())).reshape(1, -1)
+            scaled = scaler_house.transform(arr)
+        with metrics.stage("house_price", "inference"):
+            pred = house_model.predict(scaled)[0]
 
         return {"predicted_price": round(float(pred), 2)}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict/batch")
+def predict_house_price_batch(records: List[Dict[str, Any]]):
+    try:
+        model_registry.get("house_price")
+
+        with metrics.stage("house_price", "validate"):
+            items, indices, errors = validate_records(records, HouseData)
+
+        results = []
+        if items:
+            with metrics.stage("house_price", "features"):
+                arr = scaler_house.transform(np.array([list(d.dict().values()) for d in items], dtype=float))
+            with metrics.stage("house_price", "inference"):
+                preds = house_model.predict(arr)
+            results = [{"predicted_price": round(float(p), 2)} for p in preds]
+
+        return {"results": merge_results(len(records), indices, results, errors)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
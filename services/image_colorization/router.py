@@ -1,10 +1,18 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from pathlib import Path
+import hashlib, logging, os, queue, struct, threading
 import numpy as np
-import cv2 as cv
+
+from utils.batcher import MicroBatcher
+from utils.executors import get_executor
+from utils.result_store import ResultStore
+from utils.mmap_arrays import cached_array
+from utils import metrics, model_registry, profiler
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 SERVICE_MODEL_DIR = PROJECT_ROOT / "services" / "image_colorization" / "models"
@@ -14,80 +22,320 @@ CAFFEMODEL_PATH = DOWNLOADED_MODEL_DIR / "colorization_release_v2.caffemodel"
 PROTOTXT_PATH = SERVICE_MODEL_DIR / "colorization_deploy_v2.prototxt"
 PTS_PATH = SERVICE_MODEL_DIR / "pts_in_hull.npy"
 
-net_color = None
+# Served by main.py at /results; capped so it can't grow without bound
+RESULTS_DIR = Path("results")
+RESULTS_MAX_BYTES = int(os.getenv("RESULTS_MAX_BYTES", str(512 * 1024 * 1024)))
 
+# Full-resolution work is done in row strips so peak memory tracks the strip
+# size, not the image size. 0 disables the output resolution cap.
+STRIP_ROWS = int(os.getenv("COLORIZE_STRIP_ROWS", "256"))
+MAX_OUTPUT_PIXELS = int(os.getenv("COLORIZE_MAX_OUTPUT_PIXELS", "0"))
 
-def load_model():
-    global net_color
+# DNN settings. Each pooled Net serves one batch at a time (a cv.dnn Net is
+# not safe for concurrent setInput/forward), so throughput scales with N.
+NET_POOL_SIZE = int(os.getenv("COLORIZE_NET_POOL_SIZE", "1"))
+DNN_BACKEND = os.getenv("COLORIZE_DNN_BACKEND", "opencv")  # "opencv" | "openvino"
+DNN_FP16 = os.getenv("COLORIZE_FP16", "0") == "1"
+# 0 = split cores evenly across the pooled nets
+CV_THREADS = int(os.getenv("COLORIZE_CV_THREADS", "0"))
+
+FP16_CAFFEMODEL_PATH = CAFFEMODEL_PATH.with_name(CAFFEMODEL_PATH.stem + "_fp16.caffemodel")
+
+net_pool = None
+_pool_lock = threading.Lock()
+
+
+def _backend_and_target():
+    import cv2 as cv
+    backend = cv.dnn.DNN_BACKEND_OPENCV
+    if DNN_BACKEND == "openvino":
+        ie = cv.dnn.DNN_BACKEND_INFERENCE_ENGINE
+        if cv.dnn.DNN_TARGET_CPU in cv.dnn.getAvailableTargets(ie):
+            backend = ie
+        else:
+            logger.warning("OpenVINO backend not available in this OpenCV build, using OpenCV CPU")
+    elif DNN_BACKEND != "opencv":
+        raise RuntimeError(f"Unknown COLORIZE_DNN_BACKEND '{DNN_BACKEND}'")
+
+    target = cv.dnn.DNN_TARGET_CPU
+    if DNN_FP16 and hasattr(cv.dnn, "DNN_TARGET_CPU_FP16"):
+        target = cv.dnn.DNN_TARGET_CPU_FP16
+    return backend, target
 
-    if net_color is not None:
-        return net_color
+
+def load_pts() -> np.ndarray:
+    # Exported once as the float32 (2, 313, 1, 1) blob the layer takes, then
+    # mmapped, so every pooled net and worker shares the same pages
+    return cached_array(
+        "image_colorization.pts_in_hull", PTS_PATH,
+        lambda: np.load(PTS_PATH).transpose().reshape(2, 313, 1, 1).astype(np.float32),
+    )
+
+
+def build_net():
+    """Read and configure one colorization Net."""
+    import cv2 as cv
 
     for f in [CAFFEMODEL_PATH, PROTOTXT_PATH, PTS_PATH]:
         if not f.exists():
             raise RuntimeError(f"Missing model file: {f}")
 
-    pts = np.load(str(PTS_PATH))
+    weights = CAFFEMODEL_PATH
+    if DNN_FP16 and hasattr(cv.dnn, "shrinkCaffeModel"):
+        # Half-precision copy of the weights, written once. Workers may race
+        # here, so each writes its own temp file and renames it into place.
+        if not FP16_CAFFEMODEL_PATH.exists():
+            tmp = FP16_CAFFEMODEL_PATH.with_name(f".{FP16_CAFFEMODEL_PATH.name}.{os.getpid()}.tmp")
+            try:
+                cv.dnn.shrinkCaffeModel(str(CAFFEMODEL_PATH), str(tmp))
+                os.replace(tmp, FP16_CAFFEMODEL_PATH)
+            finally:
+                tmp.unlink(missing_ok=True)
+        weights = FP16_CAFFEMODEL_PATH
 
     net = cv.dnn.readNetFromCaffe(
         str(PROTOTXT_PATH),
-        str(CAFFEMODEL_PATH)
+        str(weights)
     )
 
     # ✅ FIXED BLOBS (THIS WAS YOUR BUG)
     class8_ab = net.getLayerId("class8_ab")
     conv8_313_rh = net.getLayerId("conv8_313_rh")
 
-    pts = pts.transpose().reshape(2, 313, 1, 1)
-
-    net.getLayer(class8_ab).blobs = [pts.astype("float32")]
+    net.getLayer(class8_ab).blobs = [load_pts()]
     net.getLayer(conv8_313_rh).blobs = [
         np.full((1, 313, 1, 1), 2.606, dtype="float32")
     ]
 
-    net_color = net
-    return net_color
+    backend, target = _backend_and_target()
+    net.setPreferableBackend(backend)
+    net.setPreferableTarget(target)
+    return net
+
+
+def load_model():
+    """Build the pool of NET_POOL_SIZE nets on first use and return it."""
+    import cv2 as cv
+    global net_pool
+
+    if net_pool is not None:
+        return net_pool
+
+    with _pool_lock:
+        if net_pool is None:
+            cv.setNumThreads(CV_THREADS or max(1, (os.cpu_count() or 1) // NET_POOL_SIZE))
+            pool = queue.Queue()
+            for _ in range(NET_POOL_SIZE):
+                pool.put(build_net())
+            net_pool = pool
+    return net_pool
+
+
+model_registry.register("image_colorization", load_model, needs_download=True)
+
+
+def _forward_batch(l_inputs):
+    import cv2 as cv
+    # Check out a Net for the duration of one forward pass
+    pool = model_registry.get("image_colorization")
+    net = pool.get()
+    try:
+        net.setInput(cv.dnn.blobFromImages(l_inputs))
+        return [ab.transpose((1, 2, 0)) for ab in net.forward()]
+    finally:
+        pool.put(net)
+
+
+colorize_batcher = MicroBatcher(
+    "image_colorization", _forward_batch, max_batch_size=8, workers=NET_POOL_SIZE
+)
+
+# CPU-bound decode / color conversion runs here, never on the event loop
+colorize_executor = get_executor("colorization", max_workers=2, max_queue=8)
+
+
+result_store = ResultStore(RESULTS_DIR, RESULTS_MAX_BYTES, suffix=".png")
+
+# Bump when pre/post-processing changes the output, so stored results miss
+PIPELINE_VERSION = 2
+
+
+def model_version() -> str:
+    # Size + mtime of every model file: a replaced weights file gets new keys
+    h = hashlib.sha1()
+    for f in (CAFFEMODEL_PATH, PROTOTXT_PATH, PTS_PATH):
+        try:
+            st = f.stat()
+            h.update(f"{f.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            h.update(f"{f.name}:missing;".encode())
+    return h.hexdigest()[:12]
+
+
+def result_key(image_bytes: bytes) -> str:
+    """Cache key: the input plus every setting that changes the output."""
+    return result_store.key_for(
+        image_bytes,
+        f"pipeline={PIPELINE_VERSION}",
+        f"max_output_pixels={MAX_OUTPUT_PIXELS}",
+        f"backend={DNN_BACKEND}",
+        f"fp16={int(DNN_FP16)}",
+        f"model={model_version()}",
+    )
+metrics.register_cache("colorization_results", result_store.stats)
+
+
+def png_size(path: Path):
+    # (height, width) from the IHDR chunk, without decoding the image
+    with open(path, "rb") as f:
+        header = f.read(24)
+    w, h = struct.unpack(">II", header[16:24])
+    return h, w
+
+
+def save_result(key: str, bgr_out: np.ndarray) -> Path:
+    import cv2 as cv
+    ok, png = cv.imencode(".png", bgr_out)
+    if not ok:
+        raise RuntimeError("Could not encode colorized image")
+    return result_store.put(key, png.tobytes())
+
+
+def cap_resolution(bgr: np.ndarray) -> np.ndarray:
+    import cv2 as cv
+    h, w = bgr.shape[:2]
+    if not MAX_OUTPUT_PIXELS or h * w <= MAX_OUTPUT_PIXELS:
+        return bgr
+    f = (MAX_OUTPUT_PIXELS / (h * w)) ** 0.5
+    return cv.resize(bgr, (max(1, int(w * f)), max(1, int(h * f))), interpolation=cv.INTER_AREA)
+
+
+def decode_and_prepare(image_bytes: bytes):
+    """
+    Decode upload and extract full-res L (float32, 0..100) plus the 224x224
+    net input (L - 50). Returns None if undecodable. The decoded BGR image
+    is dropped here.
+    """
+    import cv2 as cv
+    np_img = np.frombuffer(image_bytes, np.uint8)
+    bgr = cv.imdecode(np_img, cv.IMREAD_COLOR)
+
+    if bgr is None:
+        return None
+
+    bgr = cap_resolution(bgr)
+    h, w = bgr.shape[:2]
+
+    # BGR -> LAB strip by strip through reused buffers; keep only L. Float
+    # input in 0..1 gives L in 0..100, the range the net was trained on
+    # (uint8 LAB would scale it to 0..255).
+    l = np.empty((h, w), dtype=np.float32)
+    rows = min(STRIP_ROWS, h)
+    src_buf = np.empty((rows, w, 3), dtype=np.float32)
+    lab_buf = np.empty((rows, w, 3), dtype=np.float32)
+    for y0 in range(0, h, STRIP_ROWS):
+        y1 = min(y0 + STRIP_ROWS, h)
+        src = np.multiply(bgr[y0:y1], np.float32(1 / 255), out=src_buf[:y1 - y0])
+        lab = cv.cvtColor(src, cv.COLOR_BGR2LAB, dst=lab_buf[:y1 - y0])
+        l[y0:y1] = lab[:, :, 0]
+    del bgr
+
+    l_resized = cv.resize(l, (224, 224))
+    l_resized -= 50
+    return l, l_resized
+
+
+def compose_output(l: np.ndarray, ab: np.ndarray) -> np.ndarray:
+    """
+    Upsample ab to l's size and convert LAB -> BGR uint8, one strip at a time.
+    l is the float L (0..100) from decode_and_prepare.
+
+    Bilinear upsampling is separable: ab is resized horizontally once
+    (net rows x full width), then each strip interpolates vertically with
+    the same source-row mapping cv.resize(INTER_LINEAR) uses.
+    """
+    import cv2 as cv
+    h, w = l.shape[:2]
+    src_h = ab.shape[0]
+    ab_cols = cv.resize(ab, (w, src_h))
+    scale = src_h / h
+
+    out = np.empty((h, w, 3), dtype=np.uint8)
+    rows = min(STRIP_ROWS, h)
+    lab_buf = np.empty((rows, w, 3), dtype=np.float32)
+    bgr_buf = np.empty((rows, w, 3), dtype=np.float32)
+
+    for y0 in range(0, h, STRIP_ROWS):
+        y1 = min(y0 + STRIP_ROWS, h)
+        n = y1 - y0
+
+        fy = (np.arange(y0, y1, dtype=np.float32) + 0.5) * scale - 0.5
+        fy = np.maximum(fy, 0)
+        iy = np.minimum(fy.astype(np.int64), src_h - 1)
+        iy1 = np.minimum(iy + 1, src_h - 1)
+        wy = (fy - iy)[:, None, None]
+
+        lab = lab_buf[:n]
+        lab[:, :, 0] = l[y0:y1]
+        lab[:, :, 1:] = ab_cols[iy] * (1 - wy) + ab_cols[iy1] * wy
+
+        bgr = cv.cvtColor(lab, cv.COLOR_LAB2BGR, dst=bgr_buf[:n])
+        np.clip(bgr, 0, 1, out=bgr)
+        np.multiply(bgr, 255, out=bgr)
+        out[y0:y1] = np.rint(bgr, out=bgr)
+
+    return out
 
 
 @router.post("/predict")
 async def colorize_image(file: UploadFile = File(...)):
     try:
-        net = load_model()
-
         if not file.content_type.startswith("image/"):
             raise HTTPException(400, "Upload a valid image")
 
-        image_bytes = await file.read()
-        np_img = np.frombuffer(image_bytes, np.uint8)
-        bgr = cv.imdecode(np_img, cv.IMREAD_COLOR)
+        with metrics.stage("image_colorization", "upload"):
+            image_bytes = await file.read()
 
-        if bgr is None:
-            raise HTTPException(400, "Invalid image")
+        # Same input bytes and settings → same output; skip the net entirely
+        key = result_key(image_bytes)
+        cached = result_store.get(key)
+        if cached is not None:
+            h, w = png_size(cached)
+            profiler.note(height=h, width=w, cached=True)
+            return {
+                "message": "Colorization successful",
+                "height": h,
+                "width": w,
+                "url": f"/results/{cached.name}",
+                "cached": True
+            }
 
-        h, w = bgr.shape[:2]
+        with metrics.stage("image_colorization", "preprocess"):
+            prepared = await colorize_executor.run(decode_and_prepare, image_bytes)
 
-        img_rgb = cv.cvtColor(bgr, cv.COLOR_BGR2RGB)
-        img_lab = cv.cvtColor(img_rgb, cv.COLOR_RGB2LAB)
-        l = img_lab[:, :, 0]
-
-        l_resized = cv.resize(l, (224, 224))
-        l_resized = l_resized - 50
-
-        blob = cv.dnn.blobFromImage(l_resized)
-        net.setInput(blob)
+        if prepared is None:
+            raise HTTPException(400, "Invalid image")
 
-        ab = net.forward()[0].transpose((1, 2, 0))
-        ab = cv.resize(ab, (w, h))
+        l, l_resized = prepared
+        h, w = l.shape[:2]
+        profiler.note(height=h, width=w)
 
-        lab_out = np.concatenate((l[:, :, None], ab), axis=2)
-        bgr_out = cv.cvtColor(lab_out, cv.COLOR_LAB2BGR)
-        bgr_out = np.clip(bgr_out, 0, 1)
+        with metrics.stage("image_colorization", "inference"):
+            ab = await colorize_batcher.predict(l_resized)
+        with metrics.stage("image_colorization", "postprocess"):
+            bgr_out = await colorize_executor.run(compose_output, l, ab)
+        with metrics.stage("image_colorization", "save"):
+            out_path = await colorize_executor.run(save_result, key, bgr_out)
 
         return {
             "message": "Colorization successful",
             "height": h,
-            "width": w
+            "width": w,
+            "url": f"/results/{out_path.name}",
+            "cached": False
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, str(e))
@@ -2,9 +2,13 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from pathlib import Path
-import pickle, re, traceback
-import nltk
-from nltk.corpus import stopwords
+from typing import Any, Dict, List
+import os
+import pickle, traceback
+
+from utils.batch import validate_records, merge_results
+from utils import metrics, model_registry
+from .normalizer import ScoreCache, TextNormalizer, load_stopwords, score_texts
 
 router = APIRouter()
 
@@ -12,45 +16,77 @@ router = APIRouter()
 SERVICE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = SERVICE_DIR / "phishing_detector.pkl"
 
+# Results kept for repeated email bodies
+CACHE_SIZE = int(os.getenv("PHISHING_CACHE_SIZE", "10000"))
+
+label_map = {0.0: "Legitimate", 1.0: "Phishing"}
+
+# Offline startup self-check: URL, address and stopword handling in one email
+SELF_CHECK_TEXT = "Please VERIFY your account at http://example.com/login or contact help@example.com"
+SELF_CHECK_CLEANED = "please verify account url contact email"
+
+
+# Populated by load_artifacts() on first use / background preload
+model = None
+stop_words = frozenset()
+normalize = None
+score_cache = ScoreCache(CACHE_SIZE)
+metrics.register_cache("phishing_email_scores", score_cache.stats)
+
 
-nltk.download('stopwords', quiet=True)
-stop_words = set(stopwords.words('english'))
+def load_artifacts():
+    global model, stop_words, normalize
 
+    # Vendored NLTK English list: no corpus download at startup
+    stop_words = load_stopwords()
+    normalize = TextNormalizer(stop_words)
 
-if not MODEL_PATH.is_file():
-    raise RuntimeError(f"Missing phishing model: {MODEL_PATH}")
+    if not MODEL_PATH.is_file():
+        raise RuntimeError(f"Missing phishing model: {MODEL_PATH}")
 
-with open(MODEL_PATH, "rb") as f:
-    model = pickle.load(f)
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+
+    self_check()
+    return model
+
+
+def self_check():
+    """
+    Startup check on the loaded artifacts. Uses only files on disk (no
+    corpus download, no network), so a broken deploy fails the readiness
+    probe instead of serving wrong scores.
+    """
+    if len(stop_words) == 0:
+        raise RuntimeError("Phishing self-check: stopword list is empty")
+    cleaned = normalize(SELF_CHECK_TEXT)
+    if cleaned != SELF_CHECK_CLEANED:
+        raise RuntimeError(f"Phishing self-check: cleaned text {cleaned!r} != {SELF_CHECK_CLEANED!r}")
+    probs = model.predict_proba([cleaned])
+    if probs.shape != (1, len(model.classes_)) or abs(float(probs.sum()) - 1.0) > 1e-6:
+        raise RuntimeError(f"Phishing self-check: unexpected probabilities {probs!r}")
+
+
+model_registry.register("phishing_email", load_artifacts)
 
 
 class EmailInput(BaseModel):
     text: str
 
 def clean_text(text: str) -> str:
-    text = str(text).lower()
-    text = re.sub(r"http\S+", " url ", text)
-    text = re.sub(r"\S+@\S+", " email ", text)
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = " ".join([word for word in text.split() if word not in stop_words])
-    return text
+    return normalize(text)
 
 @router.post("/predict")
 def predict(input: EmailInput):
     try:
-        cleaned = clean_text(input.text)
-
-        # Ensure model can handle list input
-        probs = model.predict_proba([cleaned])[0]
-        pred = model.predict([cleaned])[0]
-
-        label_map = {0.0: "Legitimate", 1.0: "Phishing"}
+        model_registry.get("phishing_email")
+        cleaned, pred, confidence = score_texts(model, normalize, score_cache, [input.text])[0]
 
         return {
             "raw_text": input.text,
             "cleaned_text": cleaned,
             "prediction": label_map.get(pred, str(pred)),
-            "confidence": float(max(probs))
+            "confidence": confidence
         }
 
     except Exception as e:
@@ -59,3 +95,40 @@ def predict(input: EmailInput):
             status_code=500,
             detail=f"Error during prediction: {e}\n{traceback_str}"
         )
+
+
+@router.post("/predict/batch")
+def predict_batch(records: List[Dict[str, Any]]):
+    try:
+        model_registry.get("phishing_email")
+        with metrics.stage("phishing_email", "validate"):
+            items, indices, errors = validate_records(records, EmailInput)
+
+        results = []
+        if items:
+            # One pipeline pass over the uncached distinct bodies
+            scored = score_texts(model, normalize, score_cache, [item.text for item in items])
+            results = [
+                {
+                    "cleaned_text": c,
+                    "prediction": label_map.get(pred, str(pred)),
+                    "confidence": confidence
+                }
+                for c, pred, confidence in scored
+            ]
+
+        return {"results": merge_results(len(records), indices, results, errors)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback_str = traceback.format_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error during prediction: {e}\n{traceback_str}"
+        )
+
+
+@router.get("/cache")
+def cache_stats():
+    return score_cache.stats()
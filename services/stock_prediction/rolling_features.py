@@ -0,0 +1,153 @@
+"""
+Incremental version of models/feature_engineering.py for the last row only.
+
+feature_engineering() rebuilds every lag and moving average over the whole
+posted history, but a prediction only needs the newest row, and that row
+only depends on the last WINDOW bars. RollingFeatures keeps those bars in
+ring buffers and produces the newest row's features per appended bar in
+constant time; last_row_features() is the stateless equivalent for a posted
+history, touching only its last WINDOW rows.
+
+Values match feature_engineering() to within float rounding: window sums
+are taken with math.fsum over the buffer (at most 20 values) rather than
+pandas' running add/remove sums, so they don't drift over a long-lived
+stream but can differ from pandas in the last bit.
+"""
+import math
+from collections import deque
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# MA20 needs the longest history; lags, Return and the 5/10-bar means fit inside it
+WINDOW = 20
+
+# Model input order, as produced by feature_engineering() minus Date
+FEATURE_COLUMNS = [
+    "Open", "High", "Low", "Close", "Adj Close", "Volume",
+    "close_lag1", "close_lag2", "close_lag3",
+    "MA5", "MA10", "MA20", "Return", "Volume_MA5",
+]
+
+
+class RollingFeatures:
+    """Per-ticker rolling state: the last WINDOW closes and the last 5 volumes."""
+
+    def __init__(self):
+        self.closes = deque(maxlen=WINDOW)
+        self.volumes = deque(maxlen=5)
+        self.last_bar: Optional[tuple] = None
+        self.last_date: Optional[pd.Timestamp] = None
+        self.bars = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.closes) == WINDOW
+
+    def append(self, date: pd.Timestamp, open_: float, high: float, low: float,
+               close: float, adj_close: float, volume: float) -> Optional[np.ndarray]:
+        """
+        Add one bar (dates must increase) and return its feature row, or
+        None until WINDOW bars have been seen.
+        """
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Bar date {date} is not after the previous bar ({self.last_date})")
+        # NumPy scalars so a zero close yields inf/NaN like pandas, not ZeroDivisionError
+        close, volume = np.float64(close), np.float64(volume)
+        self.closes.append(close)
+        self.volumes.append(volume)
+        self.last_bar = (open_, high, low, close, adj_close, volume)
+        self.last_date = date
+        self.bars += 1
+        return self.features()
+
+    def features(self) -> Optional[np.ndarray]:
+        if not self.ready:
+            return None
+        c = self.closes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = c[-1] / c[-2] - 1
+        row = np.array([
+            *self.last_bar,
+            c[-2], c[-3], c[-4],
+            _mean(c, 5), _mean(c, 10), _mean(c, 20),
+            ret,
+            _mean(self.volumes, 5),
+        ])
+        # feature_engineering() drops rows with NaN (e.g. 0/0 returns)
+        if np.isnan(row).any():
+            return None
+        return row
+
+
+def _mean(values: deque, k: int) -> float:
+    n = len(values)
+    return math.fsum(values[i] for i in range(n - k, n)) / k
+
+
+def tail_state(dates: Sequence[str], bar_at: Callable[[int], Sequence[float]]) -> Optional[RollingFeatures]:
+    """
+    RollingFeatures primed with the last WINDOW bars of a posted history.
+    bar_at(i) returns row i's (Open, High, Low, Close, Adj_Close, Volume);
+    only the dates are read for every row.
+
+    Returns None when that can't reproduce feature_engineering() (too few
+    rows, NaNs, tied dates at the window edge).
+    """
+    if len(dates) < WINDOW:
+        return None
+    parsed = pd.to_datetime(pd.Series(dates))
+    if parsed.is_monotonic_increasing:
+        order = np.arange(len(parsed))
+    else:
+        # same ordering feature_engineering() applies
+        order = parsed.sort_values().index.to_numpy()
+        parsed = parsed.iloc[order].reset_index(drop=True)
+    # a tied date at the window's edge could sort either way
+    if parsed.iloc[-(WINDOW + 1):].duplicated().any():
+        return None
+
+    tail = np.array([bar_at(i) for i in order[-WINDOW:]], dtype=np.float64)
+    if np.isnan(tail).any():
+        return None
+
+    state = RollingFeatures()
+    for date, bar in zip(parsed.iloc[-WINDOW:], tail):
+        state.append(date, *bar)
+    return state if state.features() is not None else None
+
+
+def last_row_features(dates: Sequence[str], bar_at: Callable[[int], Sequence[float]]):
+    """
+    Features for the newest bar of a posted history, reading only its last
+    WINDOW bars. Returns (date, row), or None when the caller should fall
+    back to feature_engineering() (see tail_state).
+    """
+    state = tail_state(dates, bar_at)
+    if state is None:
+        return None
+    return state.last_date, state.features()
+
+
+def forecast(state: RollingFeatures, predict: Callable[[np.ndarray], np.ndarray],
+             horizon: int) -> List[Tuple[pd.Timestamp, float]]:
+    """
+    Recursive multi-step forecast: predict the next close, append it as the
+    next business day's bar and repeat. Synthetic bars use the predicted
+    close for Open/High/Low/Close/Adj Close and carry the 5-bar average
+    volume forward. Each step is one constant-time feature row and one
+    single-row predict; the steps depend on each other, so they can't batch.
+    Mutates `state`.
+    """
+    out = []
+    for _ in range(horizon):
+        row = state.features()
+        if row is None:
+            break
+        close = float(predict(row.reshape(1, -1))[0])
+        date = state.last_date + pd.offsets.BDay(1)
+        volume = _mean(state.volumes, 5)
+        state.append(date, close, close, close, close, close, volume)
+        out.append((date, close))
+    return out
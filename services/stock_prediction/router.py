@@ -1,15 +1,33 @@
 # services/stock_prediction/router.py
+import asyncio
 import os
+from pathlib import Path
+import numpy as np
 import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List
-import xgboost as xgb
+from typing import Dict, List
+from collections import OrderedDict
 from services.stock_prediction.models.feature_engineering import feature_engineering
+from utils.batcher import MicroBatcher
+from utils import metrics, model_registry, profiler
+from utils.tree_compiler import maybe_compile
+from services.stock_prediction.ticker_models import TickerModels
+from services.stock_prediction.rolling_features import (
+    FEATURE_COLUMNS, RollingFeatures, WINDOW, forecast, last_row_features, tail_state,
+)
+from utils.batch import MAX_BATCH_SIZE
 
 router = APIRouter()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODELS_DIR = os.path.join(BASE_DIR, "models")
+MODELS_DIR = Path(BASE_DIR) / "models"
+
+STOCK_MODEL_CACHE_SIZE = int(os.getenv("STOCK_MODEL_CACHE_SIZE", "32"))
+MAX_TICKERS_PER_REQUEST = 100
+# Rolling state kept for the append-bar endpoint (LRU, per worker process)
+STOCK_MAX_STREAMS = int(os.getenv("STOCK_MAX_STREAMS", "1024"))
+MAX_FORECAST_HORIZON = 60
 
 class StockData(BaseModel):
     Date: str
@@ -20,7 +38,17 @@ class StockData(BaseModel):
     Adj_Close: float
     Volume: float
 
+def _bar(d: StockData):
+    return (d.Open, d.High, d.Low, d.Close, d.Adj_Close, d.Volume)
+
 def prepare_last_row(data: List[StockData]):
+    """(date, 1-row feature matrix) for the newest bar."""
+    # Fast path: only the last WINDOW rows feed the newest row's features
+    fast = last_row_features([d.Date for d in data], lambda i: _bar(data[i]))
+    if fast is not None:
+        date, row = fast
+        return date, row.reshape(1, -1)
+
     df = pd.DataFrame([d.dict() for d in data])
     df_processed = feature_engineering(df)
     if df_processed.empty:
@@ -29,49 +57,238 @@ def prepare_last_row(data: List[StockData]):
         df_processed = df_processed.rename(columns={'Adj_Close': 'Adj Close'})
     X = df_processed.drop(columns=["Date"], errors='ignore')
     last_row = X.iloc[-1].values.reshape(1, -1)
-    return df_processed, last_row
+    return df_processed["Date"].iloc[-1], last_row
 
-model_default = xgb.XGBRegressor()
-model_default.load_model(os.path.join(MODELS_DIR, "xgb_best_model.json"))
+def load_booster(path: Path):
+    import xgboost as xgb
+    model = xgb.XGBRegressor()
+    model.load_model(str(path))
+    return maybe_compile(model, path.name)
 
-model_tata_motors = xgb.XGBRegressor()
-model_tata_motors.load_model(os.path.join(MODELS_DIR, "xgb_best_model1.json"))
 
-model_tata_steel = xgb.XGBRegressor()
-model_tata_steel.load_model(os.path.join(MODELS_DIR, "xgb_best_model2.json"))
+# Boosters load on first use per ticker; only the most recent few stay resident
+ticker_models = TickerModels(MODELS_DIR, load_booster, STOCK_MODEL_CACHE_SIZE)
 
-model_tata_power = xgb.XGBRegressor()
-model_tata_power.load_model(os.path.join(MODELS_DIR, "xgb_best_model3.json"))
+# "Loading" the service is just discovering tickers
+model_registry.register("stock_prediction", ticker_models.discover)
 
 
-@router.post("/predict/default")
-def predict_default(data: List[StockData]):
-    if len(data) < 20:
-        raise HTTPException(status_code=400, detail="Provide at least 20 rows of stock data.")
-    df_processed, last_row = prepare_last_row(data)
-    pred = model_default.predict(last_row)[0]
-    return {"Date": df_processed["Date"].iloc[-1], "predicted_close": float(pred)}
+def _model_cache_stats() -> dict:
+    s = ticker_models.stats()
+    return {"hits": s["hits"], "misses": s["loads"], "entries": len(s["loaded"])}
 
-@router.post("/predict/tata_motors")
-def predict_tata_motors(data: List[StockData]):
-    if len(data) < 20:
-        raise HTTPException(status_code=400, detail="Provide at least 20 rows of stock data.")
-    df_processed, last_row = prepare_last_row(data)
-    pred = model_tata_motors.predict(last_row)[0]
-    return {"Date": df_processed["Date"].iloc[-1], "predicted_close": float(pred)}
 
-@router.post("/predict/tata_steel")
-def predict_tata_steel(data: List[StockData]):
+metrics.register_cache("stock_models", _model_cache_stats)
+
+
+def _predict_rows(items):
+    # items are (ticker, last_row); one booster call per ticker in the batch
+    by_ticker = {}
+    for i, (ticker, row) in enumerate(items):
+        by_ticker.setdefault(ticker, []).append(i)
+
+    out = [None] * len(items)
+    for ticker, idx in by_ticker.items():
+        preds = ticker_models.get(ticker).predict(np.vstack([items[i][1] for i in idx]))
+        for i, p in zip(idx, preds):
+            out[i] = p
+    return out
+
+# Coalesce concurrent last-row predictions across all tickers
+stock_batcher = MicroBatcher("stock_prediction", _predict_rows)
+
+
+async def ensure_model(ticker: str):
+    if ticker_models.path_for(ticker) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ticker '{ticker}'")
+    try:
+        await asyncio.to_thread(ticker_models.get, ticker)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {e}")
+
+
+async def predict_ticker(ticker: str, data: List[StockData]):
     if len(data) < 20:
         raise HTTPException(status_code=400, detail="Provide at least 20 rows of stock data.")
-    df_processed, last_row = prepare_last_row(data)
-    pred = model_tata_steel.predict(last_row)[0]
-    return {"Date": df_processed["Date"].iloc[-1], "predicted_close": float(pred)}
+    profiler.note(rows=len(data))
+    with metrics.stage("stock_prediction", "load"):
+        await ensure_model(ticker)
+    with metrics.stage("stock_prediction", "features"):
+        date, last_row = await run_in_threadpool(prepare_last_row, data)
+    with metrics.stage("stock_prediction", "inference"):
+        pred = await stock_batcher.predict((ticker, last_row))
+    return {"Date": date, "predicted_close": float(pred)}
+
+
+# ticker -> RollingFeatures; only touched from the event loop, so no lock
+streams: "OrderedDict[str, RollingFeatures]" = OrderedDict()
+
+
+def stream_state(ticker: str) -> RollingFeatures:
+    state = streams.get(ticker)
+    if state is None:
+        state = streams[ticker] = RollingFeatures()
+        while len(streams) > STOCK_MAX_STREAMS:
+            streams.popitem(last=False)
+    streams.move_to_end(ticker)
+    return state
+
+
+class MultiTickerRequest(BaseModel):
+    tickers: Dict[str, List[StockData]]
+
+
+@router.get("/tickers")
+def list_tickers():
+    ticker_models.discover()
+    return {"tickers": ticker_models.tickers(), "cache": ticker_models.stats()}
+
+
+@router.post("/predict")
+async def predict_many(req: MultiTickerRequest):
+    """Score several tickers in one call; a failing ticker gets an error entry instead of failing the rest."""
+    if len(req.tickers) > MAX_TICKERS_PER_REQUEST:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many tickers: {len(req.tickers)} > {MAX_TICKERS_PER_REQUEST}"
+        )
+
+    async def one(ticker, data):
+        try:
+            return await predict_ticker(ticker, data)
+        except HTTPException as e:
+            return {"error": e.detail, "status_code": e.status_code}
+
+    results = await asyncio.gather(*(one(t, d) for t, d in req.tickers.items()))
+    return {"results": dict(zip(req.tickers, results))}
+
+
+@router.post("/predict/{ticker}")
+async def predict(ticker: str, data: List[StockData]):
+    return await predict_ticker(ticker, data)
+
+
+@router.post("/stream/{ticker}")
+async def append_bars(ticker: str, bars: List[StockData]):
+    """
+    Append one or more new bars to the ticker's rolling state and predict
+    from the newest. Only the first 20 bars of a stream are a warm-up; after
+    that each call does constant work however long the stream runs.
+    """
+    if not bars:
+        raise HTTPException(status_code=400, detail="Provide at least one bar.")
+    with metrics.stage("stock_prediction", "load"):
+        await ensure_model(ticker)
+    state = stream_state(ticker)
+
+    # Validate the whole request before touching the state
+    try:
+        dates = [pd.Timestamp(b.Date) for b in bars]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    previous = state.last_date
+    for d in dates:
+        if previous is not None and d <= previous:
+            raise HTTPException(status_code=409, detail=f"Bar date {d} is not after {previous}")
+        previous = d
+
+    row = None
+    with metrics.stage("stock_prediction", "features"):
+        for d, b in zip(dates, bars):
+            row = state.append(d, *_bar(b))
+
+    if row is None:
+        return {"ready": False, "bars": state.bars, "needed": max(0, WINDOW - len(state.closes))}
+    with metrics.stage("stock_prediction", "inference"):
+        pred = await stock_batcher.predict((ticker, row.reshape(1, -1)))
+    return {"ready": True, "bars": state.bars, "Date": state.last_date, "predicted_close": float(pred)}
+
+
+@router.delete("/stream/{ticker}")
+def reset_stream(ticker: str):
+    streams.pop(ticker, None)
+    return {"reset": ticker}
+
+
+def run_backtest(model, data: List[StockData], include_predictions: bool) -> dict:
+    with metrics.stage("stock_prediction", "features"):
+        df = pd.DataFrame([d.dict() for d in data])
+        frame = feature_engineering(df).rename(columns={"Adj_Close": "Adj Close"})
+    if frame.empty:
+        raise HTTPException(status_code=400, detail="Feature engineering returned empty DataFrame.")
+
+    # Every engineered row in one predict call
+    with metrics.stage("stock_prediction", "inference"):
+        pred = np.asarray(model.predict(frame[FEATURE_COLUMNS].to_numpy()), dtype=np.float64)
+
+    # The model predicts the next close; feature_engineering keeps the
+    # original row labels, so take "next" from the date-sorted input
+    ordered = df.assign(Date=pd.to_datetime(df["Date"])).sort_values("Date")
+    actual = ordered["Close"].shift(-1).reindex(frame.index).to_numpy(dtype=np.float64)
+    close = frame["Close"].to_numpy(dtype=np.float64)
+
+    scored = ~np.isnan(actual)
+    err = pred[scored] - actual[scored]
+    scores = {"rows": int(scored.sum())}
+    if scored.any():
+        moved = np.sign(actual[scored] - close[scored])
+        scores.update({
+            "mae": float(np.abs(err).mean()),
+            "rmse": float(np.sqrt((err ** 2).mean())),
+            "directional_accuracy": float((np.sign(pred[scored] - close[scored]) == moved).mean()),
+            # predict "no change" for comparison
+            "naive_mae": float(np.abs(actual[scored] - close[scored]).mean()),
+        })
+
+    out = {"metrics": scores}
+    if include_predictions:
+        out["predictions"] = [
+            {"Date": d, "close": c, "predicted_next_close": p, "actual_next_close": None if a != a else a}
+            for d, c, p, a in zip(frame["Date"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+                                  close.tolist(), pred.tolist(), actual.tolist())
+        ]
+    return out
+
+
+@router.post("/backtest/{ticker}")
+async def backtest(ticker: str, data: List[StockData],
+                   include_predictions: bool = Query(True)):
+    """
+    Score every engineered row of the posted history in one predict call and
+    compare each prediction with the following row's close.
+    """
+    if len(data) < 21:
+        raise HTTPException(status_code=400, detail="Provide at least 21 rows of stock data.")
+    if len(data) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Too many rows: {len(data)} > {MAX_BATCH_SIZE}")
+    profiler.note(rows=len(data))
+    with metrics.stage("stock_prediction", "load"):
+        await ensure_model(ticker)
+    model = ticker_models.get(ticker)
+    result = await run_in_threadpool(run_backtest, model, data, include_predictions)
+    return {"ticker": ticker, **result}
+
+
+def run_forecast(model, data: List[StockData], horizon: int) -> List[dict]:
+    state = tail_state([d.Date for d in data], lambda i: _bar(data[i]))
+    if state is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Forecasting needs the last {WINDOW} rows to have distinct dates and no missing values."
+        )
+    return [{"Date": d, "predicted_close": c} for d, c in forecast(state, model.predict, horizon)]
+
 
-@router.post("/predict/tata_power")
-def predict_tata_power(data: List[StockData]):
+@router.post("/forecast/{ticker}")
+async def forecast_ticker(ticker: str, data: List[StockData],
+                          horizon: int = Query(5, ge=1, le=MAX_FORECAST_HORIZON)):
+    """Recursive multi-step forecast: each predicted close feeds the next step's rolling features."""
     if len(data) < 20:
         raise HTTPException(status_code=400, detail="Provide at least 20 rows of stock data.")
-    df_processed, last_row = prepare_last_row(data)
-    pred = model_tata_power.predict(last_row)[0]
-    return {"Date": df_processed["Date"].iloc[-1], "predicted_close": float(pred)}
+    profiler.note(rows=len(data), horizon=horizon)
+    with metrics.stage("stock_prediction", "load"):
+        await ensure_model(ticker)
+    model = ticker_models.get(ticker)
+    with metrics.stage("stock_prediction", "forecast"):
+        steps = await run_in_threadpool(run_forecast, model, data, horizon)
+    return {"ticker": ticker, "horizon": horizon, "forecast": steps}
@@ -0,0 +1,111 @@
+"""
+Ticker -> XGBoost booster lookup, loading boosters on demand.
+
+Tickers are discovered from the models directory: every `<ticker>.json`
+booster is served under its file stem, and tickers.json maps extra names
+onto files that don't follow that convention (the original
+default/tata_* models). Only the most recently used `cache_size` boosters
+stay loaded, so hundreds of tickers cost the memory of a few.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ALIASES_FILE = "tickers.json"
+
+
+class TickerModels:
+    def __init__(self, directory: Path, loader: Callable[[Path], Any], cache_size: int):
+        self.directory = Path(directory)
+        self.loader = loader
+        self.cache_size = max(1, cache_size)
+
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Path] = {}
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()  # oldest first
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._reported_missing = set()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def discover(self) -> Dict[str, Path]:
+        """Rescan the directory for tickers; cheap enough to run on every unknown ticker."""
+        aliases_path = self.directory / ALIASES_FILE
+        aliases = {}
+        if aliases_path.is_file():
+            with open(aliases_path) as f:
+                aliases = json.load(f)
+
+        aliased_files = set(aliases.values())
+        paths = {
+            p.stem: p for p in self.directory.glob("*.json")
+            if p.name != ALIASES_FILE and p.name not in aliased_files
+        }
+        for ticker, filename in aliases.items():
+            path = self.directory / filename
+            if path.is_file():
+                paths[ticker] = path
+            elif ticker not in self._reported_missing:
+                self._reported_missing.add(ticker)
+                logger.warning(f"Ticker '{ticker}': model file {filename} not found")
+
+        with self._lock:
+            self._paths = paths
+        return paths
+
+    def path_for(self, ticker: str) -> Optional[Path]:
+        path = self._paths.get(ticker)
+        if path is None:
+            path = self.discover().get(ticker)
+        return path
+
+    def tickers(self) -> List[str]:
+        return sorted(self._paths)
+
+    def get(self, ticker: str) -> Any:
+        """Return the booster for ticker, loading it (and evicting the LRU one) if needed."""
+        with self._lock:
+            if ticker in self._loaded:
+                self._loaded.move_to_end(ticker)
+                self.hits += 1
+                return self._loaded[ticker]
+            load_lock = self._load_locks.setdefault(ticker, threading.Lock())
+
+        path = self.path_for(ticker)
+        if path is None:
+            raise KeyError(ticker)
+
+        # One load per ticker at a time; different tickers load in parallel
+        with load_lock:
+            with self._lock:
+                if ticker in self._loaded:
+                    self._loaded.move_to_end(ticker)
+                    return self._loaded[ticker]
+
+            model = self.loader(path)
+
+            with self._lock:
+                self._loaded[ticker] = model
+                self.loads += 1
+                while len(self._loaded) > self.cache_size:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    self.evictions += 1
+                    logger.info(f"Evicted stock model '{evicted}'")
+        return model
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tickers": len(self._paths),
+                "loaded": list(self._loaded),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,103 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from utils import artifacts
+
+
+def encoders(*values):
+    return {"City": LabelEncoder().fit(list(values))}
+
+
+@pytest.fixture
+def converted(tmp_path):
+    path = tmp_path / "label_encoders.pkl"
+    joblib.dump(encoders("Zürich", "Āpia", "New York", "Oslo"), path)
+    artifacts.convert(path)
+    return path
+
+
+@pytest.fixture
+def native_loads(monkeypatch):
+    calls = []
+    real = artifacts._load_native
+
+    def spy(entry, directory):
+        calls.append(entry["path"])
+        return real(entry, directory)
+
+    monkeypatch.setattr(artifacts, "_load_native", spy)
+    return calls
+
+
+def test_strings_round_trip_without_fixed_width(converted, native_loads):
+    loaded = artifacts.load(converted)["City"].classes_
+
+    assert native_loads == ["label_encoders.skl"]
+    assert loaded.dtype == object
+    assert list(loaded) == ["New York", "Oslo", "Zürich", "Āpia"]
+    assert not any(p.name.endswith(".classes_.npy") for p in converted.with_suffix(".skl").iterdir())
+
+
+def test_scaler_round_trip(tmp_path):
+    path = tmp_path / "scaler.pkl"
+    scaler = StandardScaler().fit(pd.DataFrame({"a": [1.0, 2.0, 4.0], "b": [0.0, 1.0, 1.0]}))
+    joblib.dump(scaler, path)
+    artifacts.convert(path)
+
+    loaded = artifacts.load(path)
+    np.testing.assert_array_equal(loaded.mean_, scaler.mean_)
+    assert list(loaded.feature_names_in_) == ["a", "b"]
+
+
+def test_replaced_pickle_is_loaded_instead(converted, native_loads, caplog):
+    joblib.dump(encoders("Lima", "Quito"), converted)
+
+    loaded = artifacts.load(converted)
+
+    assert native_loads == []
+    assert list(loaded["City"].classes_) == ["Lima", "Quito"]
+    assert "changed since conversion" in caplog.text
+
+
+def test_library_version_mismatch_falls_back(converted, native_loads, caplog):
+    manifest_path = converted.parent / artifacts.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest[converted.name]["versions"]["sklearn"] = "0.1.0"
+    manifest_path.write_text(json.dumps(manifest))
+
+    artifacts.load(converted)
+
+    assert native_loads == []
+    assert "sklearn 0.1.0" in caplog.text
+
+
+def test_patch_release_keeps_native_copy(converted, native_loads, caplog):
+    manifest_path = converted.parent / artifacts.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    major, minor, *_ = artifacts._installed_version("sklearn").split(".")
+    manifest[converted.name]["versions"]["sklearn"] = f"{major}.{minor}.999"
+    manifest_path.write_text(json.dumps(manifest))
+
+    artifacts.load(converted)
+
+    assert native_loads == ["label_encoders.skl"]
+    assert "out of date" not in caplog.text
+
+
+def test_stale_copy_still_loads_without_pickle(converted, native_loads, caplog):
+    manifest_path = converted.parent / artifacts.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest[converted.name]["format_version"] = 1
+    manifest_path.write_text(json.dumps(manifest))
+    converted.unlink()
+
+    loaded = artifacts.load(converted)
+
+    assert native_loads == ["label_encoders.skl"]
+    assert "Oslo" in list(loaded["City"].classes_)
+    assert "is gone" in caplog.text
@@ -0,0 +1,35 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from utils import batcher
+
+
+@pytest.fixture(autouse=True)
+def isolated_batchers(monkeypatch):
+    monkeypatch.setattr(batcher, "_batchers", {})
+
+
+def test_full_queue_fails_fast():
+    release = threading.Event()
+
+    def predict_fn(items):
+        release.wait(5)
+        return items
+
+    b = batcher.MicroBatcher("test", predict_fn, max_batch_size=1, max_wait_ms=0, max_queue=2)
+    running = b.submit(0)
+    deadline = time.monotonic() + 5
+    while b.stats()["queued"] and time.monotonic() < deadline:
+        time.sleep(0.01)  # wait for the worker to take the first item
+
+    queued = [b.submit(1), b.submit(2)]
+    with pytest.raises(HTTPException) as exc:
+        b.submit(3)
+    assert exc.value.status_code == 503
+    assert b.stats()["rejected"] == 1
+
+    release.set()
+    assert [f.result(5) for f in [running, *queued]] == [0, 1, 2]
@@ -0,0 +1,122 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from services.fraud_transaction import router as fraud
+from services.fraud_transaction.feature_plan import COMPUTED_FEATURES, FeaturePlan
+from utils import model_registry
+
+
+@pytest.fixture(scope="module", autouse=True)
+def artifacts():
+    # Committed with the service; a missing artifact is a failure, not a skip
+    model_registry.get("fraud_transaction")
+
+
+def record(**overrides):
+    base = dict(
+        transaction_date="2024-03-05 14:22:00",
+        transaction_amount=120.5,
+        quantity=2,
+        customer_age=34,
+        account_age_days=200,
+        shipping_address="12 Main St",
+        billing_address="12 Main St",
+        payment_method="credit card",
+        product_category="electronics",
+        customer_location="Aaronberg",
+        device_used="mobile",
+    )
+    base.update(overrides)
+    return fraud.TransactionInput(**base)
+
+
+def threshold():
+    return fraud.high_amount_threshold
+
+
+ROWS = {
+    "known categories": record(),
+    "midnight new year": record(transaction_date="2024-01-01 00:00:00"),
+    "last second of year": record(transaction_date="2023-12-31T23:59:59"),
+    "leap day, date only": record(transaction_date="2024-02-29"),
+    "non-iso date": record(transaction_date="03/07/2024 08:15"),
+    "sunday": record(transaction_date="2024-03-10 12:00:00"),
+    "unseen payment method": record(payment_method="barter"),
+    "unseen category": record(product_category="garden gnomes"),
+    "unseen location": record(customer_location="Atlantis"),
+    "partial location": record(customer_location="aaron"),
+    "unseen device": record(device_used="smart_tv"),
+    "case and spaces": record(payment_method="Bank Transfer", product_category="Toys & Games"),
+    "address mismatch": record(billing_address="99 Other Rd"),
+    "brand-new account": record(account_age_days=0),
+    "zero amount": record(transaction_amount=0.0),
+}
+
+
+def seeded(fn, *args):
+    # safe_encode's random fallback must pick the same code on both paths
+    random.seed(0)
+    return fn(*args)
+
+
+def assert_same(inp):
+    expected = seeded(fraud.build_batch_df, [inp])
+    got = seeded(fraud.build_input_row, inp)
+
+    np.testing.assert_array_equal(got, expected.to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(
+        fraud.model.predict_proba(got)[:, 1], fraud.model.predict_proba(expected)[:, 1]
+    )
+
+
+@pytest.mark.parametrize("name", list(ROWS))
+def test_row_matches_dataframe_path(name):
+    assert_same(ROWS[name])
+
+
+@pytest.mark.parametrize("offset", [-0.01, 0.0, 0.01])
+def test_high_amount_threshold_boundary(offset):
+    assert_same(record(transaction_amount=threshold() + offset))
+
+
+def test_plan_handles_scaler_column_order():
+    numeric = ["Transaction Amount", "Quantity", "Customer Age"]
+    rng = np.random.default_rng(0)
+    fitted = pd.DataFrame(rng.normal(5, 2, size=(50, 3)), columns=list(reversed(numeric)))
+    scaler = StandardScaler().fit(fitted)
+    feature_columns = ["Quantity", "Device Used_tablet", "Transaction Amount", "Customer Age"]
+    plan = FeaturePlan(feature_columns, ["Device Used_mobile", "Device Used_tablet"], numeric, scaler)
+
+    values = [float(i + 1) for i in range(len(COMPUTED_FEATURES))]
+    row = plan.row(values, "tablet")
+
+    raw = pd.DataFrame([dict(zip(COMPUTED_FEATURES, values))])
+    expected = pd.DataFrame({
+        "Quantity": raw["Quantity"], "Device Used_tablet": 1,
+        "Transaction Amount": raw["Transaction Amount"], "Customer Age": raw["Customer Age"],
+    })
+    expected[numeric] = scaler.transform(raw[numeric][list(reversed(numeric))])[:, ::-1]
+    np.testing.assert_array_equal(row, expected[feature_columns].to_numpy(dtype=np.float32))
+
+
+def test_mixed_iso_dates_parse_in_bulk(monkeypatch):
+    dates = ["2024-03-05", "2024-03-05 14:22:00", "2024-03-05T14:22:00.250", "2023-12-31 23:59:59"] * 50
+    retried = []
+    real = pd.to_datetime
+
+    def spy(value, *args, **kwargs):
+        if isinstance(value, str):
+            retried.append(value)
+        return real(value, *args, **kwargs)
+
+    monkeypatch.setattr(fraud.pd, "to_datetime", spy)
+    dt, errors = fraud.parse_dates(dates + ["03/07/2024 08:15", "not a date"])
+
+    assert retried == ["03/07/2024 08:15", "not a date"]
+    assert errors.keys() == {len(dates) + 1}
+    assert dt.iloc[len(dates)] == pd.Timestamp("2024-03-07 08:15")
+    assert not dt.iloc[:len(dates)].isna().any()
@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.fraud_transaction import router as fraud
+from utils import model_registry
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Committed with the service; a missing artifact is a failure, not a skip
+    model_registry.get("fraud_transaction")
+    app = FastAPI()
+    app.include_router(fraud.router)
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def fixed_fallback(monkeypatch):
+    # safe_encode's random fallback must pick the same code on both paths
+    monkeypatch.setattr(fraud.random, "randrange", lambda n: 0)
+
+
+def record(**overrides):
+    base = dict(
+        transaction_date="2024-03-05 14:22:00",
+        transaction_amount=120.5,
+        quantity=2,
+        customer_age=34,
+        account_age_days=200,
+        shipping_address="12 Main St",
+        billing_address="12 Main St",
+        payment_method="credit card",
+        product_category="electronics",
+        customer_location="Aaronberg",
+        device_used="mobile",
+    )
+    base.update(overrides)
+    return {k: v for k, v in base.items() if v is not None}
+
+
+JSON_ROWS = [
+    record(),
+    record(shipping_address=12),  # int for a str field
+    record(device_used=["mobile"]),  # list for a str field
+    record(transaction_amount="nan"),  # pydantic accepts NaN floats
+    record(quantity=2.5),
+    record(quantity="3"),
+    record(customer_age=None),  # missing field
+    record(transaction_date="not a date"),
+    record(transaction_amount="abc", quantity="x"),  # every field error is reported
+]
+
+CSV_ROWS = [
+    {k: str(v) for k, v in record().items()},
+    {k: str(v) for k, v in record(transaction_amount="nan").items()},
+    {k: str(v) for k, v in record(transaction_amount="").items()},
+    {k: str(v) for k, v in record(quantity="2.5").items()},
+    {k: str(v) for k, v in record(customer_age="abc").items()},
+    {k: str(v) for k, v in record(transaction_date="31/31/2024").items()},
+]
+
+
+def batch(client, records):
+    resp = client.post("/predict/batch", json=records)
+    assert resp.status_code == 200
+    return resp.json()["results"]
+
+
+def assert_same(streamed, batched):
+    assert len(streamed) == len(batched)
+    for s, b in zip(streamed, batched):
+        assert s["index"] == b["index"]
+        if "error" in b:
+            assert s["error"] == b["error"]
+        else:
+            assert "error" not in s
+            assert s["is_fraud"] == b["is_fraud"]
+            assert s["probability"] == pytest.approx(b["probability"], rel=1e-6)
+
+
+def test_ndjson_stream_matches_batch(client):
+    body = "".join(json.dumps(r) + "\n" for r in JSON_ROWS)
+    resp = client.post("/predict/stream?format=ndjson", content=body)
+    assert resp.status_code == 200
+    *lines, summary = [json.loads(l) for l in resp.text.splitlines()]
+
+    expected = batch(client, JSON_ROWS)
+    assert_same(lines, expected)
+    assert sum("error" in r for r in expected) == len(JSON_ROWS) - 3
+    assert summary["summary"]["errors"] == len(JSON_ROWS) - 3
+
+
+def test_csv_stream_matches_batch(client):
+    header = list(CSV_ROWS[0])
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=header, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(CSV_ROWS)
+    resp = client.post("/predict/stream?format=csv", content=out.getvalue())
+    assert resp.status_code == 200
+
+    streamed = []
+    for index, is_fraud, probability, error in csv.reader(
+        l for l in resp.text.splitlines()[1:] if not l.startswith("#")
+    ):
+        row = {"index": int(index)}
+        if error:
+            row["error"] = json.loads(error) if error.startswith("[") else error
+        else:
+            row.update(is_fraud=int(is_fraud), probability=float(probability))
+        streamed.append(row)
+
+    expected = batch(client, CSV_ROWS)
+    assert_same(streamed, expected)
+    assert [("error" in r) for r in expected] == [False, False, True, True, True, True]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+cv = pytest.importorskip("cv2")
+
+from services.image_colorization import router as colorize
+
+
+def png(bgr: np.ndarray) -> bytes:
+    ok, data = cv.imencode(".png", bgr)
+    assert ok
+    return data.tobytes()
+
+
+def test_gray_ramp_round_trips():
+    levels = np.array([0, 64, 128, 192, 255], dtype=np.uint8)
+    gray = np.repeat(np.repeat(levels, 8)[None, :], 8, axis=0)
+    bgr = np.dstack([gray] * 3)
+
+    l, l_resized = colorize.decode_and_prepare(png(bgr))
+
+    # L in 0..100 and the net input centred on it
+    assert l.dtype == np.float32
+    assert 0 <= l.min() and l.max() <= 100
+    assert -50 <= l_resized.min() and l_resized.max() <= 50
+
+    # Zero ab (no colour) must give back the input grays
+    out = colorize.compose_output(l, np.zeros((56, 56, 2), dtype=np.float32))
+    assert np.abs(out.astype(int) - bgr.astype(int)).max() <= 1
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils import model_downloader
+from utils.model_downloader import download_file
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+GOOD = {"size": len(PAYLOAD), "sha256": hashlib.sha256(PAYLOAD).hexdigest()}
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves one file with Range support; behaviour is tweaked per test."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.body = PAYLOAD
+        self.cut_after = None  # send only this many bytes of the next response
+        self.send_length = True
+        self.ranges = True  # honour Range headers
+        self.requests = []  # Range header of every GET
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/uc"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server, body = self.server, self.server.body
+        rng = self.headers.get("Range")
+        server.requests.append(rng)
+
+        start, end = 0, len(body) - 1
+        if rng and server.ranges:
+            first, _, last = rng[len("bytes="):].partition("-")
+            start = int(first)
+            end = int(last) if last else end
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+
+        chunk = body[start:end + 1]
+        if server.send_length:
+            self.send_header("Content-Length", str(len(chunk)))
+        self.end_headers()
+
+        if server.cut_after is not None:
+            chunk, server.cut_after = chunk[:server.cut_after], None
+            self.wfile.write(chunk)
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(chunk)
+
+
+@pytest.fixture
+def server():
+    srv = FileServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(model_downloader, "CHUNK_SIZE", 64 * 1024)
+
+
+def fetch(server, dest, expected=GOOD):
+    download_file("file-id", dest, expected, requests.Session(), url=server.url)
+
+
+def test_fresh_download(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    fetch(server, dest)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert not dest.with_name("model.h5.part").exists()
+
+
+def test_interrupted_download_resumes(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    part = dest.with_name("model.h5.part")
+    server.cut_after = 300_000
+
+    with pytest.raises(Exception):
+        fetch(server, dest)
+    assert not dest.exists()
+    assert 0 < part.stat().st_size < len(PAYLOAD)
+    done = part.stat().st_size
+
+    fetch(server, dest)
+    assert dest.read_bytes() == PAYLOAD
+    assert server.requests[-1] == f"bytes={done}-"
+
+
+def test_corrupt_download_is_rejected(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    server.body = PAYLOAD[:-1] + b"\x00"
+
+    with pytest.raises(RuntimeError, match="verification"):
+        fetch(server, dest)
+    assert not dest.exists()
+    assert not dest.with_name("model.h5.part").exists()
+
+
+def test_truncated_existing_file_is_replaced(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    dest.write_bytes(PAYLOAD[:1000])
+
+    fetch(server, dest)
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_verified_existing_file_is_kept(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    dest.write_bytes(PAYLOAD)
+
+    fetch(server, dest)
+    assert server.requests == []
+
+
+def test_without_manifest_server_size_is_checked(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    dest.write_bytes(PAYLOAD[:1000])
+
+    fetch(server, dest, expected={"size": None, "sha256": None})
+    assert dest.read_bytes() == PAYLOAD
+
+    fetch(server, dest, expected={})
+    assert server.requests[-1] == "bytes=0-0"  # size probe only
+
+
+def test_unverifiable_download_fails_closed(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    server.send_length = False
+
+    with pytest.raises(RuntimeError, match="can't be verified"):
+        fetch(server, dest, expected={})
+    assert not dest.exists()
+
+
+def test_unverifiable_existing_file_is_kept(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    dest.write_bytes(PAYLOAD[:1000])
+    server.send_length = False
+    server.ranges = False
+
+    fetch(server, dest, expected={})
+    assert dest.read_bytes() == PAYLOAD[:1000]
+    assert server.requests == ["bytes=0-0"]  # size probe only
+
+
+def test_complete_part_is_verified_after_416(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    part = dest.with_name("model.h5.part")
+
+    part.write_bytes(PAYLOAD[:-1] + b"\x00")
+    with pytest.raises(RuntimeError, match="verification"):
+        fetch(server, dest)
+    assert server.requests[-1] == f"bytes={len(PAYLOAD)}-"
+    assert not part.exists() and not dest.exists()
+
+    part.write_bytes(PAYLOAD)
+    fetch(server, dest)
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_concurrent_callers_download_once(server, tmp_path):
+    dest = tmp_path / "model.h5"
+    errors = []
+
+    def worker():
+        try:
+            fetch(server, dest)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert dest.read_bytes() == PAYLOAD
+    assert server.requests == [None]
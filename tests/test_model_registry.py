@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from utils import model_registry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(model_registry, "_entries", {})
+    monkeypatch.setattr(model_registry, "MODEL_REQUIRED", None)
+    monkeypatch.setattr(model_registry, "downloads_complete", threading.Event())
+    model_registry.downloads_complete.set()
+    return model_registry
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+def test_lazy_without_required_models_is_ready(registry):
+    registry.register("tabular", lambda: 1)
+    registry.register("big", lambda: 2, needs_download=True)
+
+    assert registry.readiness()["ready"]
+    assert registry.status()["tabular"]["state"] == "pending"
+
+
+def test_preloaded_repo_models_are_required(registry):
+    registry.register("tabular", lambda: 1)
+    registry.register("big", lambda: 2, needs_download=True)
+    for e in registry._entries.values():
+        e.preload = True
+
+    r = registry.readiness()
+    assert not r["ready"] and r["waiting_on"] == ["tabular"]
+
+    registry.get("tabular")
+    assert registry.readiness()["ready"]  # "big" is still loading: optional
+
+
+def test_failed_optional_model_degrades(registry):
+    registry.register("tabular", lambda: 1)
+    registry.register("broken", fail, needs_download=True)
+    registry.preload_all()
+
+    r = registry.readiness()
+    assert r["ready"] and r["status"] == "degraded" and r["failed"] == ["broken"]
+
+
+def test_failed_required_model_blocks(registry, monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_REQUIRED", "broken")
+    registry.register("tabular", lambda: 1)
+    registry.register("broken", fail)
+    registry.preload_background(lazy=True).join()
+
+    assert registry.status()["tabular"]["state"] == "pending"
+    r = registry.readiness()
+    assert not r["ready"] and r["waiting_on"] == ["broken"]
@@ -0,0 +1,67 @@
+"""
+phishing_email startup with the network blocked: each probe is a fresh
+interpreter whose sockets raise on connect/resolve.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Router import on top of fastapi/pydantic (shared by every service)
+IMPORT_BUDGET_MS = float(os.getenv("PHISHING_IMPORT_BUDGET_MS", "50"))
+RUNS = 3
+
+PROBE = r"""
+import json, socket, sys, time
+
+def offline(*args, **kwargs):
+    raise OSError("network access during phishing_email startup")
+socket.socket.connect = socket.socket.connect_ex = offline
+socket.getaddrinfo = socket.create_connection = offline
+
+import fastapi, pydantic
+start = time.perf_counter()
+import services.phishing_email.router as phishing
+import_ms = (time.perf_counter() - start) * 1000
+
+error = None
+if "--load" in sys.argv:
+    try:
+        phishing.load_artifacts()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+print(json.dumps({
+    "import_ms": import_ms,
+    "error": error,
+    "nltk_imported": any(m == "nltk" or m.startswith("nltk.") for m in sys.modules),
+}))
+"""
+
+
+def probe(*args) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE, *args],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_router_import_within_budget():
+    runs = [probe() for _ in range(RUNS)]
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+
+    assert import_ms <= IMPORT_BUDGET_MS, f"import took {import_ms:.1f} ms (budget {IMPORT_BUDGET_MS:g} ms)"
+    assert not any(r["nltk_imported"] for r in runs)
+
+
+def test_artifacts_load_offline():
+    # load_artifacts() includes the self-check against known texts
+    result = probe("--load")
+
+    assert result["error"] is None
+    assert not result["nltk_imported"]
@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.result_store import ResultStore
+
+
+def test_key_depends_on_params():
+    data = b"image bytes"
+    assert ResultStore.key_for(data) == ResultStore.key_for(data)
+    assert ResultStore.key_for(data, "fp16=0") != ResultStore.key_for(data, "fp16=1")
+    assert ResultStore.key_for(data, "a", "b") != ResultStore.key_for(data, "ab")
+
+
+def test_hit_on_file_written_by_another_worker(tmp_path):
+    a = ResultStore(tmp_path, max_bytes=1000)
+    b = ResultStore(tmp_path, max_bytes=1000)
+
+    a.put("k1", b"x" * 10)
+    path = b.get("k1")
+
+    assert path is not None and path.read_bytes() == b"x" * 10
+    assert b.stats()["hits"] == 1
+
+
+def test_budget_is_shared_across_workers(tmp_path):
+    a = ResultStore(tmp_path, max_bytes=250)
+    b = ResultStore(tmp_path, max_bytes=250)
+
+    a.put("old", b"a" * 100)
+    os.utime(a.path_for("old"), (1, 1))  # oldest access
+    b.put("mid", b"b" * 100)
+    a.put("new", b"c" * 100)
+
+    # 300 bytes across both workers' writes: the oldest file goes
+    assert not a.path_for("old").exists()
+    assert a.path_for("mid").exists() and a.path_for("new").exists()
+    assert a.stats()["bytes"] == 200
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    store = ResultStore(tmp_path, max_bytes=1000)
+    store.put("k", b"data")
+    store.path_for("k").unlink()
+
+    assert store.get("k") is None
+    assert store.stats()["misses"] == 1
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    stores = [ResultStore(tmp_path, max_bytes=10_000) for _ in range(4)]
+    payloads = [bytes([i]) * 500 for i in range(16)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: stores[i % 4].put("k", payloads[i]), range(16)))
+
+    assert stores[0].path_for("k").read_bytes() in payloads
+    assert list(tmp_path.glob("*.tmp")) == []
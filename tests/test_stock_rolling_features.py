@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.stock_prediction.models.feature_engineering import feature_engineering
+from services.stock_prediction.rolling_features import (
+    FEATURE_COLUMNS, WINDOW, RollingFeatures, last_row_features,
+)
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Adj_Close", "Volume"]
+RTOL = 1e-12
+
+
+def history(rows, seed=0, start="2000-01-03"):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    open_ = close * (1 + rng.normal(0, 0.005, rows))
+    return pd.DataFrame({
+        "Date": pd.bdate_range(start, periods=rows).strftime("%Y-%m-%d"),
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.random(rows) * 0.01),
+        "Low": np.minimum(open_, close) * (1 - rng.random(rows) * 0.01),
+        "Close": close,
+        "Adj_Close": close,
+        "Volume": rng.integers(1e5, 1e7, rows).astype(float),
+    })
+
+
+def reference(df):
+    """Newest row from feature_engineering(), or None when it keeps no rows."""
+    out = feature_engineering(df).rename(columns={"Adj_Close": "Adj Close"})
+    if out.empty:
+        return None
+    return out[FEATURE_COLUMNS].iloc[-1].to_numpy(dtype=float)
+
+
+def fast(df):
+    bars = df[BAR_COLUMNS].to_numpy()
+    result = last_row_features(df["Date"].tolist(), lambda i: bars[i])
+    return None if result is None else result[1]
+
+
+def stream(df):
+    """Feature row after every bar, fed through RollingFeatures."""
+    state = RollingFeatures()
+    return [state.append(pd.Timestamp(r.Date), *(getattr(r, c) for c in BAR_COLUMNS))
+            for r in df.itertuples()]
+
+
+def test_every_prefix_matches():
+    df = history(120)
+    rows = stream(df)
+    for n in range(WINDOW, len(df) + 1):
+        prefix = df.iloc[:n]
+        expected = reference(prefix)
+        np.testing.assert_allclose(rows[n - 1], expected, rtol=RTOL, atol=0)
+        np.testing.assert_allclose(fast(prefix), expected, rtol=RTOL, atol=0)
+
+
+def test_unsorted_history_matches():
+    df = history(80).sample(frac=1.0, random_state=3)
+    np.testing.assert_allclose(fast(df), reference(df), rtol=RTOL, atol=0)
+
+
+@pytest.mark.parametrize("rows", [0, 1, WINDOW - 1])
+def test_short_history_has_no_row(rows):
+    df = history(rows)
+    assert reference(df) is None
+    assert fast(df) is None
+    assert all(r is None for r in stream(df))
+
+
+def test_warm_up_rows_are_none():
+    rows = stream(history(WINDOW + 5))
+    assert all(r is None for r in rows[:WINDOW - 1])
+    assert all(r is not None for r in rows[WINDOW - 1:])
+
+
+def test_nan_outside_window_is_ignored():
+    df = history(60)
+    df.loc[5, "Volume"] = np.nan
+    df.loc[10, "Close"] = np.nan
+    np.testing.assert_allclose(fast(df), reference(df), rtol=RTOL, atol=0)
+
+
+@pytest.mark.parametrize("column", ["Close", "Volume", "Open"])
+def test_nan_inside_window_falls_back(column):
+    # The fast path declines; the router then uses feature_engineering() itself
+    df = history(60)
+    df.loc[len(df) - 3, column] = np.nan
+    assert fast(df) is None
+
+
+def test_zero_close_return_matches():
+    df = history(40)
+    df.loc[len(df) - 1, "Close"] = 0.0
+    np.testing.assert_allclose(fast(df), reference(df), rtol=RTOL, atol=0)
+
+
+def test_zero_over_zero_return_drops_the_row():
+    df = history(40)
+    df.loc[len(df) - 2:, "Close"] = 0.0
+    state_rows = stream(df)
+    assert state_rows[-1] is None
+    assert fast(df) is None
+
+
+def test_multi_ticker_frame():
+    tickers = {t: history(30 + 7 * i, seed=i) for i, t in enumerate(["AAA", "BBB", "CCC"])}
+    frame = pd.concat([df.assign(Ticker=t) for t, df in tickers.items()], ignore_index=True)
+    frame = frame.sample(frac=1.0, random_state=0)  # interleaved, as a bulk upload would be
+
+    states = {t: RollingFeatures() for t in tickers}
+    last = {}
+    for r in frame.sort_values("Date", kind="stable").itertuples():
+        last[r.Ticker] = states[r.Ticker].append(
+            pd.Timestamp(r.Date), *(getattr(r, c) for c in BAR_COLUMNS))
+
+    for ticker, group in frame.groupby("Ticker"):
+        expected = reference(group.drop(columns="Ticker"))
+        np.testing.assert_allclose(fast(group), expected, rtol=RTOL, atol=0)
+        np.testing.assert_allclose(last[ticker], expected, rtol=RTOL, atol=0)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import tree_compiler
+from utils.artifacts import BoosterClassifier
+from utils.tree_compiler import compile_model, maybe_compile, verify
+
+N_FEATURES = 6
+CATEGORY = 5  # integer-coded category column, like the LabelEncoder outputs
+
+
+def training_data(seed=0, rows=600, with_nan=False):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, N_FEATURES))
+    X[:, CATEGORY] = rng.integers(0, 8, rows)
+    logit = X[:, 0] - 0.5 * X[:, 1] + 0.3 * X[:, 2] * X[:, 3] + (X[:, CATEGORY] % 3 == 0)
+    y = (logit + rng.normal(scale=0.5, size=rows) > 0).astype(int)
+    if with_nan:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+
+def scoring_rows(seed=1, rows=300):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, N_FEATURES))
+    X[:, CATEGORY] = rng.integers(0, 8, rows)
+    X[rng.random(X.shape) < 0.15] = np.nan  # missing values anywhere
+    X[::7, CATEGORY] = -1  # unknown code for an unseen category
+    X[::11, CATEGORY] = 42  # code beyond anything seen in training
+    X[::13, 0] = 0.0  # exact zeros hit LightGBM's zero-as-missing handling
+    return X
+
+
+def catboost_model(with_nan):
+    catboost = pytest.importorskip("catboost")
+    X, y = training_data(with_nan=with_nan)
+    return catboost.CatBoostClassifier(
+        iterations=40, depth=4, random_seed=0, verbose=False, thread_count=1,
+        allow_writing_files=False,
+    ).fit(X, y)
+
+
+def lightgbm_model(with_nan):
+    # Native Booster behind BoosterClassifier, as utils.artifacts loads the insurance model
+    lightgbm = pytest.importorskip("lightgbm")
+    X, y = training_data(with_nan=with_nan)
+    params = {"objective": "binary", "num_leaves": 15, "seed": 0, "deterministic": True,
+              "num_threads": 1, "verbose": -1}
+    booster = lightgbm.train(params, lightgbm.Dataset(X, y), num_boost_round=40)
+    return BoosterClassifier(booster, [0, 1])
+
+
+def xgboost_model(with_nan):
+    xgboost = pytest.importorskip("xgboost")
+    X, y = training_data(with_nan=with_nan)
+    return xgboost.XGBClassifier(n_estimators=40, max_depth=4, random_state=0, n_jobs=1).fit(X, y)
+
+
+MODELS = {"catboost": catboost_model, "lightgbm": lightgbm_model, "xgboost": xgboost_model}
+
+
+@pytest.mark.parametrize("with_nan", [False, True], ids=["dense", "nan-trained"])
+@pytest.mark.parametrize("library", list(MODELS))
+def test_predict_proba_matches_library(library, with_nan):
+    model = MODELS[library](with_nan)
+    compiled = compile_model(model)
+    X = scoring_rows()
+
+    expected = model.predict_proba(X)
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=1e-5, atol=1e-6)
+    # the single-row path the /predict batcher hits
+    for i in range(20):
+        np.testing.assert_allclose(compiled.predict_proba(X[i:i + 1]), expected[i:i + 1], rtol=1e-5, atol=1e-6)
+
+    assert verify(model, compiled) < 1e-5
+
+
+def test_dataframe_columns_are_reordered():
+    model = lightgbm_model(with_nan=False)
+    compiled = compile_model(model)
+    X = pd.DataFrame(scoring_rows(), columns=compiled.feature_names)
+
+    shuffled = X[list(reversed(X.columns))]
+    np.testing.assert_allclose(compiled.predict_proba(shuffled), model.predict_proba(X), rtol=1e-5, atol=1e-6)
+
+
+def test_large_batches_use_the_library(monkeypatch):
+    monkeypatch.setattr(tree_compiler, "TREE_PREDICTOR", "compiled")
+    model = catboost_model(with_nan=False)
+    compiled = maybe_compile(model, "test")
+    X = scoring_rows()
+
+    assert compiled.fallback is model
+    np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+
+
+def test_sklearn_model_is_left_uncompiled(monkeypatch):
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    monkeypatch.setattr(tree_compiler, "TREE_PREDICTOR", "compiled")
+    X, y = training_data()
+    model = GradientBoostingClassifier(n_estimators=10, random_state=0).fit(X, y)
+
+    with pytest.raises(NotImplementedError):
+        compile_model(model)
+    assert maybe_compile(model, "test") is model
@@ -0,0 +1,404 @@
+"""
+Native, pickle-free artifact store for the tabular services.
+
+    python -m utils.artifacts convert services/fraud_transaction/models [--remove-source]
+
+Each .pkl/.joblib in the directory is written next to itself in a native
+format and recorded in the directory's artifacts.json manifest:
+
+    CatBoost model              <stem>.cbm
+    LightGBM model              <stem>.lgb.txt   (Booster text format)
+    XGBoost model               <stem>.ubj       (UBJSON)
+    sklearn scalers / label     <stem>.skl/      (header.json + one .npy per
+    encoders, or a dict of them                   fitted array, mmap-loaded)
+    plain lists / dicts         <stem>.json
+
+load(path) takes the *original* artifact path: if the manifest has a native
+copy it is loaded without unpickling, otherwise it falls back to joblib.
+A native copy is only trusted while it still matches its source: when the
+pickle's SHA-256, the library version or the format version differ from
+what the manifest recorded, load() warns and reads the pickle instead
+(re-run convert to refresh the copy).
+"""
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "artifacts.json"
+FORMAT_VERSION = 2
+
+SKLEARN_CLASSES = {
+    "StandardScaler": "sklearn.preprocessing",
+    "MinMaxScaler": "sklearn.preprocessing",
+    "RobustScaler": "sklearn.preprocessing",
+    "MaxAbsScaler": "sklearn.preprocessing",
+    "LabelEncoder": "sklearn.preprocessing",
+}
+
+
+# ---------------------------------------------------------------- manifest
+
+def read_manifest(directory: Path) -> Dict[str, dict]:
+    path = directory / MANIFEST_NAME
+    if not path.is_file():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(directory: Path, manifest: Dict[str, dict]):
+    tmp = directory / f".{MANIFEST_NAME}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, directory / MANIFEST_NAME)
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+FORMAT_LIBRARIES = {
+    "catboost-cbm": "catboost",
+    "lightgbm-txt": "lightgbm",
+    "xgboost-ubj": "xgboost",
+    "sklearn-npy": "sklearn",
+}
+
+# Import name -> distribution name, for looking up installed versions
+DISTRIBUTIONS = {"sklearn": "scikit-learn"}
+
+
+def _installed_version(lib: str) -> Optional[str]:
+    try:
+        return importlib.metadata.version(DISTRIBUTIONS.get(lib, lib))
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _library_versions(fmt: str) -> Dict[str, str]:
+    versions = {"numpy": np.__version__}
+    lib = FORMAT_LIBRARIES.get(fmt)
+    if lib is not None:
+        versions[lib] = _installed_version(lib) or "unknown"
+    return versions
+
+
+def _major_minor(version: Optional[str]) -> Optional[str]:
+    return ".".join(version.split(".")[:2]) if version else version
+
+
+def _stale_reason(entry: dict, source: Path) -> Optional[str]:
+    """
+    Why the native copy no longer stands for `source`, or None if it does.
+    Library versions are compared on major.minor only: patch releases don't
+    change the native formats.
+    """
+    if entry.get("format_version") != FORMAT_VERSION:
+        return f"format version {entry.get('format_version')} != {FORMAT_VERSION}"
+    lib = FORMAT_LIBRARIES.get(entry["format"])
+    if lib is not None:
+        recorded = entry.get("versions", {}).get(lib)
+        installed = _installed_version(lib)
+        if _major_minor(recorded) != _major_minor(installed):
+            return f"written by {lib} {recorded}, {installed} installed"
+    if source.is_file() and _sha256(source) != entry.get("source_sha256"):
+        return f"{source.name} changed since conversion"
+    return None
+
+
+# ---------------------------------------------------------------- sklearn
+
+def _save_sklearn(obj, out_dir: Path, prefix: str) -> dict:
+    cls = type(obj).__name__
+    if cls not in SKLEARN_CLASSES:
+        raise TypeError(f"Unsupported sklearn type {cls}")
+
+    entry = {"class": cls, "params": obj.get_params(), "arrays": {}, "strings": {}, "attrs": {}}
+    for attr, value in vars(obj).items():
+        if not attr.endswith("_") or attr.startswith("_"):
+            continue
+        if isinstance(value, np.ndarray) and _is_strings(value):
+            entry["strings"][attr] = _save_strings(value, out_dir, f"{prefix}{attr}")
+        elif isinstance(value, np.ndarray):
+            fname = f"{prefix}{attr}.npy"
+            arr = value.astype(str) if value.dtype == object else value
+            np.save(out_dir / fname, np.ascontiguousarray(arr), allow_pickle=False)
+            entry["arrays"][attr] = fname
+        elif isinstance(value, (np.integer, np.floating)):
+            entry["attrs"][attr] = value.item()
+        elif isinstance(value, (int, float, str, bool)) or value is None:
+            entry["attrs"][attr] = value
+        else:
+            raise TypeError(f"Can't flatten {cls}.{attr} of type {type(value).__name__}")
+    return entry
+
+
+def _is_strings(arr: np.ndarray) -> bool:
+    if arr.dtype.kind == "U":
+        return True
+    return arr.dtype == object and arr.ndim == 1 and all(isinstance(v, str) for v in arr)
+
+
+def _save_strings(arr: np.ndarray, out_dir: Path, stem: str) -> dict:
+    """
+    1-D string array as one UTF-8 blob plus end offsets. Fixed-width "<U"
+    pads every string to the longest one at 4 bytes a character; for long
+    category lists that is several times the pickle.
+    """
+    encoded = [str(v).encode("utf-8") for v in arr]
+    offsets = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    if not len(offsets) or offsets[-1] < 2 ** 31:
+        offsets = offsets.astype(np.int32)
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    files = {"data": f"{stem}.utf8.npy", "offsets": f"{stem}.offsets.npy"}
+    np.save(out_dir / files["data"], blob, allow_pickle=False)
+    np.save(out_dir / files["offsets"], offsets, allow_pickle=False)
+    return files
+
+
+def _load_strings(files: dict, in_dir: Path) -> np.ndarray:
+    blob = np.load(in_dir / files["data"]).tobytes()
+    ends = np.load(in_dir / files["offsets"]).tolist()
+    out = np.empty(len(ends), dtype=object)
+    start = 0
+    for i, end in enumerate(ends):
+        out[i] = blob[start:end].decode("utf-8")
+        start = end
+    return out
+
+
+def _load_sklearn(entry: dict, in_dir: Path):
+    import importlib
+    cls = getattr(importlib.import_module(SKLEARN_CLASSES[entry["class"]]), entry["class"])
+    obj = cls(**entry["params"])
+    for attr, fname in entry["arrays"].items():
+        arr = np.load(in_dir / fname, mmap_mode="r")
+        # sklearn validates input column names against an object array
+        setattr(obj, attr, arr.astype(object) if attr == "feature_names_in_" else arr)
+    for attr, files in entry.get("strings", {}).items():
+        setattr(obj, attr, _load_strings(files, in_dir))
+    for attr, value in entry["attrs"].items():
+        setattr(obj, attr, value)
+    return obj
+
+
+def _safe_name(key: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+
+
+def save_sklearn(obj, out_dir: Path):
+    """A sklearn object, or a dict of them, as header.json + .npy arrays."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.glob("*.npy"):  # arrays from an earlier conversion
+        stale.unlink()
+    if isinstance(obj, dict):
+        header = {
+            "type": "dict",
+            "entries": {k: _save_sklearn(v, out_dir, f"{_safe_name(k)}.") for k, v in obj.items()},
+        }
+    else:
+        header = {"type": "single", "entry": _save_sklearn(obj, out_dir, "")}
+    header["format_version"] = FORMAT_VERSION
+    with open(out_dir / "header.json", "w") as f:
+        json.dump(header, f, indent=2)
+
+
+def load_sklearn(in_dir: Path):
+    with open(in_dir / "header.json") as f:
+        header = json.load(f)
+    if header["type"] == "dict":
+        return {k: _load_sklearn(e, in_dir) for k, e in header["entries"].items()}
+    return _load_sklearn(header["entry"], in_dir)
+
+
+# ---------------------------------------------------------------- boosters
+
+class BoosterClassifier:
+    """predict_proba/predict over a native LightGBM Booster (binary or multiclass)."""
+
+    def __init__(self, booster, classes):
+        self.booster = booster
+        self.classes_ = np.asarray(classes)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.booster.predict(X)
+        if p.ndim == 1:
+            return np.column_stack([1.0 - p, p])
+        return p
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _convert_object(obj, source: Path) -> dict:
+    """Write obj natively next to source; return its manifest entry."""
+    module = type(obj).__module__.split(".")[0]
+    cls = type(obj).__name__
+    stem = source.with_suffix("")
+
+    if module == "catboost":
+        out = stem.with_suffix(".cbm")
+        obj.save_model(str(out), format="cbm")
+        return {"format": "catboost-cbm", "path": out.name, "class": cls}
+
+    if module == "lightgbm":
+        out = source.with_name(stem.name + ".lgb.txt")
+        booster = obj.booster_ if hasattr(obj, "booster_") else obj
+        booster.save_model(str(out))
+        entry = {"format": "lightgbm-txt", "path": out.name, "class": cls}
+        if hasattr(obj, "classes_"):
+            entry["classes"] = np.asarray(obj.classes_).tolist()
+        return entry
+
+    if module == "xgboost":
+        out = stem.with_suffix(".ubj")
+        obj.save_model(str(out))
+        return {"format": "xgboost-ubj", "path": out.name, "class": cls}
+
+    if module == "sklearn" or (isinstance(obj, dict) and obj and all(
+        type(v).__module__.startswith("sklearn") for v in obj.values()
+    )):
+        out = source.with_name(stem.name + ".skl")
+        save_sklearn(obj, out)
+        return {"format": "sklearn-npy", "path": out.name, "class": cls}
+
+    if isinstance(obj, (list, dict, str, int, float)):
+        out = stem.with_suffix(".json")
+        with open(out, "w") as f:
+            json.dump(obj, f, indent=2)
+        return {"format": "json", "path": out.name, "class": cls}
+
+    raise TypeError(f"No native format for {module}.{cls}")
+
+
+def _load_native(entry: dict, directory: Path):
+    fmt = entry["format"]
+    path = directory / entry["path"]
+
+    if fmt == "catboost-cbm":
+        import catboost
+        model = getattr(catboost, entry["class"])()
+        model.load_model(str(path), format="cbm")
+        return model
+
+    if fmt == "lightgbm-txt":
+        import lightgbm as lgb
+        booster = lgb.Booster(model_file=str(path))
+        if "classes" in entry:
+            return BoosterClassifier(booster, entry["classes"])
+        return booster
+
+    if fmt == "xgboost-ubj":
+        import xgboost as xgb
+        model = getattr(xgb, entry["class"])()
+        model.load_model(str(path))
+        return model
+
+    if fmt == "sklearn-npy":
+        return load_sklearn(path)
+
+    if fmt == "json":
+        with open(path) as f:
+            return json.load(f)
+
+    raise ValueError(f"Unknown artifact format '{fmt}'")
+
+
+# ---------------------------------------------------------------- public API
+
+def load(path: Path) -> Any:
+    """
+    Load the artifact originally stored at `path`, preferring its native
+    copy from the manifest. Falls back to joblib (which also reads plain
+    pickles) when there is no native copy or it fails to load.
+    """
+    path = Path(path)
+    entry = read_manifest(path.parent).get(path.name)
+    if entry is not None and (path.parent / entry["path"]).exists():
+        stale = _stale_reason(entry, path)
+        if stale is not None and path.is_file():
+            logger.warning(
+                f"{entry['path']} is out of date ({stale}), loading {path.name}; "
+                f"refresh with: python -m utils.artifacts convert {path.parent}"
+            )
+        else:
+            if stale is not None:
+                logger.warning(f"{entry['path']} is out of date ({stale}) and {path.name} is gone, loading it anyway")
+            try:
+                return _load_native(entry, path.parent)
+            except Exception as e:
+                logger.warning(f"Native load of {entry['path']} failed ({e}), falling back to {path.name}")
+
+    if not path.is_file():
+        raise RuntimeError(f"Missing artifact: {path}")
+    import joblib
+    return joblib.load(path)
+
+
+def convert(path: Path, remove_source: bool = False) -> dict:
+    """Convert one .pkl/.joblib file and record it in the manifest."""
+    import joblib
+    path = Path(path)
+    obj = joblib.load(path)
+    entry = _convert_object(obj, path)
+    entry.update({
+        "source_sha256": _sha256(path),
+        "versions": _library_versions(entry["format"]),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "format_version": FORMAT_VERSION,
+    })
+
+    manifest = read_manifest(path.parent)
+    manifest[path.name] = entry
+    write_manifest(path.parent, manifest)
+
+    if remove_source:
+        path.unlink()
+    return entry
+
+
+def convert_dir(directory: Path, remove_source: bool = False):
+    for path in sorted(directory.iterdir()):
+        if path.suffix not in (".pkl", ".joblib"):
+            continue
+        try:
+            entry = convert(path, remove_source)
+            print(f"✅ {path.name} -> {entry['path']} ({entry['format']})")
+        except Exception as e:
+            print(f"⚠️ {path.name}: not converted ({e})")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m utils.artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="convert .pkl/.joblib files to native formats")
+    conv.add_argument("paths", nargs="+", type=Path, help="model directories or files")
+    conv.add_argument("--remove-source", action="store_true", help="delete the pickle after converting")
+    args = parser.parse_args()
+
+    for p in args.paths:
+        if p.is_dir():
+            convert_dir(p, args.remove_source)
+        else:
+            entry = convert(p, args.remove_source)
+            print(f"✅ {p.name} -> {entry['path']} ({entry['format']})")
+
+
+if __name__ == "__main__":
+    main()
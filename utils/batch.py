@@ -0,0 +1,46 @@
+import json
+from typing import Any, Dict, List, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+# Hard cap on records per /predict/batch call
+MAX_BATCH_SIZE = 50_000
+
+
+def validate_records(
+    records: List[Dict[str, Any]], schema: Type[BaseModel]
+) -> Tuple[List[BaseModel], List[int], Dict[int, Any]]:
+    """
+    Validate raw batch records against a pydantic schema. FastAPI has
+    already checked that each record is an object, so the only per-row
+    failure left is a field-level ValidationError.
+    Returns (valid items, their original indices, {index: error}).
+    """
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(records)} > {MAX_BATCH_SIZE} records"
+        )
+
+    items, indices, errors = [], [], {}
+    for i, rec in enumerate(records):
+        try:
+            items.append(schema(**rec))
+            indices.append(i)
+        except ValidationError as e:
+            # e.json() keeps the errors JSON-serializable (ctx may hold exceptions)
+            errors[i] = json.loads(e.json())
+    return items, indices, errors
+
+
+def merge_results(
+    total: int, indices: List[int], results: List[Dict[str, Any]], errors: Dict[int, Any]
+) -> List[Dict[str, Any]]:
+    """Put scored rows and per-row errors back into request order."""
+    out: List[Dict[str, Any]] = [None] * total
+    for i, res in zip(indices, results):
+        out[i] = {"index": i, **res}
+    for i, err in errors.items():
+        out[i] = {"index": i, "error": err}
+    return out
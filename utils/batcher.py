@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable per batcher
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+DEFAULT_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "1024"))
+
+# name -> MicroBatcher, for stats/health reporting
+_batchers: Dict[str, "MicroBatcher"] = {}
+
+_batch_sizes = metrics.Histogram("inference_batch_size", "Items per micro-batch", ["batcher"],
+                                 buckets=metrics.SIZE_BUCKETS)
+_batch_seconds = metrics.Histogram("inference_batch_seconds", "predict_fn time per micro-batch", ["batcher"])
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item inference calls into one batched call.
+
+    predict_fn receives a list of items and must return a sequence of
+    results of the same length and order. It runs on a dedicated worker
+    thread, so neither the event loop nor the request threadpool is held
+    while the model runs.
+
+    A batch is flushed when it reaches max_batch_size or when
+    max_wait_ms has passed since its first item arrived. With workers > 1,
+    that many threads pull batches concurrently, so predict_fn must be
+    safe to call from several threads (e.g. by checking out a model copy).
+
+    At most max_queue items may wait for a batch; beyond that submit()
+    raises 503 instead of letting the backlog grow.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        predict_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        workers: int = 1,
+        max_queue: Optional[int] = None,
+    ):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size or DEFAULT_MAX_BATCH_SIZE
+        self.max_wait = (DEFAULT_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+
+        self.workers = workers
+        self.max_queue = DEFAULT_MAX_QUEUE if max_queue is None else max_queue
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.rejected = 0
+
+        _batchers[name] = self
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    t = threading.Thread(
+                        target=self._run, name=f"batcher-{self.name}-{i}", daemon=True
+                    )
+                    t.start()
+                    self._threads.append(t)
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the returned Future resolves to its result."""
+        self._ensure_started()
+        fut: Future = Future()
+        try:
+            self._queue.put_nowait((item, fut))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} is at capacity, retry later"
+            )
+        return fut
+
+    async def predict(self, item: Any) -> Any:
+        """Await the result for one item from an async handler."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Skip requests whose caller already gave up
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.max_seen_batch = max(self.max_seen_batch, len(batch))
+
+            items = [item for item, _ in batch]
+            _batch_sizes.observe(len(items), self.name)
+            start = time.perf_counter()
+            try:
+                results = self.predict_fn(items)
+                _batch_seconds.observe(time.perf_counter() - start, self.name)
+                for (_, fut), res in zip(batch, results):
+                    fut.set_result(res)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # Isolate the bad input instead of failing the whole batch
+                logger.warning(f"{self.name}: batch of {len(batch)} failed ({e}), retrying per item")
+                for item, fut in batch:
+                    try:
+                        fut.set_result(self.predict_fn([item])[0])
+                    except Exception as item_err:
+                        fut.set_exception(item_err)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "workers": self.workers,
+        }
+
+
+def all_stats() -> Dict[str, dict]:
+    return {name: b.stats() for name, b in _batchers.items()}
+
+
+@metrics.register_collector
+def _collect_metrics():
+    return [
+        ("batcher_queue_depth", "gauge", "Items waiting for a micro-batch",
+         [({"batcher": name}, b._queue.qsize()) for name, b in _batchers.items()]),
+        ("batcher_rejected_total", "counter", "Items rejected at capacity (503)",
+         [({"batcher": name}, b.rejected) for name, b in _batchers.items()]),
+    ]
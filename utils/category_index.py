@@ -0,0 +1,77 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class CategoryIndex:
+    """
+    Precompiled lookup for a fitted LabelEncoder's classes_.
+
+    - exact():  dict lookup, O(1)
+    - fuzzy():  first class (in classes_ order) where value is a substring
+                of the class or the class is a substring of value.
+                Uses an n-gram posting index instead of scanning every class,
+                and memoizes results in a bounded LRU cache.
+
+    Codes are positions in classes_, which is exactly what
+    LabelEncoder.transform returns (classes_ is sorted).
+    """
+
+    def __init__(self, classes: Iterable, ngram: int = 3, cache_size: int = 4096):
+        self.classes: List[str] = [str(c) for c in classes]
+        self.codes: Dict[str, int] = {c: i for i, c in enumerate(self.classes)}
+        self.ngram = ngram
+
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        for i, c in enumerate(self.classes):
+            for g in self._ngrams(c):
+                self._grams[g].add(i)
+        self._grams = dict(self._grams)
+
+        # Longest class bounds the substrings of a query worth looking up
+        self._max_len = max((len(c) for c in self.classes), default=0)
+
+        self.fuzzy = lru_cache(maxsize=cache_size)(self._fuzzy)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def _ngrams(self, s: str) -> Set[str]:
+        n = self.ngram
+        return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+    def exact(self, value: str) -> Optional[int]:
+        return self.codes.get(value)
+
+    def _contained_in_class(self, value: str) -> Optional[int]:
+        # value is a substring of some class
+        grams = self._ngrams(value)
+        if not grams:
+            # Too short for the n-gram index; rare enough to scan
+            return next((i for i, c in enumerate(self.classes) if value in c), None)
+
+        postings = sorted((self._grams.get(g, set()) for g in grams), key=len)
+        candidates = set.intersection(*postings) if postings[0] else set()
+        hits = [i for i in candidates if value in self.classes[i]]
+        return min(hits) if hits else None
+
+    def _class_in_value(self, value: str) -> Optional[int]:
+        # some class is a substring of value: look up every substring
+        best = self.codes.get("")
+        L = len(value)
+        for start in range(L):
+            for end in range(start + 1, min(L, start + self._max_len) + 1):
+                code = self.codes.get(value[start:end])
+                if code is not None and (best is None or code < best):
+                    best = code
+        return best
+
+    def _fuzzy(self, value: str) -> Optional[int]:
+        found = [
+            c for c in (self._contained_in_class(value), self._class_in_value(value))
+            if c is not None
+        ]
+        return min(found) if found else None
+
+    def cache_info(self):
+        return self.fuzzy.cache_info()
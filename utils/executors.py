@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from utils import metrics
+
+# name -> BoundedExecutor, for stats/health reporting
+_executors: Dict[str, "BoundedExecutor"] = {}
+
+
+class BoundedExecutor:
+    """
+    Dedicated pool for CPU-bound work from async handlers.
+
+    Kept separate from FastAPI's default threadpool so heavy image work
+    can't starve cheap endpoints. At most max_workers jobs run and
+    max_queue more may wait; beyond that run() raises 503 instead of
+    letting the backlog grow.
+
+    kind="thread" suits OpenCV/TF ops that release the GIL; kind="process"
+    needs picklable, module-level functions and arguments.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}'")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._pool: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers)
+            if kind == "process"
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"exec-{name}")
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+        _executors[name] = self
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self, _fut=None):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        if not self._acquire():
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} is at capacity, retry later"
+            )
+        try:
+            fut = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        fut.add_done_callback(self._release)
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        running = min(pending, self.max_workers)
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queue_depth": pending - running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+def get_executor(
+    name: str,
+    max_workers: Optional[int] = None,
+    max_queue: Optional[int] = None,
+    kind: Optional[str] = None,
+) -> BoundedExecutor:
+    """
+    Create (once) or return the named executor.
+    EXECUTOR_<NAME>_WORKERS / _QUEUE / _KIND env vars override the defaults.
+    """
+    if name in _executors:
+        return _executors[name]
+
+    prefix = f"EXECUTOR_{name.upper()}_"
+    workers = int(os.getenv(prefix + "WORKERS", max_workers or os.cpu_count() or 1))
+    queue_size = int(os.getenv(prefix + "QUEUE", max_queue if max_queue is not None else workers * 4))
+    pool_kind = os.getenv(prefix + "KIND", kind or "thread")
+    return BoundedExecutor(name, workers, queue_size, pool_kind)
+
+
+def all_stats() -> Dict[str, dict]:
+    return {name: ex.stats() for name, ex in _executors.items()}
+
+
+@metrics.register_collector
+def _collect_metrics():
+    stats = all_stats()
+    def family(name, kind, help, key):
+        return name, kind, help, [({"executor": n}, st[key]) for n, st in stats.items()]
+    return [
+        family("executor_queue_depth", "gauge", "Submitted calls waiting for a worker", "queue_depth"),
+        family("executor_running", "gauge", "Calls running on a worker", "running"),
+        family("executor_completed_total", "counter", "Calls completed", "completed"),
+        family("executor_rejected_total", "counter", "Calls rejected at capacity (503)", "rejected"),
+    ]
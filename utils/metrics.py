@@ -0,0 +1,294 @@
+"""
+In-process, Prometheus-style metrics, rendered at GET /metrics.
+
+Nothing is sent anywhere: counters and histograms live in this process
+(one set per worker) and are formatted in the Prometheus text format when
+scraped. State owned by other modules (batcher and executor queues, model
+load times, cache hit counts) is read at scrape time through collectors,
+so request paths only pay for the few counters they touch.
+
+Instrumenting a router:
+
+    with metrics.stage("fraud_transaction", "features"):
+        X = build_input_row(input)
+
+    @metrics.stage("house_price", "inference")
+    def run_model(arr): ...
+
+MetricsMiddleware times every request per route template and records the
+part not covered by a top-level stage (body parsing, pydantic validation,
+response serialization, threadpool waits) as http_unattributed_seconds.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; the upper buckets catch image models and cold loads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+# (name, type, help, [(labels, value)]) as returned by collectors
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _labels(self, values: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, map(str, values)))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def family(self) -> Family:
+        with self._lock:
+            samples = [(self._labels(k), v) for k, v in self._values.items()]
+        return self.name, self.kind, self.help, samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)  # first bucket with value <= le
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def family(self) -> Family:
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        samples = []
+        for key, series in snapshot.items():
+            labels = self._labels(key)
+            total = 0
+            for le, n in zip(self.buckets + (float("inf"),), series):
+                total += n
+                samples.append(({**labels, "le": _format_value(le)}, total, "_bucket"))
+            samples.append((labels, series[-1], "_sum"))
+            samples.append((labels, total, "_count"))
+        return self.name, self.kind, self.help, samples
+
+
+def register_collector(fn: Callable[[], Iterable[Family]]):
+    """fn() is called on every scrape and returns metric families for state it owns."""
+    _collectors.append(fn)
+    return fn
+
+
+def register_cache(name: str, stats: Callable[[], dict]):
+    """Expose a cache whose stats() has hits/misses (and optionally entries) counts."""
+    def collect():
+        s = stats()
+        hits, misses = s.get("hits", 0), s.get("misses", 0)
+        labels = {"cache": name}
+        families = [
+            ("cache_hits_total", "counter", "Cache hits", [(labels, hits)]),
+            ("cache_misses_total", "counter", "Cache misses", [(labels, misses)]),
+            ("cache_hit_ratio", "gauge", "Hits over lookups since start",
+             [(labels, hits / (hits + misses) if hits + misses else 0.0)]),
+        ]
+        if "entries" in s:
+            families.append(("cache_entries", "gauge", "Entries currently cached", [(labels, s["entries"])]))
+        return families
+    register_collector(collect)
+
+
+def register_lru_cache(name: str, fn):
+    """register_cache for a functools.lru_cache-wrapped function."""
+    def stats():
+        info = fn.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+    register_cache(name, stats)
+
+
+# Request-scoped seconds spent in top-level stages: [seconds, open stages]
+_request_stages: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_stages", default=None)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+ERRORS = Counter("http_request_errors_total", "HTTP requests that failed with a 5xx or an exception",
+                 ["method", "route"])
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time per request stage", ["service", "stage"])
+UNATTRIBUTED_SECONDS = Histogram(
+    "http_unattributed_seconds",
+    "Request time outside instrumented stages: parsing, validation, serialization, waits",
+    ["method", "route"],
+)
+
+
+class stage:
+    """Time one stage of a request, as a context manager or a decorator (sync or async)."""
+
+    __slots__ = ("service", "name", "_start", "_acc")
+
+    def __init__(self, service: str, name: str):
+        self.service = service
+        self.name = name
+
+    def __enter__(self):
+        self._acc = _request_stages.get()
+        if self._acc is not None:
+            self._acc[1] += 1
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        STAGE_SECONDS.observe(elapsed, self.service, self.name)
+        acc = self._acc
+        if acc is not None:
+            acc[1] -= 1
+            if acc[1] == 0:
+                acc[0] += elapsed
+        return False
+
+    def __call__(self, fn):
+        service, name = self.service, self.name
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(service, name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(service, name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (doesn't buffer streaming bodies) recording per-route metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        acc = [0.0, 0]
+        token = _request_stages.set(acc)
+        start = time.perf_counter()
+        failed = True
+        try:
+            await self.app(scope, receive, send_status)
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stages.reset(token)
+            method = scope["method"]
+            route = route_label(scope)
+            REQUESTS.inc(method, route, status)
+            REQUEST_SECONDS.observe(elapsed, method, route)
+            if failed or status >= 500:
+                ERRORS.inc(method, route)
+            if acc[0]:
+                UNATTRIBUTED_SECONDS.observe(max(elapsed - acc[0], 0.0), method, route)
+
+
+def route_label(scope) -> str:
+    """
+    Route template ("/api/stocks/predict/{ticker}") rather than the raw path,
+    so path parameters don't explode label cardinality.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        # Mounted apps (e.g. /results static files) set root_path instead of a route
+        root = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+        return f"{root}/*" if root else "unmatched"
+    # Included routers may report the route's own path; take the prefix from the request
+    segments = scope["path"].split("/")
+    return "/".join(segments[:max(len(segments) - template.count("/"), 1)]) + template
+
+
+def _format_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v)) if abs(v) < 1e15 else repr(float(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    families = [m.family() for m in _metrics]
+    for collect in _collectors:
+        try:
+            families.extend(collect())
+        except Exception as e:  # a broken collector mustn't take /metrics down
+            families.append(("metrics_collector_errors", "gauge", "Collector failures",
+                             [({"collector": getattr(collect, "__qualname__", "?"), "error": str(e)[:200]}, 1)]))
+
+    # Collectors may report the same family for several objects; merge by name
+    merged: Dict[str, Family] = {}
+    for name, kind, help, samples in families:
+        if name in merged:
+            merged[name][3].extend(samples)
+        else:
+            merged[name] = (name, kind, help, list(samples))
+
+    lines = []
+    for name, kind, help, samples in merged.values():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample in samples:
+            labels, value = sample[0], sample[1]
+            suffix = sample[2] if len(sample) > 2 else ""
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,58 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# .npy copies of NumPy-backed artifact attributes, opened with mmap_mode="r"
+# so every worker process maps the same page-cache pages instead of holding
+# its own unpickled copy.
+MMAP_DIR = PROJECT_ROOT / "models" / "_mmap"
+
+
+def _fingerprint(source: Path) -> str:
+    st = source.stat()
+    return hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def cached_array(name: str, source: Path, build: Callable[[], np.ndarray]) -> np.ndarray:
+    """
+    Return a read-only memory-mapped array for `name`, exporting build()
+    to .npy the first time. The file is keyed on source's size and mtime,
+    so a replaced artifact gets a fresh export.
+    """
+    path = MMAP_DIR / f"{name}.{_fingerprint(source)}.npy"
+    if not path.exists():
+        arr = np.asarray(build())
+        if arr.dtype == object:
+            # object arrays need pickle; fixed-width unicode maps directly
+            arr = arr.astype(str)
+        MMAP_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr), allow_pickle=False)
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
+
+
+def mmap_attributes(obj, name: str, source: Path, attrs: Iterable[str]):
+    """Swap obj's NumPy attributes (e.g. classes_, mean_, scale_) for mmap-backed copies."""
+    for attr in attrs:
+        value = getattr(obj, attr, None)
+        # already file-backed (e.g. loaded by utils.artifacts)
+        if not isinstance(value, np.ndarray) or isinstance(value, np.memmap):
+            continue
+        # Strings would map only as fixed-width "<U", padded to the longest
+        # value at 4 bytes a character: far more pages than the objects
+        if value.dtype == object or value.dtype.kind == "U":
+            continue
+        setattr(obj, attr, cached_array(f"{name}.{attr}", source, lambda v=value: v))
+    return obj
+
+
+# Fitted-state arrays of the sklearn preprocessors used across the services
+SCALER_ATTRS = ("mean_", "var_", "scale_", "min_", "data_min_", "data_max_", "data_range_")
+ENCODER_ATTRS = ("classes_",)
@@ -1,5 +1,19 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import sys
+import time
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]  # backend/
 
@@ -28,6 +42,87 @@ LOCAL_MODELS = [
     "house_price_model"  # Example: you already pushed the scaler locally
 ]
 
+# Expected {"size": bytes, "sha256": hex} per key; fill them from known-good
+# files with: python -m utils.model_downloader --write-manifest
+# A key with neither falls back to the size the server reports. If there is
+# none, the file counts as unverifiable: a new download fails, and a file
+# already on disk is kept with a warning.
+MANIFEST_PATH = Path(__file__).resolve().parent / "model_manifest.json"
+
+DOWNLOAD_URL = "https://docs.google.com/uc?export=download"
+CHUNK_SIZE = int(os.getenv("MODEL_DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+TIMEOUT = (10, 60)  # connect, read
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    if not path.is_file():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def verifiable(expected: dict) -> bool:
+    return expected.get("size") is not None or expected.get("sha256") is not None
+
+
+def verify_file(path: Path, expected: dict, full: bool = True) -> bool:
+    """
+    Check size (cheap) and, if full, SHA-256 against a manifest entry.
+    An entry with neither never verifies.
+    """
+    if not path.is_file() or not verifiable(expected):
+        return False
+    size = expected.get("size")
+    if size is not None and path.stat().st_size != size:
+        return False
+    digest = expected.get("sha256")
+    if full and digest is not None and sha256_file(path) != digest:
+        return False
+    return True
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive lock on path; serializes workers downloading the same file."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            # msvcrt locks bytes from the current position; LK_LOCK gives up
+            # after ~10s, so keep retrying like a blocking flock
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
 
 def _get_confirm_token(response):
     for key, value in response.cookies.items():
@@ -36,44 +131,182 @@ def _get_confirm_token(response):
     return None
 
 
-def download_file(file_id: str, dest: Path):
+def _open_stream(session: requests.Session, file_id: str, url: str, range_header: str = None):
+    headers = {"Range": range_header} if range_header else {}
+    response = session.get(url, params={"id": file_id}, headers=headers, stream=True, timeout=TIMEOUT)
+    token = _get_confirm_token(response)
+
+    if token:
+        response.close()
+        response = session.get(
+            url, params={"id": file_id, "confirm": token}, headers=headers, stream=True, timeout=TIMEOUT
+        )
+
+    if response.status_code != 416:  # 416: .part already holds the whole file
+        response.raise_for_status()
+    return response
+
+
+def _total_size(response, offset: int):
+    """Full file size from Content-Range ("bytes a-b/N", "bytes */N") or Content-Length."""
+    content_range = response.headers.get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get("Content-Length")
+    if response.status_code in (200, 206) and length is not None:
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+def remote_size(session: requests.Session, file_id: str, url: str = DOWNLOAD_URL):
+    """Size the server reports for the file, from a one-byte range request."""
+    response = _open_stream(session, file_id, url, "bytes=0-0")
+    response.close()
+    return _total_size(response, 0)
+
+
+def _stream_to(response, part: Path, offset: int, total, name: str):
+    done = offset
+    start = last = time.monotonic()
+    with response, open(part, "ab" if offset else "wb") as f:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            f.write(chunk)
+            done += len(chunk)
+            now = time.monotonic()
+            if now - last >= PROGRESS_INTERVAL:
+                last = now
+                rate = (done - offset) / (now - start) / 1e6
+                of_total = f"/{total / 1e6:.1f}" if total else ""
+                print(f"  {name}: {done / 1e6:.1f}{of_total} MB ({rate:.2f} MB/s)")
+
+
+def download_file(
+    file_id: str,
+    dest: Path,
+    expected: dict = None,
+    session: requests.Session = None,
+    url: str = DOWNLOAD_URL,
+):
+    """
+    Download into dest.part, resuming from its current size with an HTTP
+    Range request, then verify and atomically rename. An existing dest is
+    kept if it verifies, or with a warning if there is nothing to verify it
+    against. Verification uses the manifest entry (`expected`), or the
+    server-reported size when the entry is empty.
+    Callers in other processes wait on dest.lock, then find dest in place.
+    """
+    expected = expected or {}
+    session = session or make_session(1)
     dest.parent.mkdir(parents=True, exist_ok=True)
 
+    with file_lock(dest.with_name(dest.name + ".lock")):
+        _download_locked(file_id, dest, expected, session, url)
+
+
+def _download_locked(file_id: str, dest: Path, expected: dict, session: requests.Session, url: str):
     if dest.exists():
-        print(f"{dest.name} already exists, skipping download.")
-        return
+        # No manifest entry: the server's size is the only check we have.
+        # If it can't be reached this raises, and dest is not vouched for.
+        check = expected if verifiable(expected) else {"size": remote_size(session, file_id, url)}
+        if not verifiable(check):
+            # Nothing to check against: a file that's there beats deleting
+            # it for a download that would fail verification anyway
+            print(f"⚠️ {dest.name} can't be verified (no manifest entry, no size from the server); keeping it.")
+            return
+        if verify_file(dest, check):
+            print(f"{dest.name} already exists, skipping download.")
+            return
+        print(f"⚠️ {dest.name} failed verification, downloading again.")
+        dest.unlink()
 
-    print(f"Downloading {dest.name} ...")
+    part = dest.with_name(dest.name + ".part")
+    offset = part.stat().st_size if part.exists() else 0
 
-    URL = "https://docs.google.com/uc?export=download"
-    session = requests.Session()
+    response = _open_stream(session, file_id, url, f"bytes={offset}-" if offset else None)
+    if response.status_code not in (206, 416):
+        # Server ignored the Range header; start over
+        offset = 0
+    total = _total_size(response, offset)
 
-    response = session.get(URL, params={"id": file_id}, stream=True)
-    token = _get_confirm_token(response)
+    start = time.monotonic()
+    if response.status_code == 416:
+        # .part claims to be complete; it is verified like any other download
+        response.close()
+    else:
+        print(f"{'Resuming' if offset else 'Downloading'} {dest.name} ...")
+        _stream_to(response, part, offset, total or expected.get("size"), dest.name)
 
-    if token:
-        response = session.get(
-            URL, params={"id": file_id, "confirm": token}, stream=True
-        )
+        if total is not None and part.stat().st_size < total:
+            # Keep the .part so the next run resumes from here
+            raise RuntimeError(f"{dest.name} download interrupted at {part.stat().st_size}/{total} bytes")
 
-    response.raise_for_status()
+    check = expected if verifiable(expected) else {"size": total}
+    done = part.stat().st_size
+    if not verify_file(part, check):
+        # Corrupt, truncated or unverifiable: drop it so the next run starts clean
+        part.unlink()
+        if not verifiable(check):
+            raise RuntimeError(
+                f"{dest.name} can't be verified: no manifest entry and no size from the server"
+            )
+        raise RuntimeError(f"{dest.name} failed size/SHA-256 verification")
 
-    with open(dest, "wb") as f:
-        for chunk in response.iter_content(chunk_size=32768):
-            if chunk:
-                f.write(chunk)
+    os.replace(part, dest)
 
-    print(f"Downloaded {dest.name}")
+    elapsed = time.monotonic() - start
+    rate = (done - offset) / elapsed / 1e6 if elapsed > 0 else 0.0
+    print(f"Downloaded {dest.name} ({done / 1e6:.1f} MB, {rate:.2f} MB/s)")
 
 
-def download_all_models():
+def download_all_models(max_workers: int = None):
+    manifest = load_manifest()
+    jobs = {}
     for key, file_id in MODEL_LINKS.items():
         # Skip local models
         if key in LOCAL_MODELS:
             print(f"{MODEL_FILES[key]} is local, skipping download.")
             continue
+        jobs[key] = (file_id, MODEL_DIRS[key] / MODEL_FILES[key])
 
-        dest_file = MODEL_DIRS[key] / MODEL_FILES[key]
-        download_file(file_id, dest_file)
+    session = make_session(max(1, len(jobs)))
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(jobs))) as pool:
+        futures = {
+            key: pool.submit(download_file, file_id, dest, manifest.get(key), session)
+            for key, (file_id, dest) in jobs.items()
+        }
+        for key, fut in futures.items():
+            try:
+                fut.result()
+            except Exception as e:
+                failures[key] = e
+
+    if failures:
+        raise RuntimeError(
+            "; ".join(f"{key}: {err}" for key, err in failures.items())
+        )
 
     print("✅ All required models downloaded successfully!")
+
+
+def write_manifest(path: Path = MANIFEST_PATH):
+    """Record size and SHA-256 of the current local model files."""
+    manifest = load_manifest(path)
+    for key in MODEL_LINKS:
+        dest = MODEL_DIRS[key] / MODEL_FILES[key]
+        if dest.is_file():
+            manifest[key] = {"size": dest.stat().st_size, "sha256": sha256_file(dest)}
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    if "--write-manifest" in sys.argv:
+        write_manifest()
+    else:
+        download_all_models()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Set by main.py once download_all_models() has finished (or failed)
+downloads_complete = threading.Event()
+
+# How long a lazy load waits for the downloader before trying anyway
+DOWNLOAD_WAIT_SECONDS = 600
+
+# Comma-separated models that must be loaded for /health/ready. Unset: every
+# preloaded model that ships in the repo (no download); the rest are optional
+# and only degrade readiness when they fail.
+MODEL_REQUIRED = os.getenv("MODEL_REQUIRED")
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], needs_download: bool):
+        self.name = name
+        self.loader = loader
+        self.needs_download = needs_download
+        self.preload = False  # scheduled for loading at startup
+        self.state = "pending"  # pending | loading | ready | failed
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def load(self) -> Any:
+        if self.state == "ready":
+            return self.value
+
+        with self.lock:
+            if self.state == "ready":
+                return self.value
+
+            if self.needs_download:
+                downloads_complete.wait(DOWNLOAD_WAIT_SECONDS)
+
+            self.state = "loading"
+            start = time.perf_counter()
+            try:
+                self.value = self.loader()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                self.load_seconds = time.perf_counter() - start
+                logger.error(f"Model '{self.name}' failed to load: {e}")
+                raise
+            self.load_seconds = time.perf_counter() - start
+            self.error = None
+            self.state = "ready"
+            logger.info(f"Model '{self.name}' loaded in {self.load_seconds:.2f}s")
+            return self.value
+
+    @property
+    def required(self) -> bool:
+        if MODEL_REQUIRED is not None:
+            return self.name in {n.strip() for n in MODEL_REQUIRED.split(",")}
+        return self.preload and not self.needs_download
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "required": self.required,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+_entries: Dict[str, ModelEntry] = {}
+
+
+def register(name: str, loader: Callable[[], Any], needs_download: bool = False) -> ModelEntry:
+    """
+    Register a service's artifacts. Nothing is loaded here; loader runs on
+    first get() or during background preloading, whichever comes first.
+    Set needs_download for artifacts fetched by utils.model_downloader.
+    """
+    entry = ModelEntry(name, loader, needs_download)
+    _entries[name] = entry
+    return entry
+
+
+def get(name: str) -> Any:
+    """Return the loaded value, loading it (once) if needed. A failed load is retried."""
+    return _entries[name].load()
+
+
+async def aget(name: str) -> Any:
+    """get() for async handlers: never blocks the event loop on a load."""
+    entry = _entries[name]
+    if entry.state == "ready":
+        return entry.value
+    return await asyncio.to_thread(entry.load)
+
+
+def _load_quietly(entry: ModelEntry):
+    try:
+        entry.load()
+    except Exception:
+        pass  # recorded on the entry, reported by status()
+
+
+def preload_all(max_workers: Optional[int] = None, skip: Iterable[str] = ()):
+    """Load every registered model (except `skip`) in parallel threads and wait for them."""
+    entries = [e for name, e in _entries.items() if name not in set(skip)]
+    for e in entries:
+        e.preload = True
+    with ThreadPoolExecutor(max_workers=max_workers or len(entries) or 1,
+                            thread_name_prefix="model-preload") as pool:
+        list(pool.map(_load_quietly, entries))
+
+
+def preload_background(lazy: bool = False, skip: Iterable[str] = ()) -> threading.Thread:
+    """
+    preload_all() in a daemon thread. With lazy, only the required models
+    are loaded up front. Models already loaded or attempted (by serve.py's
+    master before forking) are left alone. Entries are marked before the
+    thread starts so readiness never sees an empty preload set.
+    """
+    skip = set(skip) | {name for name, e in _entries.items() if e.state != "pending"}
+    if lazy:
+        skip |= {name for name, e in _entries.items() if not e.required}
+    for name, e in _entries.items():
+        if name not in set(skip):
+            e.preload = True
+    thread = threading.Thread(target=preload_all, kwargs={"skip": skip},
+                              name="model-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> Dict[str, dict]:
+    return {name: e.status() for name, e in _entries.items()}
+
+
+def readiness() -> dict:
+    """
+    Ready once every required model is loaded. Optional models never block:
+    a failed one makes the status "degraded", a pending one is just listed.
+    """
+    required = [e for e in _entries.values() if e.required]
+    waiting = sorted(e.name for e in required if e.state != "ready")
+    failed = sorted(e.name for e in _entries.values() if not e.required and e.state == "failed")
+    if waiting:
+        state = "not_ready"
+    elif failed:
+        state = "degraded"
+    else:
+        state = "ready"
+    return {
+        "ready": not waiting,
+        "status": state,
+        "waiting_on": waiting,
+        "failed": failed,
+    }
+
+
+@metrics.register_collector
+def _collect_metrics():
+    entries = list(_entries.items())
+    return [
+        ("model_ready", "gauge", "1 when the model is loaded",
+         [({"model": n}, int(e.state == "ready")) for n, e in entries]),
+        ("model_load_seconds", "gauge", "Duration of the last load attempt",
+         [({"model": n}, e.load_seconds) for n, e in entries if e.load_seconds is not None]),
+    ]
@@ -0,0 +1,299 @@
+"""
+Opt-in sampling profiler for finding slow requests in production.
+
+Off unless PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS is set. While enabled, one
+daemon thread wakes PROFILE_HZ times a second whenever a request is in
+flight and records the Python stack of every busy thread (the event loop,
+request threadpool, executors and batcher workers; idle waits are dropped).
+Samples stay in memory for PROFILE_WINDOW_S seconds. A tick costs about
+50 us with 20 threads, i.e. ~0.5% of a core at 100 Hz, and no ticks are
+taken while the server is idle.
+
+ProfilerMiddleware decides when a request ends whether to keep it: always
+when it took at least PROFILE_SLOW_MS, otherwise with probability
+PROFILE_SAMPLE_RATE. A kept request gets the samples taken during its
+lifetime, aggregated into collapsed stacks ("thread;outer;...;inner count",
+the input of flamegraph.pl and speedscope), plus its shape: method, route
+template, status, duration, body size, content type, query parameter names
+and whatever the handler reported through note(). Payloads are never
+stored. Records go to PROFILE_DIR, which keeps the newest
+PROFILE_MAX_RECORDS files.
+
+Stacks are per thread, not per request: samples of requests running
+concurrently show up in each other's records, and work in child processes
+is not visible. The "thread" root frame tells them apart in practice.
+Requests much shorter than the sampling interval mostly get no samples;
+their records still carry the shape and duration.
+"""
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils import metrics
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+HZ = float(os.getenv("PROFILE_HZ", "100"))
+WINDOW_S = float(os.getenv("PROFILE_WINDOW_S", "120"))
+MAX_RECORDS = int(os.getenv("PROFILE_MAX_RECORDS", "200"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+ENABLED = SAMPLE_RATE > 0 or SLOW_MS > 0
+
+MAX_DEPTH = 128
+
+# Leaf frames of threads that are waiting for work rather than doing it
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its queue
+}
+
+_ROOT = str(Path(__file__).resolve().parents[1]) + os.sep
+_THREAD_SUFFIX = re.compile(r"[-_ ]?\d+$")
+
+# Shape of the request being handled; the middleware sets it, note() adds to it
+_request_shape: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_shape", default=None)
+
+
+def note(**fields):
+    """Add fields (image size, row count, ...) to the current request's recorded shape."""
+    shape = _request_shape.get()
+    if shape is not None:
+        shape.update(fields)
+
+
+class Sampler:
+    def __init__(self, hz: float, window_s: float, directory: Path, max_records: int):
+        self.interval = 1.0 / hz
+        self.directory = Path(directory)
+        self.max_records = max_records
+        # (time, [(thread name, stack), ...]) per tick with a request in flight
+        self._ticks: deque = deque(maxlen=max(int(hz * window_s), 1))
+        # Requests that ended and are waiting for the tick after their end
+        self._pending: List[Tuple[float, float, str, dict]] = []
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+        self._interned: Dict[tuple, tuple] = {}
+        self.in_flight = 0
+        self._thread: Optional[threading.Thread] = None
+        self.captured = 0
+        self.dropped = 0
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, start: float, end: float, reason: Optional[str], shape: dict):
+        with self._lock:
+            self.in_flight -= 1
+            if reason is not None:
+                self._pending.append((start, end, reason, shape))
+
+    # Sampling (profiler thread)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            if path.startswith(_ROOT):
+                path = path[len(_ROOT):]
+            elif "site-packages" + os.sep in path:
+                path = path.split("site-packages" + os.sep, 1)[1]
+            else:  # stdlib: keep the package, e.g. logging/__init__.py
+                path = os.sep.join(path.split(os.sep)[-2:])
+            label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame) -> Optional[tuple]:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+            return None
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        stack = tuple(labels)
+        if len(self._interned) > 50000:
+            self._interned.clear()
+        return self._interned.setdefault(stack, stack)
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {t.ident: _THREAD_SUFFIX.sub("", t.name) for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = self._stack(frame)
+            if stack is not None:
+                stacks.append((names.get(ident, "thread"), stack))
+        self._ticks.append((time.perf_counter(), stacks))
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if self.in_flight or self._pending:
+                self.sample()
+            if self._pending:
+                self._flush()
+
+    # Records
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for start, end, reason, shape in pending:
+            try:
+                self._write(self.collect(start, end), reason, shape)
+                self.captured += 1
+            except OSError:
+                self.dropped += 1
+
+    def collect(self, start: float, end: float) -> dict:
+        """Collapsed stack counts from the ticks between start and end."""
+        counts: Dict[str, int] = {}
+        n = 0
+        ticks = list(self._ticks)
+        for t, stacks in ticks:
+            if start <= t <= end:
+                n += 1
+                for thread, stack in stacks:
+                    key = thread + ";" + ";".join(stack)
+                    counts[key] = counts.get(key, 0) + 1
+        return {
+            "samples": n,
+            "interval_ms": self.interval * 1000,
+            "truncated": bool(ticks) and ticks[0][0] > start,
+            "stacks": counts,
+        }
+
+    def _write(self, profile: dict, reason: str, shape: dict):
+        record_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        record = {"id": record_id, "captured_at": time.time(), "reason": reason, "shape": shape, **profile}
+        tmp = self.directory / f".{record_id}.tmp"
+        tmp.write_text(json.dumps(record))
+        os.replace(tmp, self.directory / f"{record_id}.json")
+        self._prune()
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.json"))
+        for path in files[:max(len(files) - self.max_records, 0)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:  # another worker got there first
+                pass
+
+    def records(self, limit: int = 50) -> List[dict]:
+        """Newest first, without their stacks."""
+        out = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True)[:limit]:
+            try:
+                record = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            record.pop("stacks", None)
+            out.append(record)
+        return out
+
+    def record(self, record_id: str) -> Optional[dict]:
+        if not re.fullmatch(r"[0-9a-f-]+", record_id):
+            return None
+        path = self.directory / f"{record_id}.json"
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": SAMPLE_RATE,
+            "slow_ms": SLOW_MS,
+            "hz": 1.0 / self.interval,
+            "in_flight": self.in_flight,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "ticks_buffered": len(self._ticks),
+        }
+
+
+sampler = Sampler(HZ, WINDOW_S, PROFILE_DIR, MAX_RECORDS)
+
+
+def collapsed(record: dict) -> str:
+    """A record's stacks in the collapsed format read by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(record["stacks"].items()))
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware choosing which requests keep the sampler's stacks."""
+
+    def __init__(self, app, sample_rate: float = SAMPLE_RATE, slow_ms: float = SLOW_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_s = slow_ms / 1000.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/debug/"):
+            await self.app(scope, receive, send)
+            return
+
+        sampler.ensure_started()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        headers = dict(scope.get("headers") or ())
+        shape = {"method": scope["method"]}
+        if b"content-length" in headers:
+            shape["content_length"] = int(headers[b"content-length"])
+        if b"content-type" in headers:
+            shape["content_type"] = headers[b"content-type"].decode("latin-1").split(";")[0]
+        query = scope.get("query_string") or b""
+        if query:
+            shape["query_params"] = sorted({p.split(b"=")[0].decode("latin-1") for p in query.split(b"&") if p})
+
+        token = _request_shape.set(shape)
+        sampler.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            end = time.perf_counter()
+            _request_shape.reset(token)
+            elapsed = end - start
+            reason = None
+            if self.slow_s and elapsed >= self.slow_s:
+                reason = "slow"
+            elif self.sample_rate and random.random() < self.sample_rate:
+                reason = "sampled"
+            if reason is not None:
+                shape.update(route=metrics.route_label(scope), status=status,
+                             duration_ms=round(elapsed * 1000, 3))
+            sampler.request_finished(start, end, reason, shape)
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class ResultStore:
+    """
+    Content-addressed file cache for generated outputs (e.g. results/).
+
+    Files are named by a hash of the *input* bytes plus whatever else the
+    output depends on (settings, model version), so a repeated input maps
+    to an existing output. Entries are tracked in LRU order (mtime is bumped
+    on every hit so the order survives restarts) and the oldest files are
+    deleted once the directory exceeds max_bytes.
+
+    Several worker processes can share one directory: the disk is the
+    source of truth. A hit is any file that exists, and every put() rescans
+    the directory before evicting, so max_bytes holds across all workers.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".png"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+        with self._lock:
+            self._scan()
+            self._evict()
+
+    @staticmethod
+    def key_for(data: bytes, *params: str) -> str:
+        h = hashlib.sha256(data)
+        for p in params:
+            h.update(b"\0" + p.encode())
+        return h.hexdigest()[:32]
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                self._total -= self._entries.pop(path.name, 0)
+                self.misses += 1
+                return None
+            # may have been written by another worker since our last scan
+            if path.name not in self._entries:
+                self._entries[path.name] = size
+                self._total += size
+            self._entries.move_to_end(path.name)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        # Unique across threads and worker processes sharing the directory
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        ) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+        with self._lock:
+            # other workers write here too; budget against what's on disk
+            self._scan()
+            self._total -= self._entries.pop(path.name, 0)
+            self._entries[path.name] = len(data)
+            self._total += len(data)
+            self._evict()
+        return path
+
+    def _scan(self):
+        # caller holds the lock; rebuild the index from disk, oldest access first
+        found = []
+        for p in self.directory.glob(f"*{self.suffix}"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue  # evicted by another worker mid-scan
+            found.append((st.st_mtime, p.name, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in found)
+        self._total = sum(size for _, _, size in found)
+
+    def _evict(self):
+        # caller holds the lock; never evict the entry just written
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,151 @@
+"""
+Helpers for streaming bulk endpoints: read a chunked request body as
+fixed-size chunks of lines, parse NDJSON or CSV lines into records, and
+validate each chunk against the same pydantic schema the batch endpoints
+use, in one pydantic-core call per chunk.
+
+Only one chunk of lines (plus a partial line) is held at a time, so memory
+stays flat however large the upload is. Records must not contain raw
+newlines (NDJSON never does; quoted CSV fields spanning lines aren't
+supported).
+"""
+import csv
+import json
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from starlette.responses import StreamingResponse
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for generators that are still reading the request
+    body. The stock response listens for http.disconnect on receive() while
+    streaming, which steals the body messages from the generator on ASGI
+    servers older than spec 2.4; a disconnect surfaces as a failed send here.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def detect_format(content_type: Optional[str], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    if content_type and "csv" in content_type:
+        return "csv"
+    return "ndjson"
+
+
+async def read_first_line(body: AsyncIterator[bytes]) -> Tuple[bytes, bytes]:
+    """Read until the first newline; returns (first line, bytes already read after it)."""
+    buf = b""
+    async for piece in body:
+        buf += piece
+        if b"\n" in buf:
+            line, rest = buf.split(b"\n", 1)
+            return line.rstrip(b"\r"), rest
+    return buf.rstrip(b"\r"), b""
+
+
+async def line_chunks(body: AsyncIterator[bytes], chunk_rows: int,
+                      leftover: bytes = b"") -> AsyncIterator[List[bytes]]:
+    """Yield lists of up to chunk_rows non-empty lines as the body arrives."""
+    async def pieces():
+        if leftover:
+            yield leftover
+        async for piece in body:
+            yield piece
+
+    buf, lines = b"", []
+    async for piece in pieces():
+        buf += piece
+        if b"\n" not in piece:
+            continue
+        *complete, buf = buf.split(b"\n")
+        lines.extend(l for l in complete if l.strip())
+        while len(lines) >= chunk_rows:
+            yield lines[:chunk_rows]
+            lines = lines[chunk_rows:]
+    if buf.strip():
+        lines.append(buf)
+    while lines:
+        yield lines[:chunk_rows]
+        lines = lines[chunk_rows:]
+
+
+def normalize_header(names: List[str]) -> List[str]:
+    """'Transaction Amount' / 'transaction_amount' -> 'transaction_amount'."""
+    return [n.strip().lower().replace(" ", "_") for n in names]
+
+
+def parse_ndjson(lines: List[bytes]) -> Tuple[List[dict], List[int], Dict[int, str]]:
+    """Returns (parsed records, their positions in lines, {position: error})."""
+    records, positions, errors = [], [], {}
+    for pos, line in enumerate(lines):
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            errors[pos] = f"Invalid JSON: {e}"
+            continue
+        if not isinstance(rec, dict):
+            errors[pos] = "Record must be a JSON object"
+            continue
+        records.append(rec)
+        positions.append(pos)
+    return records, positions, errors
+
+
+def parse_csv(lines: List[bytes], header: List[str]) -> Tuple[List[dict], List[int], Dict[int, str]]:
+    records, positions, errors = [], [], {}
+    reader = csv.reader(l.decode("utf-8", errors="replace").rstrip("\r") for l in lines)
+    for pos, row in enumerate(reader):
+        if len(row) != len(header):
+            errors[pos] = f"Expected {len(header)} fields, got {len(row)}"
+            continue
+        records.append(dict(zip(header, row)))
+        positions.append(pos)
+    return records, positions, errors
+
+
+def csv_field(value: Any) -> str:
+    """One quoted CSV field; non-strings (e.g. pydantic error lists) are written as JSON."""
+    text = value if isinstance(value, str) else json.dumps(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def validate_rows(
+    records: List[Dict[str, Any]], schema: Type[BaseModel]
+) -> Tuple[pd.DataFrame, np.ndarray, Dict[int, Any]]:
+    """
+    Validate records against `schema` exactly as utils.batch.validate_records
+    does, but in one call for the whole chunk. Returns (frame of the valid
+    rows, their positions in records, {position: errors}); errors have the
+    same form as the batch endpoints report.
+    """
+    adapter = _list_adapter(schema)
+    errors: Dict[int, Any] = {}
+    try:
+        items = adapter.validate_python(records)
+        keep = np.arange(len(records))
+    except ValidationError as e:
+        # loc starts with the row's position; strip it so errors match a
+        # per-record schema(**rec)
+        for err in json.loads(e.json()):
+            pos, *loc = err["loc"]
+            errors.setdefault(pos, []).append({**err, "loc": loc})
+        keep = np.array([p for p in range(len(records)) if p not in errors], dtype=np.int64)
+        items = adapter.validate_python([records[p] for p in keep])
+
+    frame = pd.DataFrame([item.__dict__ for item in items], columns=list(schema.model_fields))
+    return frame, keep, errors
@@ -0,0 +1,422 @@
+"""
+Compiled tree-ensemble predictor.
+
+CatBoost, LightGBM and XGBoost models are exported once to flat NumPy arrays
+and evaluated without the library: no Pool/DMatrix construction, DataFrame
+validation or thread-pool spin-up per call, which dominates single-row
+latency. The libraries' C++ loops still win on large batches, so calls with
+more than TREE_COMPILED_MAX_ROWS rows go back to the library model.
+Enable with TREE_PREDICTOR=compiled; the default stays "native".
+
+    compiled = compile_model(model)    # CatBoost / LightGBM / XGBoost
+    verify(model, compiled)            # parity against the library, raises on mismatch
+    model = maybe_compile(model, name) # both, falling back to `model` on any failure
+
+CompiledEnsemble mirrors the sklearn-style predict / predict_proba the
+routers already call, so it drops in wherever the model object is used.
+"""
+import json
+import logging
+import os
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TREE_PREDICTOR = os.getenv("TREE_PREDICTOR", "native")  # native | compiled
+TREE_COMPILED_MAX_ROWS = int(os.getenv("TREE_COMPILED_MAX_ROWS", "8"))
+
+# LightGBM's kZeroThreshold (a float 1e-35f): |x| at or below it counts as zero
+_ZERO_THRESHOLD = float(np.float32(1e-35))
+
+# per-node missing-value handling
+_MISSING_NONE, _MISSING_ZERO, _MISSING_NAN = 0, 1, 2
+
+
+class NodeTrees:
+    """
+    Arbitrary binary trees flattened into one set of node arrays. Leaves
+    point back at themselves, so a batch walks max_depth steps with no
+    per-row branching. This beats a Python per-node loop even for one row.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, missing,
+                 value, roots, max_depth, strict: bool, dtype, snap_zero: bool = False):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=dtype)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.missing = np.asarray(missing, dtype=np.int8)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.strict = strict  # XGBoost: x < t goes left; LightGBM: x <= t
+        self.dtype = dtype
+        # LightGBM reads |x| <= kZeroThreshold as an absent (zero) feature
+        self.snap_zero = snap_zero
+        self.has_zero_missing = bool((self.missing == _MISSING_ZERO).any())
+        self.has_none_missing = bool((self.missing == _MISSING_NONE).any())
+
+    def __len__(self):
+        return len(self.roots)
+
+    def raw(self, X: np.ndarray) -> np.ndarray:
+        X = X.astype(self.dtype, copy=False)
+        if self.snap_zero:
+            X = np.where(np.abs(X) <= _ZERO_THRESHOLD, 0.0, X)
+        n = X.shape[0]
+        nodes = np.repeat(self.roots[None, :], n, axis=0)
+        rows = np.arange(n)[:, None]
+        nan_mask = np.isnan(X)
+        any_nan = bool(nan_mask.any())
+
+        for _ in range(self.max_depth):
+            f = self.feature[nodes]
+            x = X[rows, f]
+            go_left = x < self.threshold[nodes] if self.strict else x <= self.threshold[nodes]
+            if any_nan or self.has_zero_missing:
+                miss = self.missing[nodes]
+                isnan = nan_mask[rows, f]
+                is_missing = isnan & (miss != _MISSING_NONE)
+                if self.has_zero_missing:
+                    is_missing |= (miss == _MISSING_ZERO) & (np.abs(x) <= _ZERO_THRESHOLD)
+                if self.has_none_missing and any_nan:
+                    # LightGBM treats NaN as 0.0 when the split has no missing handling
+                    go_left = np.where(isnan & (miss == _MISSING_NONE), 0.0 <= self.threshold[nodes], go_left)
+                go_left = np.where(is_missing, self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].sum(axis=1)
+
+
+class ObliviousTrees:
+    """Symmetric (CatBoost) trees: every level shares one split, so a leaf index is a bit pattern."""
+
+    def __init__(self, features, borders, leaves, nan_as_true):
+        self.features = np.asarray(features, dtype=np.intp)      # (T, depth)
+        self.borders = np.asarray(borders, dtype=np.float32)     # (T, depth)
+        self.leaves = np.asarray(leaves, dtype=np.float64)       # (T, 2**depth)
+        self.nan_as_true = np.asarray(nan_as_true, dtype=bool)   # (T, depth)
+        self.weights = 1 << np.arange(self.features.shape[1], dtype=np.intp)
+        self._tree_idx = np.arange(len(self.features))
+
+    def __len__(self):
+        return len(self.features)
+
+    def raw(self, X: np.ndarray) -> np.ndarray:
+        X = X.astype(np.float32, copy=False)
+        x = X[:, self.features]                                  # (n, T, depth)
+        bits = x > self.borders
+        nan = np.isnan(x)
+        if nan.any():
+            bits = np.where(nan, self.nan_as_true, bits)
+        idx = bits.astype(np.intp) @ self.weights                # (n, T)
+        return self.leaves[self._tree_idx, idx].sum(axis=1)
+
+
+class CompiledEnsemble:
+    def __init__(self, groups, objective: str, bias: float = 0.0, scale: float = 1.0,
+                 feature_names: Optional[List[str]] = None, classes=None, source: str = "",
+                 fallback=None, max_rows: int = TREE_COMPILED_MAX_ROWS):
+        self.groups = groups
+        self.objective = objective  # "identity" | "sigmoid"
+        self.bias = bias
+        self.scale = scale
+        self.feature_names = list(feature_names) if feature_names else None
+        self.classes_ = np.asarray(classes if classes is not None else [0, 1])
+        self.source = source
+        # library model for batches above max_rows
+        self.fallback = fallback
+        self.max_rows = max_rows
+
+    def __repr__(self):
+        trees = sum(len(g) for g in self.groups)
+        return f"CompiledEnsemble({self.source}, trees={trees}, objective={self.objective})"
+
+    def _matrix(self, X) -> np.ndarray:
+        if hasattr(X, "columns"):
+            names = self.feature_names
+            # column selection is the slowest step for one row; skip it when already in order
+            if names and list(X.columns) != names and set(names).issubset(X.columns):
+                X = X[names]
+            return X.to_numpy(dtype=np.float64)
+        return np.asarray(X, dtype=np.float64).reshape(-1, np.shape(X)[-1])
+
+    def predict_raw(self, X) -> np.ndarray:
+        X = self._matrix(X)
+        return sum(g.raw(X) for g in self.groups) * self.scale + self.bias
+
+    def _transform(self, raw: np.ndarray) -> np.ndarray:
+        if self.objective == "sigmoid":
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def _use_fallback(self, X) -> bool:
+        return self.fallback is not None and len(X) > self.max_rows
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.objective != "sigmoid":
+            raise AttributeError("predict_proba is only available for binary classifiers")
+        if self._use_fallback(X):
+            return self.fallback.predict_proba(X)
+        p = self._transform(self.predict_raw(X))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        if self._use_fallback(X):
+            return self.fallback.predict(X)
+        out = self._transform(self.predict_raw(X))
+        if self.objective == "sigmoid":
+            return self.classes_[(out > 0.5).astype(int)]
+        return out
+
+
+# ---------------------------------------------------------------- exporters
+
+def _compile_catboost(model) -> CompiledEnsemble:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            dump = json.load(f)
+
+    if "oblivious_trees" not in dump:
+        raise NotImplementedError("only symmetric (oblivious) CatBoost trees are supported")
+    float_features = {f["feature_index"]: f for f in dump["features_info"].get("float_features", [])}
+    if dump["features_info"].get("categorical_features"):
+        raise NotImplementedError("CatBoost categorical features are not supported")
+
+    by_depth = {}
+    for tree in dump["oblivious_trees"]:
+        splits = tree["splits"]
+        if any(s["split_type"] != "FloatFeature" for s in splits):
+            raise NotImplementedError("only float-feature CatBoost splits are supported")
+        if len(tree["leaf_values"]) != 1 << len(splits):
+            raise NotImplementedError("multi-dimensional CatBoost leaves are not supported")
+        feats = [float_features[s["float_feature_index"]] for s in splits]
+        by_depth.setdefault(len(splits), []).append((
+            [f["flat_feature_index"] for f in feats],
+            [s["border"] for s in splits],
+            tree["leaf_values"],
+            [f.get("nan_value_treatment") == "AsTrue" for f in feats],
+        ))
+
+    groups = []
+    for trees in by_depth.values():
+        features, borders, leaves, nan_as_true = (list(col) for col in zip(*trees))
+        groups.append(ObliviousTrees(features, borders, leaves, nan_as_true))
+
+    scale, bias = dump.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    is_classifier = type(model).__name__ == "CatBoostClassifier"
+    return CompiledEnsemble(
+        groups, "sigmoid" if is_classifier else "identity", bias=bias, scale=scale,
+        feature_names=model.feature_names_,
+        classes=getattr(model, "classes_", None) if is_classifier else None,
+        source="catboost",
+    )
+
+
+def _flatten_lightgbm(trees) -> NodeTrees:
+    cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing", "value")}
+    roots, max_depth = [], 0
+    missing_codes = {"None": _MISSING_NONE, "Zero": _MISSING_ZERO, "NaN": _MISSING_NAN}
+
+    def add(node, depth) -> int:
+        nonlocal max_depth
+        idx = len(cols["feature"])
+        for k in cols:
+            cols[k].append(0)
+        if "split_feature" not in node:
+            max_depth = max(max_depth, depth)
+            cols["left"][idx] = cols["right"][idx] = idx
+            cols["value"][idx] = node["leaf_value"]
+            return idx
+        if node["decision_type"] != "<=":
+            raise NotImplementedError("LightGBM categorical splits are not supported")
+        cols["feature"][idx] = node["split_feature"]
+        cols["threshold"][idx] = node["threshold"]
+        cols["default_left"][idx] = node["default_left"]
+        cols["missing"][idx] = missing_codes[node["missing_type"]]
+        cols["left"][idx] = add(node["left_child"], depth + 1)
+        cols["right"][idx] = add(node["right_child"], depth + 1)
+        return idx
+
+    for tree in trees:
+        roots.append(add(tree["tree_structure"], 0))
+    return NodeTrees(**cols, roots=roots, max_depth=max_depth, strict=False, dtype=np.float64, snap_zero=True)
+
+
+def _compile_lightgbm(model) -> CompiledEnsemble:
+    booster = getattr(model, "booster_", None) or getattr(model, "booster", None) or model
+    dump = booster.dump_model()
+    if dump["num_class"] != 1 or dump.get("average_output"):
+        raise NotImplementedError("only single-output gbdt LightGBM models are supported")
+
+    objective = dump["objective"].split()
+    if objective[0] == "binary":
+        sigmoid = float(objective[1].split(":")[1]) if len(objective) > 1 else 1.0
+        kind, scale = "sigmoid", sigmoid
+    elif objective[0] in ("regression", "regression_l1", "huber", "fair", "quantile", "mape"):
+        kind, scale = "identity", 1.0
+    else:
+        raise NotImplementedError(f"LightGBM objective '{dump['objective']}' is not supported")
+
+    return CompiledEnsemble(
+        [_flatten_lightgbm(dump["tree_info"])], kind, scale=scale,
+        feature_names=dump["feature_names"],
+        classes=getattr(model, "classes_", None),
+        source="lightgbm",
+    )
+
+
+def _compile_xgboost(model) -> CompiledEnsemble:
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    gb = learner["gradient_booster"]
+    if gb["name"] != "gbtree":
+        raise NotImplementedError(f"XGBoost booster '{gb['name']}' is not supported")
+    params = learner["learner_model_param"]
+    if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) > 1:
+        raise NotImplementedError("multi-output XGBoost models are not supported")
+
+    trees = gb["model"]["trees"]
+    best = booster.attributes().get("best_iteration")
+    if best is not None:
+        # sklearn-style predict() stops at the early-stopping iteration
+        per_iter = int(gb["model"]["gbtree_model_param"].get("num_parallel_tree", 1))
+        trees = trees[:(int(best) + 1) * per_iter]
+
+    cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "value")}
+    roots, max_depth = [], 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise NotImplementedError("XGBoost categorical splits are not supported")
+        offset = len(cols["feature"])
+        left = np.asarray(tree["left_children"])
+        right = np.asarray(tree["right_children"])
+        leaf = left == -1
+        ids = np.arange(len(left)) + offset
+        cols["feature"].extend(np.where(leaf, 0, tree["split_indices"]).tolist())
+        cols["threshold"].extend(tree["split_conditions"])
+        cols["left"].extend(np.where(leaf, ids, left + offset).tolist())
+        cols["right"].extend(np.where(leaf, ids, right + offset).tolist())
+        cols["default_left"].extend(bool(d) for d in tree["default_left"])
+        # leaves keep their weight in split_conditions
+        cols["value"].extend(np.where(leaf, tree["split_conditions"], 0.0).tolist())
+        roots.append(offset)
+
+        depth = np.zeros(len(left), dtype=int)
+        for i in range(len(left)):  # parents precede children in XGBoost's layout
+            if not leaf[i]:
+                depth[left[i]] = depth[right[i]] = depth[i] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+    nodes = NodeTrees(**cols, missing=[_MISSING_NAN] * len(cols["feature"]), roots=roots,
+                      max_depth=max_depth, strict=True, dtype=np.float32)
+
+    base_score = float(params["base_score"].strip("[]"))
+    objective = learner["objective"]["name"]
+    if objective == "binary:logistic":
+        kind, bias = "sigmoid", float(np.log(base_score / (1.0 - base_score)))
+    elif objective.startswith("reg:") and objective != "reg:logistic":
+        kind, bias = "identity", base_score
+    else:
+        raise NotImplementedError(f"XGBoost objective '{objective}' is not supported")
+
+    return CompiledEnsemble(
+        [nodes], kind, bias=bias, feature_names=booster.feature_names,
+        classes=getattr(model, "classes_", None), source="xgboost",
+    )
+
+
+def compile_model(model) -> CompiledEnsemble:
+    module = type(model).__module__.split(".")[0]
+    if module == "catboost":
+        return _compile_catboost(model)
+    if module == "lightgbm" or hasattr(getattr(model, "booster", None), "dump_model"):
+        return _compile_lightgbm(model)
+    if module == "xgboost":
+        return _compile_xgboost(model)
+    raise NotImplementedError(f"Can't compile {type(model).__module__}.{type(model).__name__}")
+
+
+# ---------------------------------------------------------------- parity
+
+def _thresholds(compiled: CompiledEnsemble) -> dict:
+    """feature index -> every split value the ensemble compares it against."""
+    out = {}
+    for g in compiled.groups:
+        if isinstance(g, ObliviousTrees):
+            feats, vals = g.features.ravel(), g.borders.ravel()
+        else:
+            split = g.left != np.arange(len(g.left))
+            feats, vals = g.feature[split], g.threshold[split]
+        for f, v in zip(feats.tolist(), vals.tolist()):
+            out.setdefault(f, []).append(v)
+    return out
+
+
+def parity_sample(compiled: CompiledEnsemble, n_features: int, rows: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Rows built from the ensemble's own split values, landing on and either
+    side of each threshold so every comparison edge is exercised.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, n_features))
+    for f, vals in _thresholds(compiled).items():
+        vals = np.asarray(vals)
+        pick = vals[rng.integers(len(vals), size=rows)]
+        nudge = rng.choice([-1.0, 0.0, 1.0], size=rows)
+        # CatBoost's NaN-as-min border sits at the float32 limit; stepping past it gives inf, which is fine
+        with np.errstate(over="ignore"):
+            nudged = np.nextafter(pick.astype(np.float32), np.where(nudge < 0, -np.inf, np.inf).astype(np.float32))
+        X[:, f] = np.where(nudge == 0, pick, nudged)
+    return X
+
+
+def _library_output(model, X: np.ndarray) -> np.ndarray:
+    if hasattr(model, "predict_proba"):
+        try:
+            return np.asarray(model.predict_proba(X))[:, 1]
+        except Exception:
+            pass
+    booster = getattr(model, "booster_", None) or getattr(model, "booster", None)
+    if booster is not None and hasattr(booster, "dump_model"):
+        return np.asarray(booster.predict(X))
+    return np.asarray(model.predict(X))
+
+
+def verify(model, compiled: CompiledEnsemble, rows: int = 512, rtol: float = 1e-5, atol: float = 1e-6) -> float:
+    """Compare compiled and library outputs (batch and single-row calls); returns the max abs diff."""
+    n_features = len(compiled.feature_names) if compiled.feature_names else \
+        1 + max(_thresholds(compiled), default=0)
+    X = parity_sample(compiled, n_features, rows)
+
+    expected = _library_output(model, X)
+    transform = compiled._transform
+    got = transform(compiled.predict_raw(X))
+    single = np.concatenate([transform(compiled.predict_raw(X[i:i + 1])) for i in range(min(rows, 32))])
+
+    if not np.allclose(got, expected, rtol=rtol, atol=atol) or \
+            not np.allclose(single, expected[:len(single)], rtol=rtol, atol=atol):
+        diff = max(np.abs(got - expected).max(), np.abs(single - expected[:len(single)]).max())
+        raise AssertionError(f"compiled {compiled.source} predictor diverges from library (max |diff| {diff:.3g})")
+    return float(np.abs(got - expected).max())
+
+
+def maybe_compile(model, name: str):
+    """Return a verified CompiledEnsemble when TREE_PREDICTOR=compiled, else `model` unchanged."""
+    if TREE_PREDICTOR != "compiled":
+        return model
+    try:
+        compiled = compile_model(model)
+        diff = verify(model, compiled)
+        compiled.fallback = model
+    except Exception as e:
+        logger.warning(f"'{name}': using library predictor, compilation failed ({e})")
+        return model
+    logger.info(f"'{name}': compiled {compiled!r}, parity max |diff| {diff:.3g}")
+    return compiled